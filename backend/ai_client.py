@@ -0,0 +1,218 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import queue
+import threading
+
+from openai import AsyncOpenAI
+
+from config import get_config
+from resilience import attempt_timeout, openai_api
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = "gpt-3.5-turbo"
+CHAT_SYSTEM_PROMPT = "You represent ClearCall company. You are a helpful and knowledgeable AI assistant talking on behalf of ClearCall company staff. Keep responses concise and clear."
+
+
+class ChatCompletionService:
+    """Async chat completions shared by every caller in the process.
+
+    All model calls run on one event loop in a background thread, so a
+    waiting call holds no worker thread. Identical concurrent prompts share
+    a single upstream call, and a semaphore caps the number of calls
+    outstanding against the API at once.
+    """
+
+    def __init__(self, max_concurrent, timeout):
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._inflight = {}
+        self._start_lock = threading.Lock()
+
+        self.calls = 0
+        self.coalesced = 0
+        self.streams = 0
+        self.failures = 0
+
+    def _ensure_loop(self):
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ai-client-loop", daemon=True).start()
+                # Retries are handled by the resilience layer, not the SDK
+                self._client = AsyncOpenAI(api_key=get_config().OPENAI_API_KEY, base_url=get_config().OPENAI_BASE_URL,
+                                           timeout=self.timeout, max_retries=0)
+                self._loop = loop
+                logger.info(f"Async OpenAI client started (max {self.max_concurrent} concurrent calls)")
+        return self._loop
+
+    @staticmethod
+    def _key(model, system_prompt, message):
+        return hashlib.sha256("\0".join((model, system_prompt, message)).encode('utf-8')).hexdigest()
+
+    def _slots(self):
+        if self._semaphore is None:
+            # Created on the service loop so it binds to it on every Python version
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    async def _create(self, **kwargs):
+        # Each attempt gets only what is left of the call's deadline
+        return await self._client.chat.completions.create(timeout=attempt_timeout(self.timeout), **kwargs)
+
+    async def _call(self, model, system_prompt, message):
+        async with self._slots():
+            self.calls += 1
+            try:
+                response = await openai_api.acall(
+                    self._create,
+                    deadline=self.timeout,
+                    attempt_timeout=self.timeout,
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": message}
+                    ]
+                )
+            except Exception:
+                self.failures += 1
+                raise
+        return response.choices[0].message.content
+
+    async def _relay_stream(self, model, system_prompt, message, put):
+        """Stream a completion, passing ("delta", text) and finally ("done", None) or ("error", exc) to ``put``.
+
+        Streams are never coalesced, but hold a concurrency slot for their
+        whole duration. Cancelling the task closes the upstream stream.
+        """
+        try:
+            async with self._slots():
+                self.calls += 1
+                self.streams += 1
+                # Only opening the stream is retried; tokens already relayed cannot be replayed
+                stream = await openai_api.acall(
+                    self._create,
+                    deadline=self.timeout,
+                    attempt_timeout=self.timeout,
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": message}
+                    ],
+                    stream=True
+                )
+                try:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            put(("delta", chunk.choices[0].delta.content))
+                finally:
+                    await stream.close()
+            put(("done", None))
+        except Exception as e:
+            self.failures += 1
+            put(("error", e))
+
+    async def _complete(self, model, system_prompt, message):
+        # Runs on the service loop, so _inflight needs no lock
+        key = self._key(model, system_prompt, message)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(model, system_prompt, message))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: one caller going away must not cancel the call the others share
+        return await asyncio.shield(task)
+
+    def _submit(self, model, system_prompt, message):
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._complete(model, system_prompt, message), loop)
+
+    def complete(self, message, system_prompt=CHAT_SYSTEM_PROMPT, model=CHAT_MODEL):
+        """Blocking completion for WSGI views and worker threads."""
+        future = self._submit(model, system_prompt, message)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def acomplete(self, message, system_prompt=CHAT_SYSTEM_PROMPT, model=CHAT_MODEL):
+        """Awaitable completion for the ASGI app; works from any event loop."""
+        return await asyncio.wait_for(
+            asyncio.wrap_future(self._submit(model, system_prompt, message)),
+            timeout=self.timeout
+        )
+
+    def stream(self, message, system_prompt=CHAT_SYSTEM_PROMPT, model=CHAT_MODEL):
+        """Blocking iterator of text deltas; closing it early cancels the upstream stream."""
+        events = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._relay_stream(model, system_prompt, message, events.put), self._ensure_loop()
+        )
+        try:
+            while True:
+                try:
+                    kind, value = events.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No completion tokens received for {self.timeout}s")
+                if kind == "delta":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    async def astream(self, message, system_prompt=CHAT_SYSTEM_PROMPT, model=CHAT_MODEL):
+        """Async iterator of text deltas for the ASGI app; cancelling it cancels the upstream stream."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._relay_stream(model, system_prompt, message,
+                               lambda event: loop.call_soon_threadsafe(events.put_nowait, event)),
+            self._ensure_loop()
+        )
+        try:
+            while True:
+                kind, value = await asyncio.wait_for(events.get(), timeout=self.timeout)
+                if kind == "delta":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "streams": self.streams,
+            "failures": self.failures,
+        }
+
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+chat_service = ChatCompletionService(
+    max_concurrent=get_config().AI_MAX_CONCURRENT_CALLS,
+    timeout=get_config().AI_REQUEST_TIMEOUT,
+)
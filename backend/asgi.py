@@ -0,0 +1,230 @@
+"""ASGI entry point.
+
+POST /api/claude and /api/claude/stream are served natively on the event
+loop, so a chat waiting on the model holds no worker thread; every other
+route runs the Flask app through asgiref's WSGI adapter. The native routes
+draw from the same "ai" rate limit budget as their Flask twins.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from flask_jwt_extended import decode_token
+
+from ai_client import chat_service, sse_event
+from config import cors_allow_origin
+import metrics
+import rate_limits
+from resilience import CircuitOpenError
+from server import create_app
+
+logger = logging.getLogger(__name__)
+
+app = create_app()
+flask_app = WsgiToAsgi(app)
+
+
+def _cors_headers(scope):
+    """The headers Flask-CORS would add for this Origin (see config.cors_policy)."""
+    origin = dict(scope['headers']).get(b'origin', b'').decode('latin-1')
+    allowed = cors_allow_origin(origin) if origin else None
+    if allowed is None:
+        return []
+    if allowed == "*":
+        return [(b'access-control-allow-origin', b'*')]
+    return [
+        (b'access-control-allow-origin', allowed.encode('latin-1')),
+        (b'access-control-allow-credentials', b'true'),
+        (b'vary', b'Origin'),
+    ]
+
+
+async def _send_json(scope, send, payload, status, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            *headers,
+            *_cors_headers(scope),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def claude_chat(scope, receive, send):
+    """Async twin of server.claude_chat."""
+    body = await _read_body(receive)
+    if body is None:
+        return
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        await _send_json(scope, send, {"error": "Invalid JSON body"}, 400)
+        return
+
+    user_message = data.get('message') if isinstance(data, dict) else None
+    if not user_message:
+        await _send_json(scope, send, {"error": "No message provided"}, 400)
+        return
+
+    try:
+        ai_reply = await chat_service.acomplete(user_message)
+    except CircuitOpenError as e:
+        logger.warning(f"claude_chat rejected: {str(e)}")
+        await _send_json(scope, send, {"error": "The assistant is temporarily unavailable, please try again shortly"}, 503,
+                         headers=[(b'retry-after', str(max(1, round(e.retry_after))).encode('ascii'))])
+        return
+    except Exception as e:
+        logger.error(f"Error in claude_chat: {str(e)}")
+        await _send_json(scope, send, {"error": str(e)}, 500)
+        return
+    await _send_json(scope, send, {"reply": ai_reply}, 200)
+
+
+async def _relay_chat_stream(send, user_message):
+    parts = []
+    try:
+        async for delta in chat_service.astream(user_message):
+            parts.append(delta)
+            await send({'type': 'http.response.body', 'body': sse_event({"text": delta}, event="delta").encode('utf-8'), 'more_body': True})
+    except Exception as e:
+        logger.error(f"Error in claude_chat_stream: {str(e)}")
+        final = sse_event({"error": "Failed to generate a reply"}, event="error")
+    else:
+        final = sse_event({"reply": "".join(parts)}, event="done")
+    await send({'type': 'http.response.body', 'body': final.encode('utf-8')})
+
+
+async def _cancel_on_disconnect(receive, task):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            task.cancel()
+            return
+
+
+async def claude_chat_stream(scope, receive, send):
+    """Async twin of server.claude_chat_stream; a client disconnect cancels the upstream stream."""
+    body = await _read_body(receive)
+    if body is None:
+        return
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        await _send_json(scope, send, {"error": "Invalid JSON body"}, 400)
+        return
+
+    user_message = data.get('message') if isinstance(data, dict) else None
+    if not user_message:
+        await _send_json(scope, send, {"error": "No message provided"}, 400)
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            *_cors_headers(scope),
+        ],
+    })
+    relay = asyncio.ensure_future(_relay_chat_stream(send, user_message))
+    watcher = asyncio.ensure_future(_cancel_on_disconnect(receive, relay))
+    try:
+        await relay
+    except asyncio.CancelledError:
+        logger.info("Chat stream client disconnected, upstream stream cancelled")
+    finally:
+        watcher.cancel()
+
+
+def _rate_limit_key(scope):
+    """Same identity as rate_limits.identity_key: the JWT subject, else the client address."""
+    authorization = dict(scope['headers']).get(b'authorization', b'').decode('latin-1')
+    if authorization.startswith('Bearer '):
+        try:
+            with app.app_context():
+                payload = decode_token(authorization[len('Bearer '):])
+            if payload.get('type') == 'access':
+                return f"user:{payload['sub']}"
+        except Exception:
+            pass
+    client = scope.get('client')
+    return f"ip:{client[0] if client else '127.0.0.1'}"
+
+
+async def _check_rate_limit(scope, send):
+    """Send a 429 and return False if the caller is over the "ai" cost class."""
+    key = _rate_limit_key(scope)
+    # Storage may be a network round trip (Redis); keep it off the event loop
+    retry_after = await asyncio.get_running_loop().run_in_executor(None, rate_limits.hit, 'ai', key)
+    if retry_after is None:
+        return True
+    await _send_json(scope, send, {"error": "Rate limit exceeded"}, 429,
+                     headers=[(b'retry-after', str(retry_after).encode('ascii'))])
+    return False
+
+
+async def _timed(scope, receive, send):
+    """Serve a native route, recording its latency like metrics._record_request does for Flask routes."""
+    started = time.perf_counter()
+    status = None
+
+    async def send_and_capture(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        await send(message)
+
+    try:
+        if await _check_rate_limit(scope, send_and_capture):
+            await NATIVE_ROUTES[scope['path']](scope, receive, send_and_capture)
+    finally:
+        if status is not None:
+            metrics.observe_request(scope['method'], scope['path'], status, time.perf_counter() - started)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            metrics.mark_process_dead(os.getpid())
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+NATIVE_ROUTES = {
+    '/api/claude': claude_chat,
+    '/api/claude/stream': claude_chat_stream,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] in NATIVE_ROUTES:
+        await _timed(scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
@@ -0,0 +1,166 @@
+import logging
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Read size used when piping audio through ffmpeg
+PIPE_CHUNK_SIZE = 64 * 1024
+
+# Whisper only needs 16 kHz mono; Opus in Ogg is among the formats the API accepts
+OUTPUT_FILENAME_SUFFIX = '.ogg'
+OUTPUT_CONTENT_TYPE = 'audio/ogg'
+
+# MP4-family containers may keep their index at the end of the file, so ffmpeg needs to seek
+SEEKABLE_INPUT_TYPES = {'audio/mp4', 'audio/m4a', 'audio/x-m4a', 'video/mp4', 'video/quicktime'}
+
+
+class PreprocessError(Exception):
+    """ffmpeg failed, timed out or produced no audio."""
+
+
+def ffmpeg_command(source='pipe:0'):
+    """Decode, downmix to mono, resample to 16 kHz, trim edge silence and encode to Opus."""
+    conf = get_config()
+    threshold = f"{conf.AUDIO_SILENCE_THRESHOLD_DB}dB"
+    # silenceremove only trims the start; reversing around it trims the end as well
+    trim = f"silenceremove=start_periods=1:start_silence=0.1:start_threshold={threshold}"
+    command = [conf.FFMPEG_PATH, '-hide_banner', '-loglevel', 'error']
+    if source != 'pipe:0':
+        command.append('-nostdin')
+    return command + [
+        '-i', source,
+        '-vn', '-ac', '1', '-ar', '16000',
+        # areverse buffers the whole clip, but at 16 kHz mono that is ~64 KB per second
+        '-af', f"{trim},areverse,{trim},areverse",
+        '-c:a', 'libopus', '-b:a', conf.AUDIO_OPUS_BITRATE, '-application', 'voip',
+        '-f', 'ogg', 'pipe:1',
+    ]
+
+
+def _feed(stdin, source):
+    try:
+        while True:
+            chunk = source.read(PIPE_CHUNK_SIZE)
+            if not chunk:
+                break
+            stdin.write(chunk)
+    except BrokenPipeError:
+        # ffmpeg exited early; its exit status reports why
+        pass
+    finally:
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def _run_ffmpeg(source, content_type):
+    """Pipe ``source`` through ffmpeg and return (spooled output file, size)."""
+    conf = get_config()
+    output = tempfile.SpooledTemporaryFile(max_size=conf.AUDIO_SPOOL_MAX_BYTES)
+    staged = None
+    try:
+        if content_type in SEEKABLE_INPUT_TYPES:
+            staged = tempfile.NamedTemporaryFile()
+            shutil.copyfileobj(source, staged, PIPE_CHUNK_SIZE)
+            staged.flush()
+            command = ffmpeg_command(staged.name)
+        else:
+            command = ffmpeg_command()
+
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE if staged is None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        feeder = None
+        if staged is None:
+            feeder = threading.Thread(target=_feed, args=(process.stdin, source), daemon=True)
+            feeder.start()
+        # Drain stderr concurrently so a chatty ffmpeg can't block on a full pipe
+        errors = []
+        drainer = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+        drainer.start()
+
+        timer = threading.Timer(conf.AUDIO_PREPROCESS_TIMEOUT, process.kill)
+        timer.start()
+        size = 0
+        try:
+            while True:
+                chunk = process.stdout.read(PIPE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                output.write(chunk)
+                size += len(chunk)
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            if feeder is not None:
+                feeder.join()
+            drainer.join()
+
+        if returncode != 0:
+            stderr = b''.join(errors).decode('utf-8', 'replace').strip()
+            raise PreprocessError(f"ffmpeg exited with {returncode}: {stderr[-500:] or 'killed after timeout'}")
+        if size == 0:
+            raise PreprocessError("ffmpeg produced no audio")
+        output.seek(0)
+        return output, size
+    except BaseException:
+        output.close()
+        raise
+    finally:
+        if staged is not None:
+            staged.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = get_config().AUDIO_PREPROCESS_WORKERS
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-preprocess")
+    return _executor
+
+
+_ffmpeg_available = None
+
+
+def ffmpeg_available():
+    """True if FFMPEG_PATH is on the PATH (checked once)."""
+    global _ffmpeg_available
+    if _ffmpeg_available is None:
+        path = get_config().FFMPEG_PATH
+        _ffmpeg_available = shutil.which(path) is not None
+        if not _ffmpeg_available:
+            logger.warning(f"{path} not found; audio will be transcribed without preprocessing or splitting")
+    return _ffmpeg_available
+
+
+def available():
+    """True if preprocessing is enabled and ffmpeg is on the PATH."""
+    return get_config().AUDIO_PREPROCESS_ENABLED and ffmpeg_available()
+
+
+def preprocess(source, content_type=None):
+    """Convert a readable file or buffer to compact 16 kHz mono Opus.
+
+    Runs in the AUDIO_PREPROCESS_WORKERS pool, which bounds the number of
+    concurrent ffmpeg processes. ``source`` is read from its current
+    position. Returns (spooled output file, size). Raises PreprocessError.
+    """
+    return _get_executor().submit(_run_ffmpeg, source, content_type).result()
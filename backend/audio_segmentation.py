@@ -0,0 +1,244 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_preprocessing import PIPE_CHUNK_SIZE, PreprocessError, ffmpeg_available
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+CHUNK_FILENAME_SUFFIX = '.ogg'
+CHUNK_CONTENT_TYPE = 'audio/ogg'
+
+# Longest run of words compared when removing text repeated across a chunk boundary
+MAX_OVERLAP_WORDS = 40
+MIN_SINGLE_OVERLAP_CHARS = 4
+
+# Largest possible Ogg page; the last one holds the stream's final granule position
+OGG_PAGE_MAX_BYTES = 65307
+OPUS_GRANULE_RATE = 48000
+
+# ffprobe only needs the container header to report a duration
+PROBE_BYTES = 1024 * 1024
+
+_DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+_TIME_RE = re.compile(r'time=(\d+):(\d+):(\d+(?:\.\d+)?)')
+_SILENCE_START_RE = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+_SILENCE_END_RE = re.compile(r'silence_end: (\d+(?:\.\d+)?)')
+
+
+def _seconds(match):
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def available():
+    """True if splitting is enabled and ffmpeg is on the PATH."""
+    return get_config().TRANSCRIPTION_SEGMENT_ENABLED and ffmpeg_available()
+
+
+def ogg_opus_duration(file):
+    """Duration of an Ogg Opus file from its first and last pages, or None if it isn't one.
+
+    Reads the OpusHead header and at most one page from the end, so the
+    cost does not grow with the length of the recording.
+    """
+    file.seek(0)
+    head = file.read(512)
+    if len(head) < 28 or head[:4] != b'OggS':
+        return None
+    body = 27 + head[26]
+    if head[body:body + 8] != b'OpusHead':
+        return None
+    pre_skip = int.from_bytes(head[body + 10:body + 12], 'little')
+
+    file.seek(0, os.SEEK_END)
+    file.seek(max(0, file.tell() - OGG_PAGE_MAX_BYTES))
+    tail = file.read()
+    last = tail.rfind(b'OggS')
+    if last < 0 or len(tail) < last + 14:
+        return None
+    granule = int.from_bytes(tail[last + 6:last + 14], 'little', signed=True)
+    if granule < 0:
+        return None
+    return max(0.0, (granule - pre_skip) / OPUS_GRANULE_RATE)
+
+
+def probe_duration(file):
+    """Container duration that ffprobe reads from the first PROBE_BYTES of ``file``, or None."""
+    conf = get_config()
+    file.seek(0)
+    try:
+        result = subprocess.run(
+            [conf.FFPROBE_PATH, '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', '-i', 'pipe:0'],
+            input=file.read(PROBE_BYTES), capture_output=True, timeout=conf.AUDIO_PREPROCESS_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"ffprobe failed: {e}")
+        return None
+    try:
+        return float(result.stdout.decode('ascii', 'replace').strip())
+    except ValueError:
+        return None
+
+
+def estimate_duration(file, content_type):
+    """Duration in seconds without decoding the audio, or None if it can't be read cheaply."""
+    duration = ogg_opus_duration(file) if content_type == CHUNK_CONTENT_TYPE else None
+    if duration is None:
+        duration = probe_duration(file)
+    file.seek(0)
+    return duration
+
+
+def stage_to_file(source):
+    """Copy a readable file or buffer to a named temp file that ffmpeg can seek in."""
+    staged = tempfile.NamedTemporaryFile(suffix='.audio')
+    try:
+        shutil.copyfileobj(source, staged, PIPE_CHUNK_SIZE)
+        staged.flush()
+    except BaseException:
+        staged.close()
+        raise
+    return staged
+
+
+def analyze(path):
+    """Return (duration, silences) for an audio file; silences are (start, end) pairs in seconds."""
+    conf = get_config()
+    result = subprocess.run(
+        [conf.FFMPEG_PATH, '-hide_banner', '-nostdin', '-i', path,
+         '-af', f"silencedetect=noise={conf.AUDIO_PAUSE_THRESHOLD_DB}dB:d={conf.AUDIO_PAUSE_MIN_SECONDS}",
+         '-f', 'null', '-'],
+        capture_output=True, timeout=conf.AUDIO_PREPROCESS_TIMEOUT,
+    )
+    log = result.stderr.decode('utf-8', 'replace')
+    if result.returncode != 0:
+        raise PreprocessError(f"silence detection exited with {result.returncode}: {log.strip()[-500:]}")
+
+    duration = _DURATION_RE.search(log)
+    if duration:
+        duration = _seconds(duration)
+    else:
+        # Streams without a container duration: use the last progress timestamp
+        times = list(_TIME_RE.finditer(log))
+        duration = _seconds(times[-1]) if times else 0.0
+
+    starts = [max(0.0, float(m.group(1))) for m in _SILENCE_START_RE.finditer(log)]
+    ends = [float(m.group(1)) for m in _SILENCE_END_RE.finditer(log)]
+    # A recording that ends in silence has a start without an end
+    ends += [duration] * (len(starts) - len(ends))
+    return duration, list(zip(starts, ends))
+
+
+def plan_chunks(duration, silences, target, maximum, overlap):
+    """Split [0, duration] into (start, end) chunks of about ``target`` seconds.
+
+    Each cut is placed in the middle of the pause nearest ``target``
+    seconds into the chunk, as long as the chunk stays between target/2 and
+    ``maximum`` seconds; with no pause in range the chunk is cut hard at
+    ``maximum``. Every chunk after the first starts ``overlap`` seconds
+    before the previous cut, so a word straddling a hard cut is heard whole
+    by one of the two requests.
+    """
+    pauses = [(start + end) / 2 for start, end in silences]
+    cuts = []
+    position = 0.0
+    while duration - position > maximum:
+        lowest, highest = position + target / 2, position + maximum
+        candidates = [p for p in pauses if lowest <= p <= highest]
+        cut = min(candidates, key=lambda p: abs(p - (position + target))) if candidates else highest
+        cuts.append(cut)
+        position = cut
+
+    chunks = []
+    start = 0.0
+    for cut in cuts + [duration]:
+        chunks.append((max(0.0, start - overlap) if chunks else 0.0, cut))
+        start = cut
+    return chunks
+
+
+def extract_chunk(path, start, end, copy=False):
+    """Cut [start, end) of an audio file into Ogg; return (spooled file, size).
+
+    With ``copy`` the source is already Ogg (normally the preprocessed
+    Opus) and its packets are copied as they are; otherwise the slice is
+    encoded to 16 kHz mono Opus.
+    """
+    conf = get_config()
+    if copy:
+        codec = ['-c:a', 'copy']
+    else:
+        codec = ['-ac', '1', '-ar', '16000',
+                 '-c:a', 'libopus', '-b:a', conf.AUDIO_OPUS_BITRATE, '-application', 'voip']
+    result = subprocess.run(
+        [conf.FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-nostdin',
+         '-ss', f"{start:.3f}", '-i', path, '-t', f"{end - start:.3f}",
+         '-vn', *codec, '-f', 'ogg', 'pipe:1'],
+        capture_output=True, timeout=conf.AUDIO_PREPROCESS_TIMEOUT,
+    )
+    if result.returncode != 0 or not result.stdout:
+        stderr = result.stderr.decode('utf-8', 'replace').strip()
+        raise PreprocessError(f"chunk {start:.1f}-{end:.1f}s extraction failed: {stderr[-500:] or 'no audio'}")
+    output = tempfile.SpooledTemporaryFile(max_size=conf.AUDIO_SPOOL_MAX_BYTES)
+    output.write(result.stdout)
+    output.seek(0)
+    return output, len(result.stdout)
+
+
+def _normalize(word):
+    return re.sub(r'[^\w]', '', word).casefold()
+
+
+def merge_overlap(previous, text, max_words=MAX_OVERLAP_WORDS):
+    """Drop the leading words of ``text`` that repeat the trailing words of ``previous``.
+
+    Matches are compared ignoring case and punctuation. A one-word match
+    only counts for words of MIN_SINGLE_OVERLAP_CHARS or more, so short
+    words genuinely said twice ("the the") are left alone.
+    """
+    words = text.split()
+    tail = [_normalize(w) for w in previous.split()[-max_words:]]
+    head = [_normalize(w) for w in words[:max_words]]
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size] and (size > 1 or len(head[0]) >= MIN_SINGLE_OVERLAP_CHARS):
+            return " ".join(words[size:])
+    return text
+
+
+def stitch(texts):
+    """Join chunk transcripts in order, removing text repeated across each boundary."""
+    transcript = ""
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        if transcript:
+            text = merge_overlap(transcript, text)
+            if text:
+                transcript += " " + text
+        else:
+            transcript = text
+    return transcript
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool that transcribes chunks, bounded by TRANSCRIPTION_CHUNK_CONCURRENCY."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = get_config().TRANSCRIPTION_CHUNK_CONCURRENCY
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcription-chunk")
+    return _executor
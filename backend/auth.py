@@ -0,0 +1,205 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+from config import get_config
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# bcrypt only looks at the first 72 bytes; longer passwords are rejected at signup
+MAX_PASSWORD_BYTES = 72
+
+
+class AuthBusyError(Exception):
+    """Raised when the password hashing pool has no room for another job."""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        # Malformed stored hash or over-long password
+        return False
+
+
+def hash_rounds(hashed):
+    """Work factor encoded in a bcrypt hash ($2b$<rounds>$...), or None if unparseable."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _pool_context():
+    """Start method for the bcrypt workers.
+
+    The pool is created lazily on a request thread, so fork would copy a
+    process whose other threads may hold locks (logging, the DB pool) into
+    children that then deadlock. forkserver forks from a clean,
+    single-threaded helper instead. Only bcrypt is preloaded there, not
+    __main__, so the helper doesn't import main.py and build an app.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['bcrypt'])
+    return context
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool.
+
+    bcrypt is deliberately CPU-heavy; on request threads it holds a core
+    for the whole hash and queues up behind other logins. A separate pool
+    keeps that work off the threads serving I/O-bound routes. At most
+    ``max_pending`` jobs may be queued or running; beyond that callers get
+    AuthBusyError after ``queue_timeout`` seconds instead of piling up.
+    """
+
+    def __init__(self, workers, max_pending, queue_timeout, rounds):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+        return self._pool
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise AuthBusyError("Password hashing pool is saturated")
+        started = time.monotonic()
+        try:
+            return self._get_pool().submit(func, *args).result()
+        except BrokenProcessPool:
+            # A worker died; build a fresh pool for the next caller
+            with self._lock:
+                self._pool = None
+            raise
+        finally:
+            self._slots.release()
+            self.jobs += 1
+            self.total_seconds += time.monotonic() - started
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password, hashed):
+        """Return (matches, needs_rehash); needs_rehash is True when the hash uses fewer rounds than configured."""
+        if not self._run(_check, password, hashed):
+            return False, False
+        rounds = hash_rounds(hashed)
+        return True, rounds is None or rounds < self.rounds
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "max_pending": self.max_pending,
+            "jobs": self.jobs,
+            "rejected": self.rejected,
+            "avg_seconds": round(self.total_seconds / self.jobs, 4) if self.jobs else None,
+        }
+
+
+class LocalBlocklist:
+    """In-process revoked-token set; each worker process keeps its own entries."""
+
+    def __init__(self, maxsize=100000):
+        self._entries = TTLCache(maxsize=maxsize)
+
+    def add(self, jti, ttl):
+        self._entries.set(jti, True, ttl=ttl)
+
+    def contains(self, jti):
+        return self._entries.get(jti) is not None
+
+
+class RedisBlocklist:
+    """Shared revoked-token set so a logout on one worker applies on every worker."""
+
+    def __init__(self, url, prefix='revoked-token'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def add(self, jti, ttl):
+        self._redis.set(f"{self._prefix}:{jti}", 1, ex=max(1, int(ttl)))
+
+    def contains(self, jti):
+        return bool(self._redis.exists(f"{self._prefix}:{jti}"))
+
+
+def _create_blocklist():
+    conf = get_config()
+    if conf.TOKEN_BLOCKLIST_URL:
+        try:
+            return RedisBlocklist(conf.TOKEN_BLOCKLIST_URL)
+        except Exception as e:
+            logger.warning(f"Shared token blocklist unavailable ({e}), using in-process blocklist")
+    return LocalBlocklist()
+
+
+_blocklist = None
+_blocklist_lock = threading.Lock()
+
+
+def _get_blocklist():
+    global _blocklist
+    if _blocklist is None:
+        with _blocklist_lock:
+            if _blocklist is None:
+                _blocklist = _create_blocklist()
+    return _blocklist
+
+
+def revoke_token(payload):
+    """Revoke a decoded JWT until it would have expired anyway."""
+    ttl = payload['exp'] - time.time() if 'exp' in payload else get_config().JWT_REFRESH_TOKEN_EXPIRES.total_seconds()
+    if ttl > 0:
+        _get_blocklist().add(payload['jti'], ttl)
+
+
+def is_token_revoked(payload):
+    """One key lookup per authenticated request; entries expire with the token."""
+    try:
+        return _get_blocklist().contains(payload['jti'])
+    except Exception as e:
+        # Fail open: an unreachable blocklist shouldn't log every user out
+        logger.error(f"Token blocklist lookup failed: {e}")
+        return False
+
+
+def _default_workers():
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+password_hasher = PasswordHasher(
+    workers=get_config().BCRYPT_WORKERS or _default_workers(),
+    max_pending=get_config().BCRYPT_MAX_PENDING,
+    queue_timeout=get_config().BCRYPT_QUEUE_TIMEOUT,
+    rounds=get_config().BCRYPT_ROUNDS,
+)
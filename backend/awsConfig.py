@@ -1,7 +1,18 @@
-import boto3
+import base64
+import hashlib
+import logging
+import math
 import os
+import uuid
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from dotenv import load_dotenv
+from clients import get_s3_client
+from config import get_config
+from upload_registry import STAGING_PREFIX, record_upload, upload_exists
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -12,25 +23,237 @@ AWS_SECRET_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_BUCKET_NAME = os.getenv('AWS_BUCKET_NAME', 'one-piece-store')
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-2')
 
-# Create an S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY,
-    region_name=AWS_REGION
+
+# Multipart, multi-threaded transfers for server-side uploads
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=get_config().S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=get_config().S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=get_config().S3_MAX_CONCURRENCY,
+    use_threads=True
 )
 
-def upload_to_s3(file, bucket_name, object_name=None):
-    """Upload a file to an S3 bucket."""
-    if object_name is None:
-        object_name = file.filename
+HASH_CHUNK_SIZE = 1024 * 1024
+
+SHA256_HEX_LENGTH = 64
+
+
+class UploadRejected(ValueError):
+    """A direct upload cannot be completed: bad or foreign token, or content not matching its sha256."""
+
+
+def content_key(sha256, filename):
+    """Content-addressed object key: identical files map to the same key."""
+    extension = os.path.splitext(filename or '')[1].lower()
+    return f"uploads/{sha256}{extension}"
+
+def _staging_key(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    return f"{STAGING_PREFIX}{uuid.uuid4().hex}{extension}"
 
+def _upload_tokens():
+    # Signed, so complete/abort only accept uploads that presign_upload issued
+    return URLSafeTimedSerializer(get_config().SECRET_KEY, salt='direct-upload')
+
+def _load_upload_token(token, user_id):
+    """Decode an upload token; only the JWT subject that presigned it may use it."""
+    if not token or user_id is None:
+        raise UploadRejected("An upload token and a signed-in user are required")
+    try:
+        # Parts may be uploaded until the last presigned URL expires, then completed
+        intent = _upload_tokens().loads(token or '', max_age=2 * get_config().S3_PRESIGN_EXPIRES)
+    except BadSignature:
+        raise UploadRejected("Upload token is invalid or expired")
+    if intent.get("user") is None or intent["user"] != str(user_id):
+        raise UploadRejected("Upload was not issued to this user")
+    return intent
+
+def hash_file(file):
+    """Return the sha256 hex digest of a file-like object and rewind it."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+def upload_to_s3(file, bucket_name, object_name=None, user_id=None):
+    """Upload a file to an S3 bucket and register it in the uploads table.
+
+    Without an explicit ``object_name`` the key is derived from the file's
+    sha256, and a file that is already registered is not uploaded again.
+    """
     try:
-        s3_client.upload_fileobj(file, bucket_name, object_name)
-        return f"File uploaded successfully to {bucket_name}/{object_name}"
+        if object_name is None:
+            object_name = content_key(hash_file(file.stream), file.filename)
+            if upload_exists(object_name):
+                return f"File uploaded successfully to {bucket_name}/{object_name} (already stored)"
+
+        file.stream.seek(0, os.SEEK_END)
+        size = file.stream.tell()
+        file.stream.seek(0)
+
+        get_s3_client().upload_fileobj(
+            file.stream, bucket_name, object_name,
+            ExtraArgs={'ContentType': file.content_type} if file.content_type else None,
+            Config=TRANSFER_CONFIG
+        )
     except NoCredentialsError:
         return "Credentials not available"
     except PartialCredentialsError:
         return "Incomplete credentials provided"
     except Exception as e:
         return f"An error occurred: {e}"
+
+    try:
+        record_upload(object_name, size, file.content_type, user_id)
+    except Exception as e:
+        # The object is in S3; reconciliation will register it later
+        logger.error(f"Failed to register upload {object_name}: {e}")
+    return f"File uploaded successfully to {bucket_name}/{object_name}"
+
+def presign_upload(bucket_name, filename, content_type, size, user_id, sha256=None):
+    """Return what a client needs to upload directly to S3.
+
+    Files below the multipart threshold get a presigned POST; larger files
+    get a multipart upload with one presigned URL per part. When the client
+    supplies the file's sha256 the key is content-addressed, and a file that
+    is already registered is reported as existing instead.
+
+    The claimed sha256 is enforced: the POST policy carries it as an
+    x-amz-checksum-sha256 condition, and multipart uploads go to a staging
+    key that complete_upload hashes before copying it to the content key.
+    The returned ``upload_token`` must be passed to complete/abort by the
+    same user.
+    """
+    conf = get_config()
+    if size <= 0 or size > conf.MAX_UPLOAD_BYTES:
+        raise ValueError(f"File size must be between 1 and {conf.MAX_UPLOAD_BYTES} bytes")
+
+    if sha256:
+        sha256 = sha256.lower()
+        if len(sha256) != SHA256_HEX_LENGTH or any(c not in '0123456789abcdef' for c in sha256):
+            raise ValueError("sha256 must be a hex SHA-256 digest")
+        key = content_key(sha256, filename)
+        if upload_exists(key):
+            return {"exists": True, "key": key}
+    else:
+        key = content_key(uuid.uuid4().hex, filename)
+
+    intent = {"key": key, "sha256": sha256 or None, "staging": None, "upload_id": None, "user": str(user_id)}
+
+    if size < conf.S3_MULTIPART_THRESHOLD:
+        fields = {"Content-Type": content_type}
+        conditions = [{"Content-Type": content_type}, ["content-length-range", size, size]]
+        if sha256:
+            checksum = base64.b64encode(bytes.fromhex(sha256)).decode('ascii')
+            fields["x-amz-checksum-sha256"] = checksum
+            conditions.append({"x-amz-checksum-sha256": checksum})
+        post = get_s3_client().generate_presigned_post(
+            Bucket=bucket_name,
+            Key=key,
+            Fields=fields,
+            Conditions=conditions,
+            ExpiresIn=conf.S3_PRESIGN_EXPIRES
+        )
+        return {
+            "exists": False,
+            "key": key,
+            "method": "post",
+            "url": post["url"],
+            "fields": post["fields"],
+            "upload_token": _upload_tokens().dumps(intent)
+        }
+
+    if sha256:
+        # Multipart objects have no whole-file SHA-256 checksum; verify before exposing the content key
+        intent["staging"] = _staging_key(filename)
+    upload_key = intent["staging"] or key
+    upload = get_s3_client().create_multipart_upload(Bucket=bucket_name, Key=upload_key, ContentType=content_type)
+    intent["upload_id"] = upload["UploadId"]
+    part_size = conf.S3_MULTIPART_CHUNKSIZE
+    parts = [
+        {
+            "part_number": number,
+            "url": get_s3_client().generate_presigned_url(
+                'upload_part',
+                Params={"Bucket": bucket_name, "Key": upload_key, "UploadId": upload["UploadId"], "PartNumber": number},
+                ExpiresIn=conf.S3_PRESIGN_EXPIRES
+            )
+        }
+        for number in range(1, math.ceil(size / part_size) + 1)
+    ]
+    return {
+        "exists": False,
+        "key": key,
+        "method": "multipart",
+        "upload_id": upload["UploadId"],
+        "part_size": part_size,
+        "parts": parts,
+        "upload_token": _upload_tokens().dumps(intent)
+    }
+
+def stored_sha256(bucket_name, key):
+    """Return the sha256 hex digest of an S3 object, from its checksum if S3 has one, else by reading it."""
+    head = get_s3_client().head_object(Bucket=bucket_name, Key=key, ChecksumMode='ENABLED')
+    checksum = head.get("ChecksumSHA256")
+    # Multipart checksums are checksums of part checksums ("...-N"), not of the content
+    if checksum and '-' not in checksum:
+        return base64.b64decode(checksum).hex()
+    digest = hashlib.sha256()
+    body = get_s3_client().get_object(Bucket=bucket_name, Key=key)["Body"]
+    try:
+        for chunk in body.iter_chunks(chunk_size=HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    finally:
+        body.close()
+    return digest.hexdigest()
+
+def complete_upload(bucket_name, upload_token, user_id, parts=None):
+    """Finish a direct upload issued by presign_upload, verify its content hash and register the object.
+
+    Raises UploadRejected if the token was not issued to ``user_id`` or the
+    content does not match the sha256 the key was derived from; the
+    mismatching object is deleted.
+    """
+    intent = _load_upload_token(upload_token, user_id)
+    key = intent["key"]
+    upload_key = intent["staging"] or key
+    if intent["upload_id"]:
+        if not parts:
+            raise UploadRejected("parts are required to complete a multipart upload")
+        get_s3_client().complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=upload_key,
+            UploadId=intent["upload_id"],
+            MultipartUpload={"Parts": [
+                {"PartNumber": int(part["part_number"]), "ETag": part["etag"]}
+                for part in sorted(parts, key=lambda part: int(part["part_number"]))
+            ]}
+        )
+
+    if intent["sha256"]:
+        actual = stored_sha256(bucket_name, upload_key)
+        if actual != intent["sha256"]:
+            get_s3_client().delete_object(Bucket=bucket_name, Key=upload_key)
+            logger.warning(f"Rejected upload to {key}: content sha256 {actual} does not match")
+            raise UploadRejected("Uploaded content does not match its sha256")
+        if intent["staging"]:
+            if not upload_exists(key):
+                get_s3_client().copy(
+                    {"Bucket": bucket_name, "Key": upload_key}, bucket_name, key, Config=TRANSFER_CONFIG
+                )
+            get_s3_client().delete_object(Bucket=bucket_name, Key=upload_key)
+
+    head = get_s3_client().head_object(Bucket=bucket_name, Key=key)
+    record_upload(key, head["ContentLength"], head.get("ContentType"), user_id)
+    head["Key"] = key
+    return head
+
+def abort_upload(bucket_name, upload_token, user_id):
+    """Abort a multipart upload issued by presign_upload so its parts stop accruing storage."""
+    intent = _load_upload_token(upload_token, user_id)
+    if not intent["upload_id"]:
+        raise UploadRejected("Only multipart uploads can be aborted")
+    get_s3_client().abort_multipart_upload(
+        Bucket=bucket_name, Key=intent["staging"] or intent["key"], UploadId=intent["upload_id"]
+    )
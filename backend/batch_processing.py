@@ -0,0 +1,125 @@
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from awsConfig import AWS_BUCKET_NAME
+from clients import get_s3_client
+from config import get_config
+from db_pool import db_cursor
+from response_cache import invalidate
+from rollups import adjust_rollup
+from voice_pipeline import ProviderLimits, StageError, run_stages
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.mp4', '.mpeg', '.mpga', '.ogg', '.webm', '.flac')
+
+# Rows per INSERT statement, to stay well under max_allowed_packet
+INSERT_CHUNK_SIZE = 500
+
+
+def keys_under_prefix(prefix, bucket=AWS_BUCKET_NAME, limit=None):
+    """Page through the bucket and return the audio keys under ``prefix``, stopping after ``limit`` keys."""
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    keys = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if obj['Key'].lower().endswith(AUDIO_EXTENSIONS):
+                keys.append(obj['Key'])
+                if limit is not None and len(keys) >= limit:
+                    return keys
+    return keys
+
+
+def _process_item(key, limits):
+    started = time.monotonic()
+    try:
+        transcript, ai_response = run_stages(key, limits)
+        result = {"key": key, "status": "completed", "transcript": transcript, "response": ai_response}
+    except StageError as e:
+        logger.error(f"Batch item {key} failed during {e.stage}: {e.__cause__}")
+        result = {"key": key, "status": "failed", "transcript": e.transcript, "error": str(e)[:1000]}
+    result["duration_seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def _store_results(user_id, results):
+    """Write all results to voice_complaints with multi-row inserts."""
+    query = """
+        INSERT INTO voice_complaints (user_id, s3_file_path, transcript, ai_response, status, error_message)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    rows = [
+        (user_id, r["key"], r.get("transcript"), r.get("response"), r["status"], r.get("error"))
+        for r in results
+    ]
+    with db_cursor(commit=True) as cursor:
+        # mysql.connector rewrites executemany INSERTs into one multi-row INSERT per chunk
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            cursor.executemany(query, rows[start:start + INSERT_CHUNK_SIZE])
+        statuses = {}
+        for r in results:
+            statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+        adjust_rollup(cursor, 'voice_complaints', statuses)
+    invalidate('analytics')
+
+
+def process_batch(keys, user_id, workers=None, limits=None):
+    """Process many recordings concurrently and store them as voice complaints.
+
+    Items run on a bounded thread pool; ``limits`` caps how many calls each
+    provider (S3, transcription, chat) sees at once. Returns per-item results
+    in input order.
+    """
+    conf = get_config()
+    workers = workers or conf.BATCH_WORKERS
+    limits = limits or ProviderLimits(
+        s3=conf.BATCH_S3_CONCURRENCY,
+        transcription=conf.BATCH_TRANSCRIPTION_CONCURRENCY,
+        chat=conf.BATCH_CHAT_CONCURRENCY
+    )
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="voice-batch") as executor:
+        results = list(executor.map(lambda key: _process_item(key, limits), keys))
+
+    if results:
+        _store_results(user_id, results)
+
+    completed = sum(1 for r in results if r["status"] == "completed")
+    logger.info(f"Batch processed {len(results)} recordings: {completed} completed, {len(results) - completed} failed")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocess a backlog of voice complaint recordings.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--prefix', help="process every audio object under this S3 prefix")
+    source.add_argument('--keys-file', help="file with one S3 key per line")
+    parser.add_argument('--user-id', type=int, required=True, help="user the complaints are recorded for")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', help="write per-item results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.prefix is not None:
+        keys = keys_under_prefix(args.prefix)
+    else:
+        with open(args.keys_file) as f:
+            keys = [line.strip() for line in f if line.strip()]
+
+    logger.info(f"Processing {len(keys)} recordings")
+    results = process_batch(keys, args.user_id, workers=args.workers)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    failed = [r for r in results if r["status"] != "completed"]
+    print(f"Processed {len(results)} recordings, {len(failed)} failed")
+    for r in failed:
+        print(f"  {r['key']}: {r['error']}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,115 @@
+"""Compare bytes sent and wall time for transcription with and without audio preprocessing.
+
+For each recording, reports the original and preprocessed size and the
+ffmpeg time. With --transcribe it also times whisper-1 on both versions
+(needs OPENAI_API_KEY). Without files it synthesises a 44.1 kHz stereo WAV
+with leading and trailing silence. Run from the backend directory:
+
+    python benchmarks/audio_preprocess_benchmark.py recordings/*.wav recordings/*.m4a
+    python benchmarks/audio_preprocess_benchmark.py --seconds 60 --transcribe
+"""
+import argparse
+import io
+import json
+import math
+import mimetypes
+import os
+import struct
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_wav(seconds, silence=2.0, rate=44100):
+    """Stereo 16-bit WAV: ``silence`` s of silence, a warbling tone, then silence again."""
+    frames = bytearray()
+    total = int((seconds + 2 * silence) * rate)
+    for n in range(total):
+        t = n / rate
+        if silence <= t < silence + seconds:
+            sample = int(8000 * math.sin(2 * math.pi * (220 + 80 * math.sin(2 * math.pi * 3 * t)) * t))
+        else:
+            sample = 0
+        frames += struct.pack('<hh', sample, sample)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def transcribe(filename, data, content_type):
+    from clients import get_openai_client
+
+    started = time.perf_counter()
+    get_openai_client().audio.transcriptions.create(
+        model="whisper-1", file=(filename, io.BytesIO(data), content_type), response_format="text"
+    )
+    return round(time.perf_counter() - started, 3)
+
+
+def measure(name, data, content_type, with_transcription):
+    import audio_preprocessing
+
+    started = time.perf_counter()
+    output, size = audio_preprocessing.preprocess(io.BytesIO(data), content_type)
+    preprocess_seconds = time.perf_counter() - started
+    with output:
+        processed = output.read()
+
+    result = {
+        "file": name,
+        "original_bytes": len(data),
+        "preprocessed_bytes": size,
+        "size_ratio": round(size / len(data), 4),
+        "preprocess_seconds": round(preprocess_seconds, 3),
+    }
+    if with_transcription:
+        result["original_transcribe_seconds"] = transcribe(name, data, content_type)
+        result["preprocessed_transcribe_seconds"] = transcribe(
+            os.path.splitext(name)[0] + audio_preprocessing.OUTPUT_FILENAME_SUFFIX,
+            processed, audio_preprocessing.OUTPUT_CONTENT_TYPE,
+        )
+        result["preprocessed_total_seconds"] = round(
+            result["preprocess_seconds"] + result["preprocessed_transcribe_seconds"], 3
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help="recordings to measure; a synthetic WAV is used if omitted")
+    parser.add_argument('--seconds', type=float, default=30, help="length of the synthetic recording")
+    parser.add_argument('--transcribe', action='store_true', help="also time transcription of both versions")
+    args = parser.parse_args()
+
+    import audio_preprocessing
+
+    if not audio_preprocessing.available():
+        print("FAIL: ffmpeg not found (set FFMPEG_PATH) or AUDIO_PREPROCESS_ENABLED=false", file=sys.stderr)
+        sys.exit(1)
+
+    inputs = []
+    for path in args.files:
+        with open(path, 'rb') as f:
+            inputs.append((os.path.basename(path), f.read(), mimetypes.guess_type(path)[0] or 'application/octet-stream'))
+    if not inputs:
+        inputs.append((f"synthetic-{args.seconds:g}s.wav", synthetic_wav(args.seconds), 'audio/wav'))
+
+    results = [measure(name, data, content_type, args.transcribe) for name, data, content_type in inputs]
+    original = sum(r["original_bytes"] for r in results)
+    preprocessed = sum(r["preprocessed_bytes"] for r in results)
+    print(json.dumps({
+        "files": results,
+        "total_original_bytes": original,
+        "total_preprocessed_bytes": preprocessed,
+        "total_size_ratio": round(preprocessed / original, 4),
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+"""Local stand-ins for OpenAI, S3 and Twilio, with configurable latency and error injection.
+
+Each service is a threaded stdlib HTTP server speaking just enough of the
+real API for the backend's calls:
+
+- OpenAI: chat completions (plain and streamed), audio transcriptions, model retrieval.
+- S3 (path-style): head bucket, ListObjectsV2, put/get/head/delete object and multipart uploads.
+- Twilio: account fetch and the paged Calls list.
+
+Run from the backend directory, then export the printed variables before
+starting the server:
+
+    python benchmarks/fake_services.py --latency-ms 150 --jitter-ms 50 --error-rate 0.01
+
+MySQL has no in-process stand-in; point DB_* at a disposable server, e.g.
+``docker run -e MYSQL_ROOT_PASSWORD=bench -e MYSQL_DATABASE=clearcall -p 3307:3306 mysql:8``.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+from xml.sax.saxutils import escape
+
+DEFAULT_PORTS = {'openai': 8901, 's3': 8902, 'twilio': 8903}
+TWILIO_ACCOUNT_SID = 'ACbenchmark00000000000000000000000'
+TWILIO_PHONE_NUMBER = '+15550000000'
+
+
+class Faults:
+    """Latency and error injection shared by every request to one service."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def apply(self):
+        """Sleep for the configured latency; return an error status to send, or None."""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+        return self.error_status if failed else None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def faults(self):
+        return self.server.faults
+
+    def read_body(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                body += self.rfile.read(size)
+                self.rfile.readline()
+            body = bytes(body)
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if 'aws-chunked' in self.headers.get('Content-Encoding', ''):
+            body = _decode_aws_chunked(body)
+        return body
+
+    def send(self, status, body=b'', content_type='application/json', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_json(self, status, payload, headers=None):
+        self.send(status, json.dumps(payload), headers=headers)
+
+    def send_fault(self, status):
+        self.send_json(status, {"error": {"message": "injected fault", "type": "server_error"}})
+
+    def dispatch(self):
+        split = urlsplit(self.path)
+        self.route_path = unquote(split.path)
+        self.query = {k: v[-1] for k, v in parse_qs(split.query, keep_blank_values=True).items()}
+        status = self.faults.apply()
+        if status is not None:
+            if self.command not in ('GET', 'HEAD', 'DELETE'):
+                self.read_body()
+            self.send_fault(status)
+            return
+        self.handle_route()
+
+    do_GET = do_POST = do_PUT = do_HEAD = do_DELETE = dispatch
+
+    def handle_route(self):
+        self.send_json(404, {"error": "not found"})
+
+
+def _decode_aws_chunked(body):
+    """Strip aws-chunked framing (``<hex size>;chunk-signature=...\\r\\n<data>\\r\\n`` ... trailers)."""
+    out = bytearray()
+    position = 0
+    while position < len(body):
+        line_end = body.index(b'\r\n', position)
+        size = int(body[position:line_end].split(b';')[0], 16)
+        if size == 0:
+            break
+        out += body[line_end + 2:line_end + 2 + size]
+        position = line_end + 2 + size + 2
+    return bytes(out)
+
+
+class OpenAIHandler(StubHandler):
+    reply_words = 60
+    token_ms = 5
+
+    def send_fault(self, status):
+        headers = {'retry-after': '1'} if status == 429 else None
+        self.send_json(status, {"error": {"message": "injected fault", "type": "server_error", "code": None}}, headers)
+
+    def reply_text(self):
+        words = ["Thank", "you", "for", "reaching", "out", "and", "sorry", "for", "the", "trouble."]
+        return " ".join(words[i % len(words)] for i in range(self.reply_words))
+
+    def handle_route(self):
+        if self.command == 'POST' and self.route_path.endswith('/chat/completions'):
+            self.chat_completion(json.loads(self.read_body() or b'{}'))
+        elif self.command == 'POST' and self.route_path.endswith('/audio/transcriptions'):
+            audio_bytes = len(self.read_body())
+            self.send(200, f"Stub transcript of a {audio_bytes} byte recording. The customer was billed twice.\n",
+                      content_type='text/plain')
+        elif self.command == 'GET' and '/models/' in self.route_path:
+            model = self.route_path.rsplit('/', 1)[1]
+            self.send_json(200, {"id": model, "object": "model", "created": 0, "owned_by": "stub"})
+        else:
+            super().handle_route()
+
+    def chat_completion(self, request):
+        model = request.get('model', 'stub')
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        text = self.reply_text()
+        if not request.get('stream'):
+            self.send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 50, "completion_tokens": self.reply_words, "total_tokens": 50 + self.reply_words},
+            })
+            return
+
+        # No Content-Length: the stream ends when the connection closes
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for i, word in enumerate(text.split(" ")):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.token_ms / 1000)
+        final = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+
+
+class S3Handler(StubHandler):
+    objects = {}
+    uploads = {}
+    lock = threading.Lock()
+
+    def send_fault(self, status):
+        self.send(status, '<?xml version="1.0" encoding="UTF-8"?><Error><Code>ServiceUnavailable</Code>'
+                          '<Message>injected fault</Message></Error>', content_type='application/xml')
+
+    def send_xml(self, status, xml):
+        self.send(status, '<?xml version="1.0" encoding="UTF-8"?>' + xml, content_type='application/xml')
+
+    def handle_route(self):
+        bucket, _, key = self.route_path.lstrip('/').partition('/')
+        if not key:
+            if self.command == 'HEAD':
+                self.send(200)
+            elif self.command == 'GET':
+                self.list_objects(self.query.get('prefix', ''), int(self.query.get('max-keys', 1000)),
+                                  self.query.get('continuation-token') or self.query.get('start-after', ''))
+            else:
+                super().handle_route()
+            return
+
+        if self.command == 'POST' and 'uploads' in self.query:
+            upload_id = uuid.uuid4().hex
+            with self.lock:
+                self.uploads[upload_id] = {"key": key, "parts": {}, "content_type": self.headers.get('Content-Type')}
+            self.send_xml(200, f"<InitiateMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                               f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+        elif self.command == 'PUT' and 'uploadId' in self.query:
+            data = self.read_body()
+            with self.lock:
+                upload = self.uploads.get(self.query['uploadId'])
+                if upload is not None:
+                    upload["parts"][int(self.query['partNumber'])] = data
+            if upload is None:
+                self.no_such_upload()
+                return
+            self.send(200, headers={'ETag': f'"{hashlib.md5(data).hexdigest()}"'})
+        elif self.command == 'POST' and 'uploadId' in self.query:
+            self.read_body()
+            with self.lock:
+                upload = self.uploads.pop(self.query['uploadId'], None)
+            if upload is None:
+                self.no_such_upload()
+                return
+            parts = [upload["parts"][n] for n in sorted(upload["parts"])]
+            etag = f'"{hashlib.md5(b"".join(hashlib.md5(p).digest() for p in parts)).hexdigest()}-{len(parts)}"'
+            self.store(key, b''.join(parts), upload["content_type"], etag)
+            self.send_xml(200, f"<CompleteMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                               f"<ETag>{escape(etag)}</ETag></CompleteMultipartUploadResult>")
+        elif self.command == 'DELETE' and 'uploadId' in self.query:
+            with self.lock:
+                self.uploads.pop(self.query['uploadId'], None)
+            self.send(204)
+        elif self.command == 'PUT':
+            data = self.read_body()
+            etag = f'"{hashlib.md5(data).hexdigest()}"'
+            self.store(key, data, self.headers.get('Content-Type'), etag)
+            self.send(200, headers={'ETag': etag})
+        elif self.command in ('GET', 'HEAD'):
+            with self.lock:
+                obj = self.objects.get(key)
+            if obj is None:
+                if self.command == 'HEAD':
+                    self.send(404)
+                else:
+                    self.send_xml(404, f"<Error><Code>NoSuchKey</Code><Key>{escape(key)}</Key></Error>")
+                return
+            self.send(200, obj["data"], content_type=obj["content_type"] or 'binary/octet-stream', headers={
+                'ETag': obj["etag"],
+                'Last-Modified': formatdate(obj["modified"], usegmt=True),
+            })
+        elif self.command == 'DELETE':
+            with self.lock:
+                self.objects.pop(key, None)
+            self.send(204)
+        else:
+            super().handle_route()
+
+    def no_such_upload(self):
+        self.send_xml(404, "<Error><Code>NoSuchUpload</Code></Error>")
+
+    def store(self, key, data, content_type, etag):
+        with self.lock:
+            self.objects[key] = {"data": data, "content_type": content_type, "etag": etag, "modified": time.time()}
+
+    def list_objects(self, prefix, max_keys, after):
+        with self.lock:
+            keys = sorted(k for k in self.objects if k.startswith(prefix) and k > after)
+            page = [(k, self.objects[k]) for k in keys[:max_keys]]
+        truncated = len(keys) > max_keys
+        contents = "".join(
+            f"<Contents><Key>{escape(k)}</Key><Size>{len(o['data'])}</Size><ETag>{escape(o['etag'])}</ETag>"
+            f"<LastModified>{datetime.fromtimestamp(o['modified'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified>"
+            f"<StorageClass>STANDARD</StorageClass></Contents>"
+            for k, o in page
+        )
+        token = f"<NextContinuationToken>{escape(page[-1][0])}</NextContinuationToken>" if truncated and page else ""
+        self.send_xml(200, f"<ListBucketResult><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+                           f"<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+                           f"{token}{contents}</ListBucketResult>")
+
+
+class TwilioHandler(StubHandler):
+    calls = []
+
+    ACCOUNT_RE = re.compile(r'^/2010-04-01/Accounts/(\w+)\.json$')
+    CALLS_RE = re.compile(r'^/2010-04-01/Accounts/(\w+)/Calls\.json$')
+
+    def send_fault(self, status):
+        self.send_json(status, {"code": 20500, "message": "injected fault", "status": status})
+
+    def handle_route(self):
+        if self.command != 'GET':
+            super().handle_route()
+            return
+        account = self.ACCOUNT_RE.match(self.route_path)
+        calls = self.CALLS_RE.match(self.route_path)
+        if account:
+            self.send_json(200, {"sid": account.group(1), "friendly_name": "benchmark", "status": "active"})
+        elif calls:
+            self.list_calls(calls.group(1))
+        else:
+            super().handle_route()
+
+    def list_calls(self, account_sid):
+        after = self.query.get('StartTime>')
+        after = datetime.strptime(after[:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc) if after else None
+        matching = [
+            c for c in self.calls
+            if (after is None or c["_start"] > after)
+            and self.query.get('Status', c["status"]) == c["status"]
+            and self.query.get('To', c["to"]) == c["to"]
+        ]
+        page_size = int(self.query.get('PageSize', 50))
+        page = int(self.query.get('Page', 0))
+        items = matching[page * page_size:(page + 1) * page_size]
+        base = f"/2010-04-01/Accounts/{account_sid}/Calls.json"
+        next_page_uri = None
+        if (page + 1) * page_size < len(matching):
+            params = {k: v for k, v in self.query.items() if k not in ('Page', 'PageToken')}
+            params.update(Page=page + 1, PageToken=f"PA{page + 1}")
+            next_page_uri = f"{base}?{urlencode(params)}"
+        self.send_json(200, {
+            "calls": [{k: v for k, v in c.items() if not k.startswith('_')} for c in items],
+            "page": page, "page_size": page_size, "start": page * page_size,
+            "end": page * page_size + len(items) - 1, "uri": self.path,
+            "first_page_uri": f"{base}?PageSize={page_size}&Page=0", "next_page_uri": next_page_uri,
+            "previous_page_uri": None,
+        })
+
+
+def generate_calls(count, days=30):
+    """``count`` completed calls spread over the last ``days`` days, oldest first."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    calls = []
+    for i in range(count):
+        start = now - timedelta(seconds=int((count - i) * days * 86400 / max(count, 1)))
+        calls.append({
+            "sid": f"CA{hashlib.md5(str(i).encode()).hexdigest()}",
+            "account_sid": TWILIO_ACCOUNT_SID,
+            "from": f"+1555{random.randint(1000000, 9999999)}",
+            "to": TWILIO_PHONE_NUMBER,
+            "status": "completed",
+            "duration": str(random.randint(10, 900)),
+            "start_time": format_datetime(start),
+            "_start": start,
+        })
+    return calls
+
+
+def start_service(handler_class, host, port, faults):
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    server.faults = faults
+    thread = threading.Thread(target=server.serve_forever, name=f"fake-{handler_class.__name__}", daemon=True)
+    thread.start()
+    return server
+
+
+def start_all(host='127.0.0.1', ports=None, faults=None, calls=500, reply_words=60, token_ms=5):
+    """Start all three stubs in daemon threads; return ({name: server}, env overrides for the backend)."""
+    ports = dict(DEFAULT_PORTS, **(ports or {}))
+    faults = faults or {}
+    OpenAIHandler.reply_words = reply_words
+    OpenAIHandler.token_ms = token_ms
+    TwilioHandler.calls = generate_calls(calls)
+    servers = {
+        'openai': start_service(OpenAIHandler, host, ports['openai'], faults.get('openai') or Faults()),
+        's3': start_service(S3Handler, host, ports['s3'], faults.get('s3') or Faults()),
+        'twilio': start_service(TwilioHandler, host, ports['twilio'], faults.get('twilio') or Faults()),
+    }
+    env = {
+        'OPENAI_BASE_URL': f"http://{host}:{ports['openai']}/v1",
+        'OPENAI_API_KEY': 'sk-benchmark',
+        'S3_ENDPOINT_URL': f"http://{host}:{ports['s3']}",
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'AWS_BUCKET_NAME': 'benchmark-bucket',
+        'TWILIO_API_BASE_URL': f"http://{host}:{ports['twilio']}",
+        'TWILIO_ACCOUNT_SID': TWILIO_ACCOUNT_SID,
+        'TWILIO_AUTH_TOKEN': 'benchmark',
+        'TWILIO_PHONE_NUMBER': TWILIO_PHONE_NUMBER,
+    }
+    return servers, env
+
+
+def add_fault_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=0, help="added to every stub response")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="uniform +/- jitter on the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with --error-status")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--openai-latency-ms', type=float, default=None, help="override --latency-ms for OpenAI")
+    parser.add_argument('--calls', type=int, default=500, help="Twilio calls to serve")
+    parser.add_argument('--reply-words', type=int, default=60, help="words per chat completion")
+    parser.add_argument('--token-ms', type=float, default=5, help="delay between streamed chat chunks")
+
+
+def faults_from_args(args):
+    def faults(latency):
+        return Faults(latency, args.jitter_ms, args.error_rate, args.error_status)
+
+    openai_latency = args.latency_ms if args.openai_latency_ms is None else args.openai_latency_ms
+    return {'openai': faults(openai_latency), 's3': faults(args.latency_ms), 'twilio': faults(args.latency_ms)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    servers, env = start_all(args.host, faults=faults_from_args(args), calls=args.calls,
+                             reply_words=args.reply_words, token_ms=args.token_ms)
+    for name, value in env.items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Drive the API at a target concurrency and report latency percentiles and throughput as JSON.
+
+With --start-stack the fake OpenAI/S3/Twilio services (fake_services.py)
+are started in-process and the server is launched against them, with rate
+limits raised so they don't cap the run. The database comes from DB_*
+and must be a disposable MySQL: the run stops unless it is reachable and
+holds no users besides earlier load test ones, then migrates and seeds
+it. Run from the backend directory:
+
+    DB_PORT=3307 DB_PASSWORD=bench python benchmarks/load_test.py --start-stack \
+        --server uvicorn --workers 4 --concurrency 32 --seconds 60 \
+        --mix voice=1,claude=2,analytics=4,upload=1 --openai-latency-ms 800 \
+        --output benchmarks/results/baseline.json
+
+    # later, fail if p95 or throughput regressed by more than 20%
+    python benchmarks/load_test.py --start-stack ... --compare benchmarks/results/baseline.json
+
+Without --start-stack it drives an already running server at --url.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ANALYTICS_PATHS = [
+    '/api/complaint-summary',
+    '/api/resolution-rate',
+    '/api/monthly-summary',
+    '/api/human-escalations?limit=50',
+    '/api/completed-calls?limit=50',
+]
+
+# Far above any load this tool generates, so the limiter is measured but never rejects
+BENCHMARK_RATE_LIMIT = '1000000 per minute'
+
+# setup() signs up one load-<hex>@example.com user per run
+LOAD_TEST_EMAILS = 'load-%@example.com'
+
+
+def tone_wav(seconds=5, rate=16000, seed=0):
+    """A short mono WAV; ``seed`` changes the pitch so every recording has distinct content."""
+    frequency = 200 + seed % 400
+    frames = b''.join(
+        struct.pack('<h', int(6000 * math.sin(2 * math.pi * frequency * n / rate)))
+        for n in range(int(seconds * rate))
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(frames)
+    return buffer.getvalue()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, status):
+        with self.lock:
+            self.samples[name].append(seconds)
+            self.statuses[name][str(status)] += 1
+
+
+class Client:
+    """One simulated user: a requests session carrying the benchmark user's access token."""
+
+    def __init__(self, base_url, token, timeout):
+        import requests
+
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def request(self, recorder, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            response, status = None, type(e).__name__
+        recorder.record(name, time.perf_counter() - started, status)
+        return response
+
+
+def voice(client, recorder, state, wait_jobs):
+    key = random.choice(state['voice_keys'])
+    started = time.perf_counter()
+    response = client.request(recorder, 'voice_submit', 'POST', '/api/process-voice-complaint', json={'file_path': key})
+    if not wait_jobs or response is None:
+        return
+    if response.status_code == 200:
+        # Recording already processed; answered from the result cache
+        recorder.record('voice_end_to_end', time.perf_counter() - started, 'completed')
+        return
+    if response.status_code != 202:
+        return
+    status_url = response.json().get('status_url')
+    while time.perf_counter() - started < client.timeout:
+        time.sleep(0.25)
+        poll = client.session.get(client.base_url + status_url, timeout=client.timeout)
+        job_status = poll.json().get('status') if poll.ok else None
+        if job_status in ('completed', 'failed'):
+            recorder.record('voice_end_to_end', time.perf_counter() - started, job_status)
+            return
+    recorder.record('voice_end_to_end', time.perf_counter() - started, 'timeout')
+
+
+def claude(client, recorder, state, wait_jobs):
+    client.request(recorder, 'claude', 'POST', '/api/claude', json={'message': 'My bill is wrong, please help.'})
+
+
+def analytics(client, recorder, state, wait_jobs):
+    path = random.choice(ANALYTICS_PATHS)
+    client.request(recorder, 'analytics ' + path.split('?')[0], 'GET', path)
+
+
+def upload(client, recorder, state, wait_jobs):
+    data = tone_wav(seconds=1, seed=random.randint(0, 10 ** 9))
+    client.request(recorder, 'upload', 'POST', '/upload',
+                   files={'file': (f"load-{uuid.uuid4().hex}.wav", data, 'audio/wav')})
+
+
+SCENARIOS = {'voice': voice, 'claude': claude, 'analytics': analytics, 'upload': upload}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for name, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        statuses = dict(recorder.statuses[name])
+        ok = sum(count for status, count in statuses.items() if status.startswith('2') or status == 'completed')
+        endpoints[name] = {
+            "requests": len(ordered),
+            "errors": len(ordered) - ok,
+            "statuses": statuses,
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+    # voice_end_to_end spans the voice_submit request, so it isn't counted twice
+    total = sum(e["requests"] for name, e in endpoints.items() if name != 'voice_end_to_end')
+    return endpoints, round(total / elapsed, 2)
+
+
+def run_load(base_url, token, state, args):
+    recorder = Recorder()
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    warmup_end = time.monotonic() + args.warmup
+    deadline = warmup_end + args.seconds
+    measuring = threading.Event()
+
+    def worker():
+        client = Client(base_url, token, args.timeout)
+        warmup = Recorder()
+        while time.monotonic() < deadline:
+            target = recorder if measuring.is_set() else warmup
+            SCENARIOS[random.choices(names, weights)[0]](client, target, state, args.wait_jobs)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(max(0.0, warmup_end - time.monotonic()))
+    measuring.set()
+    started = time.monotonic()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - started
+
+
+def setup(base_url, args):
+    """Create the benchmark user and the recordings the voice scenario submits; return (token, state)."""
+    import requests
+
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = 'load-test-password'
+    requests.post(f"{base_url}/signup", json={
+        "name": "Load Test", "email": email, "password": password, "phone": "5550000000", "role": "admin"
+    }, timeout=args.timeout).raise_for_status()
+    login = requests.post(f"{base_url}/login", json={"email": email, "password": password}, timeout=args.timeout)
+    login.raise_for_status()
+    token = login.json()["access_token"]
+    headers = {'Authorization': f"Bearer {token}"}
+
+    voice_keys = []
+    if 'voice' in args.mix:
+        for i in range(args.voice_objects):
+            response = requests.post(f"{base_url}/upload", headers=headers, timeout=args.timeout, files={
+                'file': (f"complaint-{i}.wav", tone_wav(args.voice_seconds, seed=i), 'audio/wav')
+            })
+            response.raise_for_status()
+            voice_keys.append(response.json()["key"])
+    if args.start_stack:
+        # Fill inquiries from the fake Twilio calls list
+        requests.post(f"{base_url}/api/sync-twilio-inquiries", headers=headers, timeout=args.timeout)
+    return token, {'voice_keys': voice_keys}
+
+
+def seed_escalations(count):
+    from db_pool import db_cursor
+
+    reasons = ['billing dispute', 'technical issue', 'cancellation', 'complaint', 'other']
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [
+        (f"+1555{random.randint(1000000, 9999999)}", now - timedelta(minutes=random.randint(0, 60 * 24 * 90)),
+         random.choice(reasons))
+        for _ in range(count)
+    ]
+    with db_cursor(commit=True) as cursor:
+        cursor.executemany(
+            "INSERT INTO human_escalation (caller_number, initiated_at, reason) VALUES (%s, %s, %s)", rows
+        )
+
+
+def server_command(args):
+    bind = f"{args.host}:{args.port}"
+    if args.server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '--threads', '8',
+                '-b', bind, 'server:create_app()']
+    if args.server == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', args.host,
+                '--port', str(args.port), '--workers', str(args.workers)]
+    return [sys.executable, '-c',
+            f"from server import create_app; create_app().run(host={args.host!r}, port={args.port}, threaded=True)"]
+
+
+def wait_until_live(base_url, timeout=60):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/health/live", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout}s")
+
+
+def check_disposable_database():
+    """Exit unless DB_* reaches a database that holds nothing but earlier load test data."""
+    import mysql.connector
+    from config import get_config
+
+    conf = get_config()
+    target = f"{conf.DB_USER}@{conf.DB_HOST}:{conf.DB_PORT}/{conf.DB_NAME}"
+    try:
+        conn = mysql.connector.connect(host=conf.DB_HOST, port=conf.DB_PORT, user=conf.DB_USER,
+                                       password=conf.DB_PASSWORD, database=conf.DB_NAME, connection_timeout=5)
+    except mysql.connector.Error as e:
+        sys.exit(f"--start-stack needs a reachable, disposable MySQL database in DB_*; cannot connect to {target}: {e}")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = %s AND table_name = 'users'",
+                       (conf.DB_NAME,))
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT COUNT(*) FROM users WHERE email NOT LIKE %s", (LOAD_TEST_EMAILS,))
+            others = cursor.fetchone()[0]
+            if others:
+                sys.exit(f"{target} has {others} users the load test did not create; --start-stack migrates and "
+                         f"seeds it, so point DB_* at a disposable database")
+    finally:
+        conn.close()
+
+
+def start_stack(args):
+    """Start the fake services and the server; return (server process, base url)."""
+    import fake_services
+
+    _, stub_env = fake_services.start_all(args.host, faults=fake_services.faults_from_args(args), calls=args.calls,
+                                          reply_words=args.reply_words, token_ms=args.token_ms)
+    env = dict(os.environ, **stub_env)
+    env.update({
+        'TWILIO_SYNC_IN_PROCESS': 'false',
+        'RATELIMIT_STORAGE_URI': 'memory://',
+        'RATELIMIT_DEFAULT': BENCHMARK_RATE_LIMIT,
+        'RATELIMIT_AUTH': BENCHMARK_RATE_LIMIT,
+        'RATELIMIT_AI': BENCHMARK_RATE_LIMIT,
+        'RATELIMIT_BULK': BENCHMARK_RATE_LIMIT,
+        'RATELIMIT_STATUS': BENCHMARK_RATE_LIMIT,
+        'LOG_LEVEL': env.get('LOG_LEVEL', 'WARNING'),
+    })
+    # The seeding below runs in this process and must see the same services
+    os.environ.update(env)
+    check_disposable_database()
+    if args.server != 'werkzeug':
+        # Aggregate /metrics across the worker processes
+        env['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='load-test-metrics-')
+
+    subprocess.run([sys.executable, 'db_migrations.py'], cwd=BACKEND_DIR, env=env, check=True)
+    if args.seed_escalations:
+        seed_escalations(args.seed_escalations)
+
+    process = subprocess.Popen(server_command(args), cwd=BACKEND_DIR, env=env)
+    base_url = f"http://{args.host}:{args.port}"
+    try:
+        wait_until_live(base_url)
+    except Exception:
+        process.terminate()
+        raise
+    return process, base_url
+
+
+def compare(report, baseline, max_regression):
+    """Per-endpoint p95 and throughput change against ``baseline``; returns (rows, regressed)."""
+    rows, regressed = {}, False
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        p95_change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0.0
+        rps_change = ((current["throughput_rps"] - previous["throughput_rps"]) / previous["throughput_rps"]
+                      if previous["throughput_rps"] else 0.0)
+        bad = p95_change > max_regression or rps_change < -max_regression
+        regressed = regressed or bad
+        rows[name] = {
+            "p95_ms": [previous["p95_ms"], current["p95_ms"]],
+            "p95_change": round(p95_change, 3),
+            "throughput_rps": [previous["throughput_rps"], current["throughput_rps"]],
+            "throughput_change": round(rps_change, 3),
+            "regressed": bad,
+        }
+    return rows, regressed
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    import fake_services
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="server to drive when not using --start-stack")
+    parser.add_argument('--start-stack', action='store_true', help="start fake services and the server locally")
+    parser.add_argument('--server', choices=['werkzeug', 'gunicorn', 'uvicorn'], default='werkzeug')
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn/uvicorn worker processes")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('voice=1,claude=2,analytics=4,upload=1'),
+                        help="scenario weights, e.g. voice=1,claude=2,analytics=4,upload=1")
+    parser.add_argument('--wait-jobs', action='store_true', help="poll voice jobs and also report end-to-end latency")
+    parser.add_argument('--voice-objects', type=int, default=20, help="distinct recordings the voice scenario cycles through; repeats are served from the result cache")
+    parser.add_argument('--voice-seconds', type=float, default=5)
+    parser.add_argument('--seed-escalations', type=int, default=5000, help="human_escalation rows to insert (with --start-stack)")
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--compare', help="baseline report to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="allowed fractional p95/throughput regression")
+    fake_services.add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if args.start_stack:
+        process, base_url = start_stack(args)
+    try:
+        token, state = setup(base_url, args)
+        recorder, elapsed = run_load(base_url, token, state, args)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    endpoints, throughput = summarize(recorder, elapsed)
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "config": {
+            "url": base_url, "server": args.server if args.start_stack else None, "workers": args.workers,
+            "concurrency": args.concurrency, "seconds": args.seconds, "warmup": args.warmup,
+            "mix": args.mix, "wait_jobs": args.wait_jobs,
+            "stubs": {"latency_ms": args.latency_ms, "openai_latency_ms": args.openai_latency_ms,
+                      "jitter_ms": args.jitter_ms, "error_rate": args.error_rate} if args.start_stack else None,
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": throughput,
+        "endpoints": endpoints,
+    }
+
+    regressed = False
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"], regressed = compare(report, json.load(f), args.max_regression)
+
+    print(json.dumps(report, indent=4))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if regressed:
+        print(f"FAIL: p95 latency or throughput regressed by more than {args.max_regression:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Measure login throughput and how much password hashing slows other requests.
+
+Against a running server, N clients log in concurrently while one client
+polls /health/live; the report shows logins per second and the latency of
+both. Create the account first (POST /signup). Run from the backend
+directory:
+
+    python benchmarks/login_benchmark.py --url http://localhost:5000 \
+        --email bench@example.com --password secret --clients 16 --seconds 20
+
+Without --url it compares bcrypt on request threads with the process pool
+in auth.py, still using a thread per simulated client:
+
+    python benchmarks/login_benchmark.py --clients 16 --seconds 10 --rounds 12
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(ordered[-1] * 1000, 1)}
+
+
+def run_clients(clients, seconds, work, probe=None):
+    """Run ``work`` in ``clients`` threads (and ``probe`` in one more) until the time is up."""
+    deadline = time.monotonic() + seconds
+    latencies, probe_latencies, outcomes = [], [], Counter()
+    lock = threading.Lock()
+
+    def loop(func, sink):
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            outcome = func()
+            elapsed = time.perf_counter() - started
+            with lock:
+                sink.append(elapsed)
+                if sink is latencies:
+                    outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=loop, args=(work, latencies)) for _ in range(clients)]
+    if probe is not None:
+        threads.append(threading.Thread(target=loop, args=(probe, probe_latencies)))
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    report = {
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "requests": len(latencies),
+        "per_second": round(len(latencies) / elapsed, 2),
+        "outcomes": dict(outcomes),
+        "latency": percentiles(latencies),
+    }
+    if probe is not None:
+        report["probe_latency"] = percentiles(probe_latencies)
+        report["probe_requests"] = len(probe_latencies)
+    return report
+
+
+def http_benchmark(args):
+    import requests
+
+    session = threading.local()
+
+    def client():
+        if not hasattr(session, 'value'):
+            session.value = requests.Session()
+        return session.value
+
+    def login():
+        response = client().post(f"{args.url}/login", json={"email": args.email, "password": args.password})
+        return response.status_code
+
+    def probe():
+        return client().get(f"{args.url}/health/live").status_code
+
+    return run_clients(args.clients, args.seconds, login, probe)
+
+
+def local_benchmark(args):
+    import bcrypt
+
+    from auth import PasswordHasher, _check
+
+    stored = bcrypt.hashpw(b'benchmark-password', bcrypt.gensalt(args.rounds)).decode('utf-8')
+    spin_iterations = 20000
+
+    def spin():
+        # Stand-in for a cheap request that needs the GIL
+        total = 0
+        for i in range(spin_iterations):
+            total += i
+        return 'ok'
+
+    def inline_login():
+        return 'ok' if _check('benchmark-password', stored) else 'fail'
+
+    hasher = PasswordHasher(workers=args.workers or max(1, (os.cpu_count() or 2) // 2),
+                            max_pending=args.clients, queue_timeout=30, rounds=args.rounds)
+
+    def pooled_login():
+        return 'ok' if hasher.verify('benchmark-password', stored)[0] else 'fail'
+
+    return {
+        "rounds": args.rounds,
+        "inline": run_clients(args.clients, args.seconds, inline_login, spin),
+        "process_pool": dict(run_clients(args.clients, args.seconds, pooled_login, spin), pool=hasher.stats()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="base URL of a running server; omit to benchmark hashing in-process")
+    parser.add_argument('--email', default='bench@example.com')
+    parser.add_argument('--password', default='benchmark-password')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rounds', type=int, default=12, help="bcrypt work factor for the in-process benchmark")
+    parser.add_argument('--workers', type=int, default=0, help="hashing processes for the in-process benchmark")
+    args = parser.parse_args()
+
+    report = http_benchmark(args) if args.url else local_benchmark(args)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
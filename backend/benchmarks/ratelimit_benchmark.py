@@ -0,0 +1,130 @@
+"""Measure per-request rate limiter overhead against the configured storage.
+
+Several processes, each running a few threads, stand in for gunicorn
+workers; every thread plays one identity and checks every limit of a cost
+class the way Flask-Limiter does for a request. Separate processes matter
+for the SQLite storage: its writers contend on the file lock across
+workers, which a single process never shows. Run from the backend directory:
+
+    python benchmarks/ratelimit_benchmark.py --processes 4 --threads 2 --requests 2000 --max-ms 60
+    RATELIMIT_STORAGE_URI=redis://localhost:6379 python benchmarks/ratelimit_benchmark.py
+
+Checks that hit RATELIMIT_SQLITE_BUSY_TIMEOUT_MS raise and are let
+through by the limiter; they are counted as "failed_open". Exits non-zero
+if the p99 per-request overhead exceeds --max-ms.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_process(args, start, results):
+    """One simulated worker: ``args.threads`` clients hitting the shared storage."""
+    from limits import parse_many
+    from limits.storage import storage_from_string
+    from limits.strategies import MovingWindowRateLimiter
+
+    import rate_limits
+    from config import get_config
+
+    strategy = MovingWindowRateLimiter(storage_from_string(get_config().RATELIMIT_STORAGE_URI))
+    # Generous copies of the class limits, so the benchmark measures checks rather than rejections
+    items = [type(item)(item.amount * args.requests, item.multiples) for item in parse_many(rate_limits.COST_CLASSES[args.cost_class])]
+
+    latencies = []
+    failed = [0]
+    lock = threading.Lock()
+
+    def client(n):
+        key = f"benchmark:{os.getpid()}:{n}"
+        samples = []
+        errors = 0
+        start.wait()
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            try:
+                for item in items:
+                    strategy.hit(item, key, args.cost_class)
+            except Exception:
+                errors += 1
+            samples.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(samples)
+            failed[0] += errors
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((latencies, failed[0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4, help="worker processes sharing the storage")
+    parser.add_argument('--threads', type=int, default=2, help="client threads per process")
+    parser.add_argument('--requests', type=int, default=2000, help="requests per thread")
+    parser.add_argument('--cost-class', default='ai')
+    parser.add_argument('--max-ms', type=float, default=None, help="fail if p99 overhead exceeds this")
+    args = parser.parse_args()
+
+    from config import get_config
+
+    # spawn, so each worker opens its own storage connections like a gunicorn worker
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=run_process, args=(args, start, results)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    # Give every process time to import and connect before the clock starts
+    time.sleep(2)
+    started = time.perf_counter()
+    start.set()
+
+    latencies, failed_open = [], 0
+    for _ in processes:
+        samples, errors = results.get()
+        latencies.extend(samples)
+        failed_open += errors
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+
+    def ms(q):
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3)
+
+    config = get_config()
+    report = {
+        "storage": config.RATELIMIT_STORAGE_URI,
+        "busy_timeout_ms": config.RATELIMIT_SQLITE_BUSY_TIMEOUT_MS,
+        "cost_class": args.cost_class,
+        "processes": args.processes,
+        "threads_per_process": args.threads,
+        "requests": len(latencies),
+        "failed_open": failed_open,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": ms(0.50),
+        "p95_ms": ms(0.95),
+        "p99_ms": ms(0.99),
+        "p999_ms": ms(0.999),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+    print(json.dumps(report, indent=4))
+
+    if args.max_ms is not None and report["p99_ms"] > args.max_ms:
+        print(f"FAIL: p99 limiter overhead {report['p99_ms']}ms exceeds {args.max_ms}ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
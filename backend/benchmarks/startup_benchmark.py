@@ -0,0 +1,97 @@
+"""Measure app import/creation time and assert that startup does no network I/O.
+
+Each run happens in a fresh interpreter, with an audit hook that records
+every socket connect and DNS lookup. Startup is measured twice: as
+configured by default (TWILIO_SYNC_IN_PROCESS=true, so create_app() starts
+the background schedulers) and with TWILIO_SYNC_IN_PROCESS=false. Run from the
+backend directory:
+
+    python benchmarks/startup_benchmark.py --runs 5 --max-seconds 3
+
+Exits non-zero if any run touched the network or either median startup
+time exceeds --max-seconds.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+
+NETWORK_EVENTS = {'socket.connect', 'socket.getaddrinfo', 'socket.gethostbyname', 'socket.gethostbyaddr'}
+events = []
+
+def hook(event, args):
+    if event in NETWORK_EVENTS:
+        events.append(f"{event} {args[1:] if event == 'socket.connect' else args}")
+
+sys.addaudithook(hook)
+
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+server.create_app()
+created = time.perf_counter()
+
+print(json.dumps({
+    "import_seconds": imported - started,
+    "create_app_seconds": created - imported,
+    "network_events": events,
+}))
+"""
+
+
+MODES = {
+    'default': 'true',
+    'sync_disabled': 'false',
+}
+
+
+def run_once(sync_in_process):
+    env = dict(os.environ, TWILIO_SYNC_IN_PROCESS=sync_in_process)
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="fail if median import + create_app time exceeds this")
+    args = parser.parse_args()
+
+    report = {"runs": args.runs}
+    for mode, sync_in_process in MODES.items():
+        runs = [run_once(sync_in_process) for _ in range(args.runs)]
+        totals = [r["import_seconds"] + r["create_app_seconds"] for r in runs]
+        report[mode] = {
+            "import_seconds_median": round(statistics.median(r["import_seconds"] for r in runs), 4),
+            "create_app_seconds_median": round(statistics.median(r["create_app_seconds"] for r in runs), 4),
+            "total_seconds_median": round(statistics.median(totals), 4),
+            "total_seconds_max": round(max(totals), 4),
+            "network_events": sorted({event for r in runs for event in r["network_events"]}),
+        }
+    print(json.dumps(report, indent=4))
+
+    failed = False
+    for mode in MODES:
+        if report[mode]["network_events"]:
+            print(f"FAIL: importing or creating the app ({mode}) performed network I/O", file=sys.stderr)
+            failed = True
+        median = report[mode]["total_seconds_median"]
+        if args.max_seconds is not None and median > args.max_seconds:
+            print(f"FAIL: median startup ({mode}) {median}s exceeds {args.max_seconds}s", file=sys.stderr)
+            failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import logging
+import threading
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _get(name, factory):
+    """Return the process-wide client ``name``, building it with ``factory`` on first use.
+
+    Construction happens under a lock: boto3's default session is not
+    thread-safe, and concurrent first requests must not build duplicates.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+                logger.info(f"{name} client initialised")
+    return client
+
+
+def _create_s3_client(timeout=None):
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from awsConfig import AWS_ACCESS_KEY, AWS_REGION, AWS_SECRET_KEY
+
+    endpoint_url = get_config().S3_ENDPOINT_URL
+    options = {}
+    if endpoint_url:
+        # Local S3-compatible servers route by path, not by bucket subdomain
+        options['s3'] = {'addressing_style': 'path'}
+    if timeout is not None:
+        options.update(connect_timeout=timeout, read_timeout=timeout, retries={'total_max_attempts': 1})
+    return boto3.client(
+        's3',
+        aws_access_key_id=AWS_ACCESS_KEY,
+        aws_secret_access_key=AWS_SECRET_KEY,
+        region_name=AWS_REGION,
+        endpoint_url=endpoint_url,
+        config=BotoConfig(**options) if options else None
+    )
+
+
+def _create_openai_client():
+    from openai import OpenAI
+
+    # Retries are handled by the resilience layer, not the SDK
+    # Calls made through resilience.Dependency pass a shorter per-attempt timeout
+    return OpenAI(api_key=get_config().OPENAI_API_KEY, base_url=get_config().OPENAI_BASE_URL,
+                  timeout=get_config().AI_REQUEST_TIMEOUT, max_retries=0)
+
+
+def _create_twilio_client(timeout=None):
+    from twilio.http.http_client import TwilioHttpClient
+    from twilio.rest import Client
+
+    # The SDK's default HTTP client waits forever on a hung connection
+    timeout = timeout or get_config().TWILIO_REQUEST_TIMEOUT
+    if get_config().TWILIO_API_BASE_URL:
+        http_client = _twilio_redirecting_http_client(get_config().TWILIO_API_BASE_URL, timeout)
+    else:
+        http_client = TwilioHttpClient(timeout=timeout)
+    return Client(get_config().TWILIO_ACCOUNT_SID, get_config().TWILIO_AUTH_TOKEN, http_client=http_client)
+
+
+def _twilio_redirecting_http_client(base_url, timeout):
+    """Twilio HTTP client that sends every request to ``base_url`` (the SDK has no endpoint option)."""
+    from urllib.parse import urlsplit, urlunsplit
+
+    from twilio.http.http_client import TwilioHttpClient
+
+    base = urlsplit(base_url)
+
+    class RedirectingHttpClient(TwilioHttpClient):
+        def request(self, method, url, *args, **kwargs):
+            parts = urlsplit(url)
+            url = urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, parts.fragment))
+            return super().request(method, url, *args, **kwargs)
+
+    return RedirectingHttpClient(timeout=timeout)
+
+
+def get_s3_client():
+    return _get('s3', _create_s3_client)
+
+
+def get_openai_client():
+    return _get('openai', _create_openai_client)
+
+
+def get_twilio_client():
+    return _get('twilio', _create_twilio_client)
+
+
+def get_probe_client(name):
+    """A separate ``name`` ('s3' or 'twilio') client for health probes, bounded by HEALTH_CHECK_TIMEOUT without retries."""
+    factory = {'s3': _create_s3_client, 'twilio': _create_twilio_client}[name]
+    return _get(f"{name}-probe", lambda: factory(timeout=get_config().HEALTH_CHECK_TIMEOUT))
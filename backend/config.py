@@ -1,10 +1,24 @@
 import os
+import tempfile
 from datetime import timedelta
+from dotenv import load_dotenv
+
+# Load environment variables before the config classes read them
+load_dotenv()
 
 class Config:
     """Base configuration."""
     SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'default_secret_key')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 60)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30)))
+    # Revoked token ids (TOKEN_BLOCKLIST_URL=redis://... to share logouts across workers)
+    TOKEN_BLOCKLIST_URL = os.getenv('TOKEN_BLOCKLIST_URL')
+    # Password hashing: stored hashes below BCRYPT_ROUNDS are upgraded on the next login
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    # Hashing processes (0 = half the CPUs) and how many jobs may wait before logins get a 503
+    BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', 0))
+    BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', 32))
+    BCRYPT_QUEUE_TIMEOUT = float(os.getenv('BCRYPT_QUEUE_TIMEOUT', 5))
     CORS_ORIGINS = [
         "http://localhost:8000",
         "http://127.0.0.1:8000",
@@ -20,25 +34,134 @@ class Config:
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
     DB_NAME = os.getenv('DB_NAME', 'clearcall')
     DB_PORT = int(os.getenv('DB_PORT', 3306))
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', 1800))
+    DB_POOL_VALIDATE_AFTER = int(os.getenv('DB_POOL_VALIDATE_AFTER', 30))
+    # Seconds to wait for a new MySQL connection before the checkout fails
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 10))
     
     # AWS
     AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     AWS_BUCKET_NAME = os.getenv('AWS_BUCKET_NAME', 'one-piece-store')
     AWS_REGION = os.getenv('AWS_REGION', 'us-east-2')
+    UPLOAD_RECONCILE_INTERVAL = int(os.getenv('UPLOAD_RECONCILE_INTERVAL', 6 * 60 * 60))
+    MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 500 * 1024 * 1024))
+    S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', 16 * 1024 * 1024))
+    S3_MULTIPART_CHUNKSIZE = int(os.getenv('S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024))
+    S3_MAX_CONCURRENCY = int(os.getenv('S3_MAX_CONCURRENCY', 8))
+    S3_PRESIGN_EXPIRES = int(os.getenv('S3_PRESIGN_EXPIRES', 15 * 60))
+    # Endpoint overrides point the clients at local S3/OpenAI/Twilio stand-ins (see benchmarks/fake_services.py)
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
     
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')
+    # Upper bound on chat completions outstanding against the API per process
+    AI_MAX_CONCURRENT_CALLS = int(os.getenv('AI_MAX_CONCURRENT_CALLS', 16))
+    AI_REQUEST_TIMEOUT = int(os.getenv('AI_REQUEST_TIMEOUT', 60))
+
+    # Background dependency probes behind /health/ready
+    HEALTH_CHECK_INTERVAL = int(os.getenv('HEALTH_CHECK_INTERVAL', 15))
+    HEALTH_CHECK_TIMEOUT = int(os.getenv('HEALTH_CHECK_TIMEOUT', 5))
+    # Dependencies that must pass for the instance to be ready; the rest only mark it degraded
+    HEALTH_CRITICAL_CHECKS = [name.strip() for name in os.getenv('HEALTH_CRITICAL_CHECKS', 'database,s3').split(',') if name.strip()]
+
+    # Logging: LOG_FORMAT is 'text' or 'json'; LOG_SAMPLE_RATE keeps that fraction of INFO and below
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+
+    # Retries and circuit breakers for S3 / OpenAI calls (see resilience.py)
+    RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 3))
+    RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 0.5))
+    RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 8))
+    # Total seconds a call may spend across all of its attempts
+    RETRY_DEADLINE = float(os.getenv('RETRY_DEADLINE', 30))
+    # Longest a single attempt may take (also capped by what is left of the deadline)
+    RETRY_ATTEMPT_TIMEOUT = float(os.getenv('RETRY_ATTEMPT_TIMEOUT', 30))
+    # Whisper on an unsplit recording can take longer than a chat completion
+    TRANSCRIPTION_TIMEOUT = float(os.getenv('TRANSCRIPTION_TIMEOUT', 120))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+    BREAKER_RESET_TIMEOUT = int(os.getenv('BREAKER_RESET_TIMEOUT', 30))
+
+    # Voice complaint processing
+    VOICE_PIPELINE_WORKERS = int(os.getenv('VOICE_PIPELINE_WORKERS', 4))
+    # A complaint still 'processing' this long after its claim is assumed abandoned and requeued
+    VOICE_JOB_LEASE_SECONDS = int(os.getenv('VOICE_JOB_LEASE_SECONDS', 15 * 60))
+    VOICE_JOB_REQUEUE_INTERVAL = int(os.getenv('VOICE_JOB_REQUEUE_INTERVAL', 60))
+    # Audio larger than this is spooled to disk instead of memory
+    AUDIO_SPOOL_MAX_BYTES = int(os.getenv('AUDIO_SPOOL_MAX_BYTES', 25 * 1024 * 1024))
+    # Re-encode recordings to 16 kHz mono Opus with edge silence trimmed before transcription (needs ffmpeg)
+    AUDIO_PREPROCESS_ENABLED = os.getenv('AUDIO_PREPROCESS_ENABLED', 'true').lower() == 'true'
+    AUDIO_PREPROCESS_WORKERS = int(os.getenv('AUDIO_PREPROCESS_WORKERS', os.cpu_count() or 2))
+    AUDIO_PREPROCESS_TIMEOUT = int(os.getenv('AUDIO_PREPROCESS_TIMEOUT', 120))
+    AUDIO_OPUS_BITRATE = os.getenv('AUDIO_OPUS_BITRATE', '24k')
+    AUDIO_SILENCE_THRESHOLD_DB = int(os.getenv('AUDIO_SILENCE_THRESHOLD_DB', -50))
+    FFMPEG_PATH = os.getenv('FFMPEG_PATH', 'ffmpeg')
+    FFPROBE_PATH = os.getenv('FFPROBE_PATH', 'ffprobe')
+    # Recordings longer than TRANSCRIPTION_SEGMENT_MAX_SECONDS are split at pauses and transcribed in parallel
+    TRANSCRIPTION_SEGMENT_ENABLED = os.getenv('TRANSCRIPTION_SEGMENT_ENABLED', 'true').lower() == 'true'
+    TRANSCRIPTION_SEGMENT_SECONDS = int(os.getenv('TRANSCRIPTION_SEGMENT_SECONDS', 180))
+    TRANSCRIPTION_SEGMENT_MAX_SECONDS = int(os.getenv('TRANSCRIPTION_SEGMENT_MAX_SECONDS', 240))
+    TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS = float(os.getenv('TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS', 2))
+    TRANSCRIPTION_CHUNK_CONCURRENCY = int(os.getenv('TRANSCRIPTION_CHUNK_CONCURRENCY', 10))
+    # A pause is at least AUDIO_PAUSE_MIN_SECONDS quieter than AUDIO_PAUSE_THRESHOLD_DB
+    AUDIO_PAUSE_THRESHOLD_DB = int(os.getenv('AUDIO_PAUSE_THRESHOLD_DB', -35))
+    AUDIO_PAUSE_MIN_SECONDS = float(os.getenv('AUDIO_PAUSE_MIN_SECONDS', 0.4))
+    # Batch processing: worker threads and per-provider concurrency caps
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 16))
+    BATCH_S3_CONCURRENCY = int(os.getenv('BATCH_S3_CONCURRENCY', 16))
+    BATCH_TRANSCRIPTION_CONCURRENCY = int(os.getenv('BATCH_TRANSCRIPTION_CONCURRENCY', 4))
+    BATCH_CHAT_CONCURRENCY = int(os.getenv('BATCH_CHAT_CONCURRENCY', 8))
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 100))
+    # Transcript / AI response cache
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 24 * 60 * 60))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 1024))
     
     # Twilio
     TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
     TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
     TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+    TWILIO_API_BASE_URL = os.getenv('TWILIO_API_BASE_URL')
+    # Per-request HTTP timeout for the Twilio SDK (seconds)
+    TWILIO_REQUEST_TIMEOUT = int(os.getenv('TWILIO_REQUEST_TIMEOUT', 30))
+    TWILIO_SYNC_PAGE_SIZE = int(os.getenv('TWILIO_SYNC_PAGE_SIZE', 200))
+    TWILIO_SYNC_BATCH_SIZE = int(os.getenv('TWILIO_SYNC_BATCH_SIZE', 500))
+    TWILIO_SYNC_OVERLAP_SECONDS = int(os.getenv('TWILIO_SYNC_OVERLAP_SECONDS', 6 * 60 * 60))
+    TWILIO_SYNC_INTERVAL = int(os.getenv('TWILIO_SYNC_INTERVAL', 300))
+    TWILIO_SYNC_BACKOFF_BASE = int(os.getenv('TWILIO_SYNC_BACKOFF_BASE', 5))
+    TWILIO_SYNC_BACKOFF_MAX = int(os.getenv('TWILIO_SYNC_BACKOFF_MAX', 600))
+    # Response cache for read-only GET endpoints (RESPONSE_CACHE_URL=redis://... to share across workers)
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL')
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_WAIT_TIMEOUT = int(os.getenv('RESPONSE_CACHE_WAIT_TIMEOUT', 10))
+
+    # Analytics rollups
+    ROLLUP_REFRESH_INTERVAL = int(os.getenv('ROLLUP_REFRESH_INTERVAL', 300))
+    ROLLUP_REFRESH_DAYS = int(os.getenv('ROLLUP_REFRESH_DAYS', 2))
+    # Set to false when the schedulers run as a sidecar (python sync_scheduler.py)
+    TWILIO_SYNC_IN_PROCESS = os.getenv('TWILIO_SYNC_IN_PROCESS', 'true').lower() == 'true'
+
+    # Rate limiting: sqlite:////path/file.db is shared by the workers on one host, redis://... across hosts
+    RATELIMIT_STORAGE_URI = os.getenv(
+        'RATELIMIT_STORAGE_URI', f"sqlite:///{os.path.join(tempfile.gettempdir(), 'clearcall-ratelimit.sqlite3')}"
+    )
+    # Longest a request waits for the SQLite counters file before the check fails open
+    RATELIMIT_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('RATELIMIT_SQLITE_BUSY_TIMEOUT_MS', 50))
+    # Moving-window limits per identity; routes without a cost class get the default
+    RATELIMIT_DEFAULT = os.getenv('RATELIMIT_DEFAULT', '200 per day;50 per hour')
+    RATELIMIT_AUTH = os.getenv('RATELIMIT_AUTH', '10 per minute;100 per hour')
+    RATELIMIT_AI = os.getenv('RATELIMIT_AI', '20 per minute;200 per hour')
+    RATELIMIT_BULK = os.getenv('RATELIMIT_BULK', '5 per minute;50 per hour')
+    # Job status polling: frequent but only a primary-key read
+    RATELIMIT_STATUS = os.getenv('RATELIMIT_STATUS', '120 per minute;3000 per hour')
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
-    CORS_ORIGINS = ["*"]
     
 class ProductionConfig(Config):
     """Production configuration."""
@@ -50,10 +173,6 @@ class ProductionConfig(Config):
     
     # Override this in production
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
-    
-    # Production database should use connection pooling
-    DB_POOL_SIZE = 5
-    DB_POOL_TIMEOUT = 30
 
 class TestingConfig(Config):
     """Testing configuration."""
@@ -68,3 +187,26 @@ config = {
     'testing': TestingConfig,
     'default': DevelopmentConfig
 }
+
+def get_config():
+    """Return the configuration class selected by APP_ENV."""
+    return config[os.getenv('APP_ENV', 'default')]
+
+def cors_policy():
+    """Return (origins, supports_credentials) for Flask-CORS and the native ASGI routes.
+
+    A "*" entry in CORS_ORIGINS allows any origin, but without credentials:
+    reflecting an arbitrary Origin alongside Access-Control-Allow-Credentials
+    would let any site make authenticated requests.
+    """
+    origins = list(get_config().CORS_ORIGINS)
+    if "*" in origins:
+        return "*", False
+    return origins, True
+
+def cors_allow_origin(origin):
+    """Access-Control-Allow-Origin value for a request's Origin, or None if it is not allowed."""
+    origins, _ = cors_policy()
+    if origins == "*":
+        return "*"
+    return origin if origin in origins else None
@@ -1,72 +1,281 @@
 import mysql.connector
-from config import config
+from db_pool import advisory_lock, db_cursor
+from rollups import rebuild_rollups
 import logging
+import sys
+import time
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Create a database connection."""
-    conf = config['production']
-    return mysql.connector.connect(
-        host=conf.DB_HOST,
-        user=conf.DB_USER,
-        password=conf.DB_PASSWORD,
-        database=conf.DB_NAME,
-        port=conf.DB_PORT
-    )
+def _column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
 
-def run_migrations():
-    """Run database migrations."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+def _table_exists(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchone()[0] > 0
+
+def _index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cursor.fetchone()[0] > 0
+
+def _add_index(cursor, table, index, columns, unique=False):
+    """Add an index without blocking writes (InnoDB online DDL); no-op if it already exists."""
+    if _index_exists(cursor, table, index):
+        return
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    logger.info(f"Adding {kind.lower()} {index} on {table} ({columns})")
+    cursor.execute(f"ALTER TABLE {table} ADD {kind} {index} ({columns}), ALGORITHM=INPLACE, LOCK=NONE")
 
-        # Create users table if not exists
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) NOT NULL UNIQUE,
-                phone VARCHAR(20) NOT NULL,
-                hashed_password VARCHAR(255) NOT NULL,
-                role ENUM('user', 'admin') DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                INDEX idx_email (email)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-        """)
 
-        # Create voice_complaints table if not exists
+# Numbered migrations, applied in order and recorded in schema_version.
+#
+# MySQL commits DDL implicitly, so a migration interrupted halfway cannot be
+# rolled back; every step must therefore be safe to re-run (IF NOT EXISTS,
+# existence checks). Never edit a migration that has shipped; add a new one.
+
+def _0001_baseline(cursor):
+    # Create users table if not exists
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL UNIQUE,
+            phone VARCHAR(20) NOT NULL,
+            hashed_password VARCHAR(255) NOT NULL,
+            role ENUM('user', 'admin') DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_email (email)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+
+    # Create voice_complaints table if not exists
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS voice_complaints (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            s3_file_path VARCHAR(255) NOT NULL,
+            transcript TEXT,
+            ai_response TEXT,
+            status ENUM('pending', 'processing', 'completed', 'failed') DEFAULT 'pending',
+            error_message VARCHAR(1000),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            INDEX idx_user_id (user_id),
+            INDEX idx_status (status)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+
+    # Failure reason for asynchronously processed complaints
+    if not _column_exists(cursor, 'voice_complaints', 'error_message'):
+        cursor.execute("ALTER TABLE voice_complaints ADD COLUMN error_message VARCHAR(1000) AFTER status")
+
+    # Completed Twilio calls, ingested by twilio_sync
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS inquiries (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            call_sid VARCHAR(64) NOT NULL,
+            caller_number VARCHAR(20),
+            recipient_number VARCHAR(20),
+            duration INT,
+            start_time DATETIME,
+            status VARCHAR(20),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_call_sid (call_sid)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+
+    # Make call_sid unique so the Twilio sync upsert dedupes (tables created before it was)
+    if _table_exists(cursor, 'inquiries') and not _index_exists(cursor, 'inquiries', 'uq_call_sid'):
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS voice_complaints (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                s3_file_path VARCHAR(255) NOT NULL,
-                transcript TEXT,
-                ai_response TEXT,
-                status ENUM('pending', 'processing', 'completed', 'failed') DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                INDEX idx_user_id (user_id),
-                INDEX idx_status (status)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+            DELETE newer FROM inquiries newer
+            JOIN inquiries older ON newer.call_sid = older.call_sid AND newer.id > older.id
         """)
+        cursor.execute("ALTER TABLE inquiries ADD UNIQUE KEY uq_call_sid (call_sid)")
+
+    # High-water marks for incremental syncs
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name VARCHAR(64) PRIMARY KEY,
+            last_start_time DATETIME,
+            last_call_sid VARCHAR(64),
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+
+    # Daily / monthly aggregates backing the analytics endpoints
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_daily_rollup (
+            metric VARCHAR(32) NOT NULL,
+            bucket_date DATE NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, bucket_date, status)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_monthly_rollup (
+            metric VARCHAR(32) NOT NULL,
+            bucket_month DATE NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, bucket_month, status)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+
+    # Registry of objects written to S3, so counts and listings skip the bucket
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS uploads (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            s3_key VARCHAR(512) NOT NULL,
+            size BIGINT NOT NULL DEFAULT 0,
+            content_type VARCHAR(128),
+            extension VARCHAR(16) NOT NULL DEFAULT '',
+            user_id INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_s3_key (s3_key),
+            INDEX idx_extension (extension),
+            INDEX idx_created_at (created_at, id),
+            INDEX idx_user_created (user_id, created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+
+
+def _0002_inquiries_indexes(cursor):
+    # Completed-calls listings and rollup refreshes filter and sort by start_time
+    _add_index(cursor, 'inquiries', 'uq_call_sid', 'call_sid', unique=True)
+    _add_index(cursor, 'inquiries', 'idx_start_time', 'start_time')
+
+
+def _0003_human_escalation(cursor):
+    # Written by the call-handling service; created here so fresh databases have it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS human_escalation (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            caller_number VARCHAR(20),
+            initiated_at DATETIME NOT NULL,
+            reason VARCHAR(255)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+    _add_index(cursor, 'human_escalation', 'idx_initiated_at', 'initiated_at')
+
+
+def _0004_voice_complaints_user_created_index(cursor):
+    # Per-user complaint history, newest first
+    _add_index(cursor, 'voice_complaints', 'idx_user_created', 'user_id, created_at')
+
+
+def _0005_human_escalation_reason_index(cursor):
+    # Reason filter and count-by-reason aggregate on /api/human-escalations
+    _add_index(cursor, 'human_escalation', 'idx_reason_initiated', 'reason, initiated_at')
+
+
+def _0006_voice_complaints_created_index(cursor):
+    # Rollup reconciles rebuild complaint counts by created_at range
+    _add_index(cursor, 'voice_complaints', 'idx_created_at', 'created_at')
+
+
+def _0007_voice_complaints_started_at(cursor):
+    # Claim time of a 'processing' complaint; expired claims are requeued
+    if not _column_exists(cursor, 'voice_complaints', 'started_at'):
+        cursor.execute(
+            "ALTER TABLE voice_complaints ADD COLUMN started_at DATETIME NULL AFTER status, ALGORITHM=INPLACE, LOCK=NONE"
+        )
+
+
+MIGRATIONS = [
+    (1, 'baseline', _0001_baseline),
+    (2, 'inquiries call_sid and start_time indexes', _0002_inquiries_indexes),
+    (3, 'human_escalation table and initiated_at index', _0003_human_escalation),
+    (4, 'voice_complaints (user_id, created_at) index', _0004_voice_complaints_user_created_index),
+    (5, 'human_escalation (reason, initiated_at) index', _0005_human_escalation_reason_index),
+    (6, 'voice_complaints created_at index', _0006_voice_complaints_created_index),
+    (7, 'voice_complaints started_at', _0007_voice_complaints_started_at),
+]
+
+# Migrations take long enough on large tables that concurrent runners must wait, not skip
+MIGRATION_LOCK_TIMEOUT = 600
+
+
+def _ensure_schema_version(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INT
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+
+
+def applied_versions():
+    """Return the set of migration versions already applied."""
+    with db_cursor(commit=True) as cursor:
+        _ensure_schema_version(cursor)
+        cursor.execute("SELECT version FROM schema_version")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations():
+    applied = applied_versions()
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def run_migrations():
+    """Apply every pending migration in order.
+
+    A MySQL named lock serialises runners, so several instances starting
+    together apply each migration once.
+    """
+    try:
+        with advisory_lock('schema_migrations', timeout=MIGRATION_LOCK_TIMEOUT) as acquired:
+            if not acquired:
+                raise RuntimeError("Timed out waiting for another migration runner")
+
+            pending = pending_migrations()
+            for version, name, migrate in pending:
+                logger.info(f"Applying migration {version:04d}: {name}")
+                started = time.monotonic()
+                with db_cursor(commit=True) as cursor:
+                    migrate(cursor)
+                    cursor.execute(
+                        "INSERT INTO schema_version (version, name, duration_ms) VALUES (%s, %s, %s)",
+                        (version, name, int((time.monotonic() - started) * 1000))
+                    )
+
+            with db_cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM analytics_monthly_rollup")
+                backfill_rollups = cursor.fetchone()[0] == 0
+            if backfill_rollups:
+                rebuild_rollups()
+
+        logger.info(f"Database migrations completed successfully ({len(pending)} applied)")
 
-        # Add any new migrations here
-        
-        conn.commit()
-        logger.info("Database migrations completed successfully!")
-        
     except mysql.connector.Error as err:
         logger.error(f"Failed to run migrations: {err}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+
+
+def print_status():
+    applied = applied_versions()
+    for version, name, _ in MIGRATIONS:
+        print(f"{version:04d}  {'applied' if version in applied else 'pending':8}  {name}")
+
 
 if __name__ == "__main__":
-    run_migrations() 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    if '--status' in sys.argv[1:]:
+        print_status()
+    else:
+        run_migrations()
@@ -0,0 +1,286 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+
+from config import get_config
+from metrics import db_timer, set_pool_connections
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class ConnectionPool:
+    """Process-wide pool of MySQL connections.
+
+    Connections are created lazily up to ``size``, validated with a ping when
+    they have been idle for longer than ``validate_after`` seconds and recycled
+    once they are older than ``max_lifetime`` seconds.
+    """
+
+    def __init__(self, db_config, size=5, timeout=30, max_lifetime=1800, validate_after=30):
+        self.db_config = db_config
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created_at = {}
+        self._last_used = {}
+        self._open = 0
+        self._in_use = 0
+        self._metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "exhausted": 0,
+            "created": 0,
+            "recycled": 0,
+            "validation_failures": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self):
+        with db_timer('connect'):
+            conn = mysql.connector.connect(**self.db_config)
+        now = time.monotonic()
+        with self._lock:
+            self._created_at[id(conn)] = now
+            self._last_used[id(conn)] = now
+            self._metrics["created"] += 1
+        logger.debug("Opened new pooled database connection")
+        return conn
+
+    def _publish(self):
+        # Gauges move with every checkout and return, not only when /metrics is scraped
+        with self._lock:
+            open_, in_use = self._open, self._in_use
+        set_pool_connections(open_, in_use, self._idle.qsize())
+
+    def _close(self, conn, reason):
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+            self._last_used.pop(id(conn), None)
+            self._open -= 1
+            self._metrics[reason] += 1
+        self._publish()
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+
+    def _is_usable(self, conn):
+        now = time.monotonic()
+        created = self._created_at.get(id(conn), now)
+        if now - created > self.max_lifetime:
+            self._close(conn, "recycled")
+            return False
+        if now - self._last_used.get(id(conn), now) > self.validate_after:
+            try:
+                conn.ping(reconnect=False)
+            except mysql.connector.Error:
+                self._close(conn, "validation_failures")
+                return False
+        return True
+
+    def acquire(self):
+        """Check out a connection, blocking for up to ``timeout`` seconds."""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+                with self._lock:
+                    can_open = self._open < self.size
+                    if can_open:
+                        self._open += 1
+                if can_open:
+                    try:
+                        conn = self._connect()
+                    except Exception:
+                        with self._lock:
+                            self._open -= 1
+                        self._publish()
+                        raise
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        with self._lock:
+                            self._metrics["exhausted"] += 1
+                        raise PoolExhaustedError(
+                            f"No database connection available after {self.timeout}s "
+                            f"(pool size {self.size})"
+                        )
+                    if not waited:
+                        waited = True
+                        wait_started = time.monotonic()
+                    try:
+                        conn = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+            if conn is not None and self._is_usable(conn):
+                with self._lock:
+                    self._in_use += 1
+                    self._metrics["checkouts"] += 1
+                    if waited:
+                        self._metrics["waits"] += 1
+                        self._metrics["wait_seconds_total"] += time.monotonic() - wait_started
+                self._publish()
+                return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if it is no longer healthy."""
+        with self._lock:
+            self._in_use -= 1
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                discard = not conn.is_connected()
+            except mysql.connector.Error:
+                discard = True
+        if discard:
+            self._close(conn, "discarded")
+            return
+        self._last_used[id(conn)] = time.monotonic()
+        self._idle.put(conn)
+        self._publish()
+
+    def stats(self):
+        """Return a snapshot of pool usage and exhaustion counters."""
+        with self._lock:
+            return dict(
+                self._metrics,
+                size=self.size,
+                open=self._open,
+                in_use=self._in_use,
+                idle=self._idle.qsize(),
+            )
+
+    def close_all(self):
+        """Close every idle connection (connections in use are closed on release)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(conn, "discarded")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it from the app config on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                conf = get_config()
+                _pool = ConnectionPool(
+                    {
+                        "host": conf.DB_HOST,
+                        "user": conf.DB_USER,
+                        "password": conf.DB_PASSWORD,
+                        "database": conf.DB_NAME,
+                        "port": conf.DB_PORT,
+                        "connection_timeout": conf.DB_CONNECT_TIMEOUT,
+                    },
+                    size=conf.DB_POOL_SIZE,
+                    timeout=conf.DB_POOL_TIMEOUT,
+                    max_lifetime=conf.DB_POOL_MAX_LIFETIME,
+                    validate_after=conf.DB_POOL_VALIDATE_AFTER,
+                )
+                logger.info(f"Database pool initialised (size={conf.DB_POOL_SIZE})")
+    return _pool
+
+
+@contextmanager
+def db_connection():
+    """Check out a pooled connection for the duration of the block."""
+    pool = get_pool()
+    with db_timer('checkout'):
+        conn = pool.acquire()
+    discard = False
+    try:
+        yield conn
+    except mysql.connector.Error:
+        discard = not _safe_is_connected(conn)
+        raise
+    finally:
+        pool.release(conn, discard=discard)
+
+
+class TimedCursor:
+    """Cursor proxy that records execute/executemany latency."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        with db_timer('query'):
+            return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        with db_timer('query'):
+            return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@contextmanager
+def db_cursor(dictionary=False, commit=False):
+    """Yield a cursor on a pooled connection, committing on success if requested."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            yield TimedCursor(cursor)
+            if commit:
+                with db_timer('commit'):
+                    conn.commit()
+        finally:
+            cursor.close()
+
+
+def _safe_is_connected(conn):
+    try:
+        return conn.is_connected()
+    except Exception:
+        return False
+
+
+@contextmanager
+def advisory_lock(name, timeout=0):
+    """Hold a MySQL named lock for the block; yields False if another session holds it.
+
+    Used to make background jobs single-flight across worker processes.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+            acquired = cursor.fetchone()[0] == 1
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+                    cursor.fetchone()
+        finally:
+            cursor.close()
@@ -0,0 +1,25 @@
+"""gunicorn settings, picked up automatically when gunicorn is started from this directory.
+
+    PROMETHEUS_MULTIPROC_DIR=/tmp/cpa-metrics gunicorn -w 4 "server:create_app()"
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics to that
+directory and /metrics reports the sum across workers.
+"""
+import os
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be added to this one's
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith('.db'):
+                os.remove(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
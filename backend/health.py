@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+def check_database():
+    from db_pool import db_cursor
+
+    with db_cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_s3():
+    from awsConfig import AWS_BUCKET_NAME
+    from clients import get_probe_client
+
+    # head_bucket touches only our bucket, unlike the account-wide list_buckets
+    get_probe_client('s3').head_bucket(Bucket=AWS_BUCKET_NAME)
+
+
+def check_openai():
+    from clients import get_openai_client
+    from voice_pipeline import COMPLAINT_MODEL
+
+    get_openai_client().with_options(timeout=get_config().HEALTH_CHECK_TIMEOUT).models.retrieve(COMPLAINT_MODEL)
+
+
+def check_twilio():
+    from clients import get_probe_client
+
+    twilio = get_probe_client('twilio')
+    twilio.api.v2010.accounts(twilio.username).fetch()
+
+
+PROBES = {
+    'database': check_database,
+    's3': check_s3,
+    'openai': check_openai,
+    'twilio': check_twilio,
+}
+
+
+class HealthChecker:
+    """Probes every dependency on an interval in the background and caches the results.
+
+    Probe requests only read the cache, so load balancer traffic never
+    reaches the dependencies. Probes run in parallel; one that takes longer
+    than ``timeout`` is reported as failed without holding up the others.
+    A probe still running from an earlier round is not started again, so a
+    hung dependency occupies at most one worker thread.
+    """
+
+    def __init__(self, probes, interval, timeout, critical):
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        self.critical = set(critical)
+        self._results = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._first_run = threading.Event()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix="health-probe")
+        self._in_flight = {}
+
+    def _probe(self, probe):
+        started = time.monotonic()
+        try:
+            probe()
+            error = None
+        except Exception as e:
+            error = str(e)
+        return {
+            "ok": error is None,
+            "error": error,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def run_once(self):
+        futures, stuck = {}, []
+        for name, probe in self.probes.items():
+            previous = self._in_flight.get(name)
+            if previous is not None and not previous.done():
+                stuck.append(name)
+            else:
+                futures[name] = self._in_flight[name] = self._executor.submit(self._probe, probe)
+        wait(futures.values(), timeout=self.timeout)
+        results = {}
+        for name, future in futures.items():
+            if future.done():
+                results[name] = future.result()
+            else:
+                results[name] = self._failed(f"timed out after {self.timeout}s")
+        for name in stuck:
+            results[name] = self._failed("previous probe still running")
+        for name, result in results.items():
+            if not result["ok"]:
+                logger.warning(f"Health probe '{name}' failed: {result['error']}")
+        with self._lock:
+            self._results = results
+            self._checked_at = time.monotonic()
+        self._first_run.set()
+
+    @staticmethod
+    def _failed(error):
+        return {
+            "ok": False,
+            "error": error,
+            "latency_ms": None,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Health checker run failed: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start the background loop in a daemon thread (idempotent)."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="health-checker", daemon=True)
+                self._thread.start()
+
+    def report(self, wait_for_first=0):
+        """Return (ready, report) from the cached results.
+
+        Ready means every critical dependency passed its last probe and the
+        results are fresh (younger than three intervals).
+        """
+        self.start()
+        self._first_run.wait(wait_for_first)
+        with self._lock:
+            results = dict(self._results)
+            checked_at = self._checked_at
+
+        if checked_at is None:
+            return False, {"status": "starting", "checks": {}}
+
+        age = time.monotonic() - checked_at
+        stale = age > 3 * self.interval
+        critical_ok = all(results.get(name, {}).get("ok") for name in self.critical)
+        all_ok = all(result["ok"] for result in results.values())
+        ready = critical_ok and not stale
+
+        if not ready:
+            status = "unavailable"
+        elif all_ok:
+            status = "ready"
+        else:
+            status = "degraded"
+        return ready, {
+            "status": status,
+            "stale": stale,
+            "age_seconds": round(age, 1),
+            "critical": sorted(self.critical),
+            "checks": results,
+        }
+
+
+health_checker = HealthChecker(
+    PROBES,
+    interval=get_config().HEALTH_CHECK_INTERVAL,
+    timeout=get_config().HEALTH_CHECK_TIMEOUT,
+    critical=get_config().HEALTH_CRITICAL_CHECKS,
+)
@@ -0,0 +1,52 @@
+import json
+import logging
+import random
+from datetime import datetime, timezone
+
+from config import get_config
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a random ``rate`` fraction of records at or below ``max_level``; higher levels always pass."""
+
+    def __init__(self, rate, max_level=logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+
+    def filter(self, record):
+        return record.levelno > self.max_level or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed via ``extra``."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    """Configure the root logger from LOG_LEVEL, LOG_FORMAT ('text' or 'json') and LOG_SAMPLE_RATE."""
+    conf = get_config()
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if conf.LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+    if conf.LOG_SAMPLE_RATE < 1:
+        handler.addFilter(SamplingFilter(conf.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(conf.LOG_LEVEL)
@@ -0,0 +1,115 @@
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# Under gunicorn/uvicorn workers each process writes its samples to files in
+# this directory and /metrics aggregates them; unset, metrics are per process
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# Buckets span fast DB-backed routes up to multi-second model calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    'voice_pipeline_stage_seconds', 'Voice complaint pipeline stage latency',
+    ['stage', 'outcome'], buckets=LATENCY_BUCKETS
+)
+DB_LATENCY = Histogram(
+    'db_operation_seconds', 'Database connect, checkout and query latency',
+    ['operation'], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_ERRORS = Counter(
+    'upstream_errors_total', 'Failed calls to external dependencies',
+    ['dependency', 'kind']
+)
+AUDIO_BYTES = Counter(
+    'voice_pipeline_audio_bytes_total', 'Audio bytes downloaded from S3 and uploaded for transcription',
+    ['direction']
+)
+SYNC_RUNS = Counter(
+    'sync_runs_total', 'Background sync runs by outcome; skipped means another process held the lock',
+    ['name', 'outcome']
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'Pooled database connections by state', ['state'],
+    multiprocess_mode='livesum'
+)
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time a pipeline stage, labelled with whether it raised."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        STAGE_LATENCY.labels(stage, outcome).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def db_timer(operation):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+def observe_request(method, route, status, seconds):
+    REQUEST_LATENCY.labels(method, route, status).observe(seconds)
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by route rule, not path, so ids in URLs don't explode cardinality
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+    return response
+
+
+def _registry():
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    return registry
+
+
+def mark_process_dead(pid):
+    """Drop a finished worker's live gauges; the ASGI app calls this on lifespan shutdown."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, path=MULTIPROC_DIR)
+
+
+def set_pool_connections(open_, in_use, idle):
+    """Publish this process's pool state; with livesum, /metrics reports the total over live workers."""
+    DB_POOL_CONNECTIONS.labels('open').set(open_)
+    DB_POOL_CONNECTIONS.labels('in_use').set(in_use)
+    DB_POOL_CONNECTIONS.labels('idle').set(idle)
+
+
+def metrics_view():
+    """Prometheus text exposition, aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Time every request and expose /metrics."""
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import jsonify, request
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Raised when a cursor or filter query parameter is invalid."""
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode the (sort column, id) of the last row on a page as an opaque cursor."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (datetime, id)."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise PaginationError(f"Invalid cursor: {cursor}") from e
+
+
+def page_size():
+    """Read and clamp the ``limit`` query parameter."""
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_datetime_arg(name):
+    """Parse an optional ISO-8601 date/datetime query parameter."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise PaginationError(f"Invalid {name}: {value}") from e
+
+
+def paginated_response(items, next_cursor):
+    """Return a JSON array response with ETag and cursor headers.
+
+    The body stays a plain array; the cursor for the following page is sent
+    in ``X-Next-Cursor`` and a ``Link: rel="next"`` header. A request whose
+    ``If-None-Match`` matches the page's ETag gets a 304 with no body.
+    """
+    response = jsonify(items)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response.make_conditional(request)
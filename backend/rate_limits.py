@@ -0,0 +1,217 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits import parse_many
+from limits.storage import MovingWindowSupport, Storage
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS window_entries (
+    key TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_window_entries_key_ts ON window_entries (key, ts);
+"""
+
+# Expired rows for keys that are never hit again are swept every this many writes
+SQLITE_PURGE_EVERY = 10000
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Rate limit storage in a local SQLite file, shared by every worker process on the host.
+
+    Registered for ``sqlite:///relative.db`` and ``sqlite:////absolute/path.db``
+    URIs. Each thread keeps its own connection; the database runs in WAL
+    mode without fsync, since losing counters in a crash only resets limits.
+
+    Writers from every worker serialize on the file lock. A check waits at
+    most RATELIMIT_SQLITE_BUSY_TIMEOUT_MS for it and then raises, which the
+    limiter swallows (the request is let through) rather than stalling the
+    request for seconds behind other workers.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        self.path = uri.split('://', 1)[1][1:]
+        self._local = threading.local()
+        self._writes = 0
+        self._max_expiry = 0
+        self.busy_timeout = get_config().RATELIMIT_SQLITE_BUSY_TIMEOUT_MS / 1000
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.executescript(SQLITE_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, expiry=0):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            self._writes += 1
+            self._max_expiry = max(self._max_expiry, expiry)
+            if self._writes % SQLITE_PURGE_EVERY == 0:
+                now = time.time()
+                conn.execute("DELETE FROM window_entries WHERE ts <= ?", (now - self._max_expiry,))
+                conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        with self._transaction(expiry) as conn:
+            row = conn.execute("SELECT value, expires_at FROM counters WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                value, expires_at = amount, now + expiry
+            else:
+                value = row[0] + amount
+                expires_at = now + expiry if elastic_expiry else row[1]
+            conn.execute("INSERT OR REPLACE INTO counters (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, expires_at))
+        return value
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return int(row[0] if row else now)
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._transaction() as conn:
+            cleared = conn.execute("DELETE FROM counters").rowcount
+            cleared += conn.execute("DELETE FROM window_entries").rowcount
+        return cleared
+
+    def clear(self, key):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM counters WHERE key = ?", (key,))
+            conn.execute("DELETE FROM window_entries WHERE key = ?", (key,))
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._transaction(expiry) as conn:
+            conn.execute("DELETE FROM window_entries WHERE key = ? AND ts <= ?", (key, now - expiry))
+            count = conn.execute("SELECT COUNT(*) FROM window_entries WHERE key = ?", (key,)).fetchone()[0]
+            if count + amount > limit:
+                return False
+            conn.executemany("INSERT INTO window_entries (key, ts) VALUES (?, ?)", [(key, now)] * amount)
+        return True
+
+    def get_moving_window(self, key, limit, expiry):
+        now = time.time()
+        oldest, count = self._connection().execute(
+            "SELECT MIN(ts), COUNT(*) FROM window_entries WHERE key = ? AND ts > ?", (key, now - expiry)
+        ).fetchone()
+        return int(oldest if count else now), count
+
+
+def identity_key():
+    """Limit signed-in users by their JWT identity and everyone else by address."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # A bad or expired token is rejected by the route itself; count it against the address
+        identity = None
+    return f"user:{identity}" if identity else f"ip:{get_remote_address()}"
+
+
+limiter = Limiter(
+    key_func=identity_key,
+    default_limits=[get_config().RATELIMIT_DEFAULT],
+    storage_uri=get_config().RATELIMIT_STORAGE_URI,
+    strategy="moving-window",
+    headers_enabled=True,
+    # A storage outage falls back to per-process counters instead of failing requests
+    in_memory_fallback_enabled=True,
+    swallow_errors=True,
+)
+
+# Routes in the same class draw from one budget per identity, in place of the defaults
+COST_CLASSES = {
+    'auth': get_config().RATELIMIT_AUTH,
+    'ai': get_config().RATELIMIT_AI,
+    'bulk': get_config().RATELIMIT_BULK,
+    'status': get_config().RATELIMIT_STATUS,
+}
+
+
+def cost_class(name):
+    """Decorator applying the shared limits of cost class ``name`` to a route."""
+    return limiter.shared_limit(
+        COST_CLASSES[name], scope=name, exempt_when=lambda: request.method == 'OPTIONS'
+    )
+
+
+def hit(name, key):
+    """Count one request against cost class ``name`` outside Flask; return seconds to wait if over the limit."""
+    for item in parse_many(COST_CLASSES[name]):
+        try:
+            if not limiter.limiter.hit(item, key, name):
+                reset_at, _ = limiter.limiter.get_window_stats(item, key, name)
+                return max(1, int(reset_at - time.time()))
+        except Exception as e:
+            logger.error(f"Rate limit check failed for {key}: {e}")
+            return None
+    return None
+
+
+def counters(key):
+    """Current usage of every cost class for ``key``."""
+    report = {}
+    for name, limits in COST_CLASSES.items():
+        report[name] = []
+        for item in parse_many(limits):
+            reset_at, remaining = limiter.limiter.get_window_stats(item, key, name)
+            report[name].append({
+                "limit": str(item),
+                "used": item.amount - remaining,
+                "remaining": remaining,
+                "reset_at": int(reset_at),
+            })
+    return report
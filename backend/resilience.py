@@ -0,0 +1,344 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import wraps
+
+import openai
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+
+from config import get_config
+from metrics import UPSTREAM_ERRORS
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+RETRYABLE_AWS_CODES = {
+    'Throttling', 'ThrottlingException', 'SlowDown', 'RequestTimeout',
+    'RequestTimeoutException', 'InternalError', 'ServiceUnavailable',
+}
+
+
+# Monotonic time by which the attempt running in this thread or task must finish
+_attempt_deadline = contextvars.ContextVar('attempt_deadline', default=None)
+
+
+def attempt_timeout(default=None):
+    """Seconds left for the current Dependency attempt, to pass as the client's request timeout.
+
+    Outside Dependency.call/acall this returns ``default``.
+    """
+    deadline = _attempt_deadline.get()
+    if deadline is None:
+        return default
+    return max(0.001, deadline - time.monotonic())
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the dependency while its circuit breaker is open."""
+
+    def __init__(self, dependency, retry_after):
+        super().__init__(f"{dependency} circuit open; retry in {retry_after:.1f}s")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+def _status_code(exc):
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code
+    if isinstance(exc, ClientError):
+        return exc.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    # TwilioRestException and similar carry the HTTP status as ``status``
+    status = getattr(exc, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc):
+    """True for transient failures (timeouts, throttling, 5xx); False for errors a retry cannot fix."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (openai.APIConnectionError, BotoConnectionError, HTTPClientError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, ClientError) and exc.response.get('Error', {}).get('Code') in RETRYABLE_AWS_CODES:
+        return True
+    return _status_code(exc) in RETRYABLE_STATUS_CODES
+
+
+def retry_after(exc):
+    """Seconds the server asked us to wait (Retry-After header), or None."""
+    value = None
+    if isinstance(exc, openai.APIStatusError):
+        value = exc.response.headers.get('retry-after')
+    elif isinstance(exc, ClientError):
+        value = exc.response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive transient failures.
+
+    While open, calls fail fast with CircuitOpenError. After
+    ``reset_timeout`` seconds one probe call is let through (half-open);
+    its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the call may proceed; return True if it is the half-open probe."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+
+    def release_probe(self):
+        """Let the next call probe after the probe ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class Dependency:
+    """An external service called with classified retries, a deadline budget and a circuit breaker.
+
+    Retries use full jitter: each delay is uniform in [0, min(max_delay,
+    base_delay * 2**attempt)], or the server's Retry-After if it asked for
+    longer. No retry is started that would end past the deadline, and each
+    attempt may take at most min(attempt_timeout, time left before the
+    deadline); the called function applies that limit by passing
+    resilience.attempt_timeout() as its client's request timeout.
+    """
+
+    def __init__(self, name, max_attempts=3, base_delay=0.5, max_delay=8, deadline=30, attempt_timeout=30,
+                 failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        # Guards the counters below; attempts run on many threads and the asyncio loop
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.fatal_errors = 0
+        self.retries = 0
+        self.short_circuits = 0
+        self.deadline_exhausted = 0
+        self.total_latency = 0.0
+
+    def _attempt_started(self):
+        """Return (start time, whether this attempt is the half-open probe)."""
+        try:
+            probe = self.breaker.before_call()
+        except CircuitOpenError:
+            with self._lock:
+                self.short_circuits += 1
+            UPSTREAM_ERRORS.labels(self.name, 'circuit_open').inc()
+            raise
+        with self._lock:
+            self.calls += 1
+        return time.monotonic(), probe
+
+    def _attempt_finished(self, started, exc=None):
+        """Record the outcome of one attempt and return True if it should be retried."""
+        elapsed = time.monotonic() - started
+        if exc is None:
+            outcome = 'success'
+        elif is_retryable(exc):
+            outcome = 'transient'
+        else:
+            # The dependency answered; the request itself was bad
+            outcome = 'fatal'
+        with self._lock:
+            self.total_latency += elapsed
+            if outcome == 'success':
+                self.successes += 1
+            elif outcome == 'transient':
+                self.failures += 1
+            else:
+                self.fatal_errors += 1
+        if outcome == 'transient':
+            UPSTREAM_ERRORS.labels(self.name, 'transient').inc()
+            self.breaker.record_failure()
+            return True
+        if outcome == 'fatal':
+            UPSTREAM_ERRORS.labels(self.name, 'fatal').inc()
+        self.breaker.record_success()
+        return False
+
+    def _attempt_aborted(self, probe):
+        """The attempt was cancelled or interrupted: no outcome, but the probe slot must be freed."""
+        if probe:
+            self.breaker.release_probe()
+
+    def _attempt_deadline(self, budget_end, attempt_timeout):
+        return min(time.monotonic() + (attempt_timeout or self.attempt_timeout), budget_end)
+
+    def _next_delay(self, attempt, exc, budget_end):
+        """Delay before the next attempt, or None if retrying would blow the budget."""
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after(exc)
+        if requested is not None:
+            delay = max(delay, requested)
+        if time.monotonic() + delay >= budget_end:
+            with self._lock:
+                self.deadline_exhausted += 1
+            return None
+        with self._lock:
+            self.retries += 1
+        logger.warning(f"{self.name} attempt {attempt + 1} failed: {exc}. Retrying in {delay:.2f}s")
+        return delay
+
+    def call(self, func, *args, deadline=None, attempt_timeout=None, **kwargs):
+        budget_end = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            started, probe = self._attempt_started()
+            token = _attempt_deadline.set(self._attempt_deadline(budget_end, attempt_timeout))
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not self._attempt_finished(started, e):
+                    raise
+                delay = self._next_delay(attempt, e, budget_end)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self._attempt_aborted(probe)
+                raise
+            finally:
+                _attempt_deadline.reset(token)
+            self._attempt_finished(started)
+            return result
+
+    async def acall(self, func, *args, deadline=None, attempt_timeout=None, **kwargs):
+        """Async variant of call; ``func`` returns an awaitable and backoff uses asyncio.sleep."""
+        budget_end = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            started, probe = self._attempt_started()
+            token = _attempt_deadline.set(self._attempt_deadline(budget_end, attempt_timeout))
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                if not self._attempt_finished(started, e):
+                    raise
+                delay = self._next_delay(attempt, e, budget_end)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # asyncio.CancelledError (e.g. a client closed a stream) is not an Exception
+                self._attempt_aborted(probe)
+                raise
+            finally:
+                _attempt_deadline.reset(token)
+            self._attempt_finished(started)
+            return result
+
+    def retrying(self, func=None, *, deadline=None, attempt_timeout=None):
+        """Decorator form of ``call``; use bare or with ``deadline``/``attempt_timeout`` overrides."""
+        if func is None:
+            return lambda f: self.retrying(f, deadline=deadline, attempt_timeout=attempt_timeout)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, deadline=deadline, attempt_timeout=attempt_timeout, **kwargs)
+        return wrapper
+
+    def stats(self):
+        with self._lock:
+            return {
+                "circuit": self.breaker.state,
+                "times_opened": self.breaker.times_opened,
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "fatal_errors": self.fatal_errors,
+                "retries": self.retries,
+                "short_circuits": self.short_circuits,
+                "deadline_exhausted": self.deadline_exhausted,
+                "avg_latency_seconds": round(self.total_latency / self.calls, 3) if self.calls else None,
+            }
+
+
+def _dependency(name):
+    conf = get_config()
+    return Dependency(
+        name,
+        max_attempts=conf.RETRY_MAX_ATTEMPTS,
+        base_delay=conf.RETRY_BASE_DELAY,
+        max_delay=conf.RETRY_MAX_DELAY,
+        deadline=conf.RETRY_DEADLINE,
+        attempt_timeout=conf.RETRY_ATTEMPT_TIMEOUT,
+        failure_threshold=conf.BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=conf.BREAKER_RESET_TIMEOUT,
+    )
+
+
+s3 = _dependency('s3')
+openai_api = _dependency('openai')
+
+DEPENDENCIES = {dep.name: dep for dep in (s3, openai_api)}
+
+
+def dependency_stats():
+    return {name: dep.stats() for name, dep in DEPENDENCIES.items()}
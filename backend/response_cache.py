@@ -0,0 +1,208 @@
+import json
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+
+from config import get_config
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBackend:
+    """In-process LRU backend; each worker process keeps its own entries."""
+
+    def __init__(self, maxsize=1024):
+        self._entries = TTLCache(maxsize=maxsize)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, entry, ttl):
+        self._entries.set(key, entry, ttl=ttl)
+
+    def generation(self, tag):
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def stats(self):
+        return dict(self._entries.stats(), backend="local")
+
+
+class RedisBackend:
+    """Shared backend so every worker process sees the same entries and invalidations."""
+
+    def __init__(self, url, prefix='response-cache'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self._redis.get(f"{self._prefix}:{key}")
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, entry, ttl):
+        self._redis.set(f"{self._prefix}:{key}", json.dumps(entry), ex=max(1, int(ttl)))
+
+    def generation(self, tag):
+        return int(self._redis.get(f"{self._prefix}:gen:{tag}") or 0)
+
+    def bump(self, tag):
+        self._redis.incr(f"{self._prefix}:gen:{tag}")
+
+    def stats(self):
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+
+def _create_backend():
+    conf = get_config()
+    if conf.RESPONSE_CACHE_URL:
+        try:
+            return RedisBackend(conf.RESPONSE_CACHE_URL)
+        except Exception as e:
+            logger.warning(f"Shared response cache unavailable ({e}), using in-process cache")
+    return LocalBackend(maxsize=conf.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+backend = _create_backend()
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def invalidate(*tags):
+    """Drop every cached response tagged with any of ``tags``."""
+    for tag in tags:
+        try:
+            backend.bump(tag)
+        except Exception as e:
+            logger.error(f"Failed to invalidate response cache tag '{tag}': {e}")
+
+
+def cache_stats():
+    return backend.stats()
+
+
+def _cache_key(tags):
+    generations = ','.join(f"{tag}{backend.generation(tag)}" for tag in tags)
+    query = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    return f"{generations}:{request.path}?{query}"
+
+
+def _store(key, response, ttl, stale):
+    now = time.time()
+    entry = {
+        "body": response.get_data(as_text=True),
+        "status": response.status_code,
+        "headers": [(k, v) for k, v in response.headers.items() if k.lower() not in ('content-length', 'set-cookie')],
+        "fresh_until": now + ttl,
+    }
+    backend.set(key, entry, ttl + stale)
+
+
+def _from_entry(entry):
+    response = Response(entry["body"], status=entry["status"], headers=entry["headers"])
+    return response.make_conditional(request)
+
+
+def _single_flight(key):
+    """Return (lock, is_leader) for a key; the leader holds the lock until _finish_flight."""
+    with _inflight_lock:
+        lock = _inflight.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            lock.acquire()
+            _inflight[key] = lock
+            return lock, True
+        return lock, False
+
+
+def _finish_flight(key, lock):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    lock.release()
+
+
+def cached_response(ttl, stale=None, tags=('analytics',)):
+    """Cache successful GET responses of a view for ``ttl`` seconds.
+
+    After ``ttl`` an entry is served stale for up to ``stale`` more seconds
+    while a single background refresh recomputes it. Concurrent misses for
+    the same key wait for one computation instead of each running the view.
+    """
+    stale = ttl if stale is None else stale
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or not get_config().RESPONSE_CACHE_ENABLED:
+                return view(*args, **kwargs)
+
+            try:
+                key = _cache_key(tags)
+                entry = backend.get(key)
+            except Exception as e:
+                logger.error(f"Response cache lookup failed: {e}")
+                return view(*args, **kwargs)
+
+            app = current_app._get_current_object()
+            full_path = request.full_path
+
+            def compute():
+                # Run the view in a clean context so request conditionals never produce a cached 304
+                with app.test_request_context(full_path, method='GET'):
+                    response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    try:
+                        _store(key, response, ttl, stale)
+                    except Exception as e:
+                        logger.error(f"Response cache store failed: {e}")
+                return response
+
+            if entry is not None:
+                if entry["fresh_until"] < time.time():
+                    lock, leader = _single_flight(key)
+                    if leader:
+                        def revalidate():
+                            try:
+                                compute()
+                            except Exception as e:
+                                logger.error(f"Background revalidation of {full_path} failed: {e}")
+                            finally:
+                                _finish_flight(key, lock)
+                        threading.Thread(target=revalidate, daemon=True).start()
+                return _from_entry(entry)
+
+            lock, leader = _single_flight(key)
+            if not leader:
+                # Someone else is computing this entry; wait for it and reuse the result
+                if lock.acquire(timeout=get_config().RESPONSE_CACHE_WAIT_TIMEOUT):
+                    lock.release()
+                    entry = backend.get(key)
+                    if entry is not None:
+                        return _from_entry(entry)
+                return view(*args, **kwargs)
+
+            try:
+                response = compute()
+            finally:
+                _finish_flight(key, lock)
+            return response.make_conditional(request)
+
+        return wrapper
+    return decorator
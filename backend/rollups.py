@@ -0,0 +1,167 @@
+import logging
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+from config import get_config
+from db_pool import db_connection, db_cursor
+from response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+# metric name -> (source table, timestamp column, status expression)
+ROLLUP_SOURCES = {
+    'inquiries': ('inquiries', 'start_time', "COALESCE(status, '')"),
+    'escalations': ('human_escalation', 'initiated_at', "'escalated'"),
+    'voice_complaints': ('voice_complaints', 'created_at', 'status'),
+}
+
+
+def adjust_rollup(cursor, metric, changes, bucket_date=None):
+    """Add ``changes`` ({status: delta}) to one day's daily and monthly buckets of ``metric``.
+
+    Runs on the caller's cursor, so the counts commit or roll back with the
+    write they describe. ``bucket_date`` defaults to the database's
+    CURDATE(), matching rows stamped with NOW(). Bucket rows are always
+    updated in the same order, so concurrent writers queue instead of
+    deadlocking. Counts never go below zero; refresh_rollup repairs drift.
+    """
+    if bucket_date is None:
+        cursor.execute("SELECT CURDATE()")
+        bucket_date = cursor.fetchone()[0]
+    changes = sorted((status, delta) for status, delta in changes.items() if delta)
+    for table, column, bucket in (
+        ('analytics_daily_rollup', 'bucket_date', bucket_date),
+        ('analytics_monthly_rollup', 'bucket_month', bucket_date.replace(day=1)),
+    ):
+        for status, delta in changes:
+            cursor.execute(f"""
+                INSERT INTO {table} (metric, {column}, status, count)
+                VALUES (%s, %s, %s, GREATEST(%s, 0))
+                ON DUPLICATE KEY UPDATE count = GREATEST(count + %s, 0)
+            """, (metric, bucket, status, delta, delta))
+
+
+def refresh_rollup(metric, since=None):
+    """Recompute the daily and monthly buckets of ``metric`` from ``since`` onwards.
+
+    Buckets are rebuilt from the source table for the affected date range
+    only, so the cost is proportional to the rows in that range; passing
+    ``since=None`` rebuilds the whole history. This is the periodic
+    reconcile; per-row writes use adjust_rollup instead.
+    """
+    table, ts_column, status_expr = ROLLUP_SOURCES[metric]
+    since = since or date(1970, 1, 1)
+    month_start = since.replace(day=1)
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "DELETE FROM analytics_daily_rollup WHERE metric = %s AND bucket_date >= %s",
+                (metric, since)
+            )
+            cursor.execute(f"""
+                INSERT INTO analytics_daily_rollup (metric, bucket_date, status, count)
+                SELECT %s, DATE({ts_column}), {status_expr}, COUNT(*)
+                FROM {table}
+                WHERE {ts_column} >= %s
+                GROUP BY DATE({ts_column}), {status_expr}
+            """, (metric, since))
+
+            cursor.execute(
+                "DELETE FROM analytics_monthly_rollup WHERE metric = %s AND bucket_month >= %s",
+                (metric, month_start)
+            )
+            cursor.execute("""
+                INSERT INTO analytics_monthly_rollup (metric, bucket_month, status, count)
+                SELECT metric, bucket_date - INTERVAL (DAYOFMONTH(bucket_date) - 1) DAY AS bucket_month,
+                       status, SUM(count)
+                FROM analytics_daily_rollup
+                WHERE metric = %s AND bucket_date >= %s
+                GROUP BY metric, bucket_month, status
+            """, (metric, month_start))
+            conn.commit()
+        finally:
+            cursor.close()
+
+    invalidate('analytics')
+
+
+def refresh_recent_rollups():
+    """Refresh the last ROLLUP_REFRESH_DAYS of every metric; returns the number of metrics refreshed."""
+    since = datetime.now(timezone.utc).date() - timedelta(days=get_config().ROLLUP_REFRESH_DAYS)
+    for metric in ROLLUP_SOURCES:
+        refresh_rollup(metric, since)
+    return len(ROLLUP_SOURCES)
+
+
+def rebuild_rollups():
+    """Rebuild every rollup from the full history."""
+    for metric in ROLLUP_SOURCES:
+        refresh_rollup(metric)
+        logger.info(f"Rebuilt '{metric}' rollups")
+
+
+def metric_totals():
+    """Return all-time totals per metric, summed over monthly buckets."""
+    with db_cursor() as cursor:
+        cursor.execute("""
+            SELECT metric, SUM(count) FROM analytics_monthly_rollup GROUP BY metric
+        """)
+        totals = {metric: int(total) for metric, total in cursor.fetchall()}
+    return {metric: totals.get(metric, 0) for metric in ROLLUP_SOURCES}
+
+
+def resolution_totals():
+    """Return (total inquiries, human escalations) for the dashboard ratios."""
+    totals = metric_totals()
+    return totals['inquiries'], totals['escalations']
+
+
+def resolution_percentages():
+    """Return (AI-resolved %, human-escalated %) of all inquiries."""
+    total_inquiries, escalations = resolution_totals()
+    if total_inquiries == 0:
+        return 0, 0
+    escalations = min(escalations, total_inquiries)
+    ai_resolved = total_inquiries - escalations
+    return (
+        round((ai_resolved / total_inquiries) * 100, 2),
+        round((escalations / total_inquiries) * 100, 2)
+    )
+
+
+def monthly_resolution_series(months=6):
+    """Return the last ``months`` months of AI-resolved vs escalated counts, oldest first."""
+    today = datetime.now(timezone.utc).date().replace(day=1)
+    buckets = [today]
+    for _ in range(months - 1):
+        buckets.insert(0, (buckets[0] - timedelta(days=1)).replace(day=1))
+
+    with db_cursor() as cursor:
+        cursor.execute("""
+            SELECT bucket_month, metric, SUM(count)
+            FROM analytics_monthly_rollup
+            WHERE metric IN ('inquiries', 'escalations') AND bucket_month >= %s
+            GROUP BY bucket_month, metric
+        """, (buckets[0],))
+        counts = {(month, metric): int(total) for month, metric, total in cursor.fetchall()}
+
+    series = []
+    for month in buckets:
+        inquiries = counts.get((month, 'inquiries'), 0)
+        escalated = counts.get((month, 'escalations'), 0)
+        series.append({
+            "name": month.strftime('%b'),
+            "resolved": max(inquiries - escalated, 0),
+            "escalated": escalated
+        })
+    return series
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] == ['rebuild']:
+        rebuild_rollups()
+    else:
+        refresh_recent_rollups()
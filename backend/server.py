@@ -1,166 +1,157 @@
 import os
-import json
 import logging
-from openai import OpenAI
-from flask import Flask, request, jsonify, render_template
+import time
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, render_template, stream_with_context, url_for
 from flask_cors import CORS
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
+from flask_jwt_extended import (
+    JWTManager, create_access_token, create_refresh_token, decode_token, get_jwt,
+    get_jwt_identity, jwt_required, verify_jwt_in_request
+)
+from jwt.exceptions import PyJWTError
+from datetime import datetime
 import mysql.connector
+from db_pool import db_cursor, get_pool
+from response_cache import cached_response, cache_stats as response_cache_stats
+from upload_registry import count_uploads, list_uploads, upload_exists
+from pagination import PaginationError, decode_cursor, encode_cursor, page_size, paginated_response, parse_datetime_arg
 import traceback
 from dotenv import load_dotenv
-from awsConfig import upload_to_s3, AWS_BUCKET_NAME, s3_client
-import tempfile
-from functools import wraps
-import time
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from awsConfig import (
+    upload_to_s3, AWS_BUCKET_NAME, content_key, hash_file,
+    presign_upload, complete_upload, abort_upload, UploadRejected
+)
+from ai_client import chat_service, sse_event
+from auth import MAX_PASSWORD_BYTES, AuthBusyError, is_token_revoked, password_hasher, revoke_token
+from resilience import CircuitOpenError, dependency_stats
+from health import health_checker
+from rate_limits import cost_class, counters as rate_limit_counters, identity_key, limiter
+from batch_processing import keys_under_prefix
+from voice_pipeline import (
+    create_complaint_job, create_complaint_jobs, submit_complaint, get_complaint, complaint_progress,
+    cached_result, record_completed_complaint, cache_stats, ObjectNotFound
+)
 from flask_talisman import Talisman
-from twilio.rest import Client
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from sync_scheduler import (
+    twilio_scheduler, rollup_scheduler, upload_reconcile_scheduler, complaint_requeue_scheduler, twilio_sync_lag
 )
+from rollups import monthly_resolution_series, resolution_percentages
+from config import cors_policy, get_config
+from log_config import configure_logging
+import metrics
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
+# Extensions are bound to the app in create_app (the rate limiter lives in rate_limits)
+jwt = JWTManager()
 
-# Configure app
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default_secret_key')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+api = Blueprint('api', __name__)
 
-# Initialize rate limiter
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
 
-# Initialize Talisman for security headers
-Talisman(app,
-    content_security_policy={
-        'default-src': "'self'",
-        'img-src': '*',
-        'script-src': ["'self'", "'unsafe-inline'"],
-        'style-src': ["'self'", "'unsafe-inline'"]
-    },
-    force_https=False  # Set to True in production
-)
+def create_app():
+    """Build and configure the Flask app.
+
+    Nothing here touches the network: the database pool, S3/OpenAI/Twilio
+    clients and caches are created on first use, and schema changes live
+    in db_migrations.run_migrations.
+    """
+    configure_logging()
+    app = Flask(__name__)
 
-# Initialize extensions with updated CORS configuration
-CORS(app, 
-     resources={
-         r"/*": {
-             "origins": ["http://localhost:8000", "http://127.0.0.1:8000", "http://localhost:8080", "http://127.0.0.1:8080", "http://localhost:8081", "http://127.0.0.1:8081"],
-             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-             "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With", "Access-Control-Allow-Credentials"],
-             "expose_headers": ["Content-Type", "Authorization"],
-             "supports_credentials": True,
-             "max_age": 120
+    # Configure app
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default_secret_key')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = get_config().JWT_ACCESS_TOKEN_EXPIRES
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = get_config().JWT_REFRESH_TOKEN_EXPIRES
+
+    limiter.init_app(app)
+    app.register_error_handler(429, _rate_limited)
+
+    # Request latency histograms and the Prometheus /metrics endpoint
+    metrics.init_app(app)
+    limiter.exempt(metrics.metrics_view)
+
+    # Initialize Talisman for security headers
+    Talisman(app,
+        content_security_policy={
+            'default-src': "'self'",
+            'img-src': '*',
+            'script-src': ["'self'", "'unsafe-inline'"],
+            'style-src': ["'self'", "'unsafe-inline'"]
+        },
+        force_https=False  # Set to True in production
+    )
+
+    cors_origins, cors_credentials = cors_policy()
+    CORS(app,
+         resources={
+             r"/*": {
+                 "origins": cors_origins,
+                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+                 "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With", "Access-Control-Allow-Credentials"],
+                 "expose_headers": ["Content-Type", "Authorization", "ETag", "Link", "X-Next-Cursor", "Retry-After"],
+                 "supports_credentials": cors_credentials,
+                 "max_age": 120
+             }
          }
-     }
-)
-bcrypt = Bcrypt(app)
-jwt = JWTManager(app)
-
-# Database configuration
-db_config = {
-    "host": os.getenv('DB_HOST', 'localhost'),
-    "user": os.getenv('DB_USER', 'root'),
-    "password": os.getenv('DB_PASSWORD', ''),
-    "database": os.getenv('DB_NAME', 'clearcall'),
-    "port": int(os.getenv('DB_PORT', 3306))
-}
-
-def get_db_connection():
-    try:
-        logger.info("Attempting to connect to the database")
-        connection = mysql.connector.connect(**db_config)
-        logger.info("Database connection successful")
-        return connection
-    except mysql.connector.Error as err:
-        logger.error(f"Database connection failed: {err}")
-        raise
-
-def init_db():
-    """Initialize database tables if they don't exist."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Create voice_complaints table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS voice_complaints (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                s3_file_path VARCHAR(255) NOT NULL,
-                transcript TEXT,
-                ai_response TEXT,
-                status ENUM('pending', 'processing', 'completed', 'failed') DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-        """)
-        
-        cursor.execute("""
-    CREATE TABLE IF NOT EXISTS inquiries (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        call_sid VARCHAR(64) NOT NULL,
-        caller_number VARCHAR(20),
-        recipient_number VARCHAR(20),
-        duration INT,
-        start_time DATETIME,
-        status VARCHAR(20),
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""")
-
-
-        logger.info("Database tables initialized successfully")
-        conn.commit()
-
-    except mysql.connector.Error as err:
-        logger.error(f"Error initializing database: {err}")
-        raise
-
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
-# Initialize database tables when the application starts
-with app.app_context():
-    init_db()
+    )
+    jwt.init_app(app)
+
+    app.register_blueprint(api)
+
+    # Ingest Twilio calls and refresh analytics rollups in the background instead of on page loads
+    if get_config().TWILIO_SYNC_IN_PROCESS:
+        twilio_scheduler.start()
+        rollup_scheduler.start()
+        upload_reconcile_scheduler.start()
+    # Always in-process: it requeues complaints onto this process's worker pool
+    complaint_requeue_scheduler.start()
+
+    return app
+
+
+def _rate_limited(e):
+    """JSON body for 429s; Flask-Limiter has already set Retry-After and the X-RateLimit headers."""
+    return jsonify({"error": f"Rate limit exceeded: {e.description}"}), 429
+
 
 # Route for root URL
-@app.route('/')
+@api.route('/')
 def home():
     # Return a simple JSON response instead of trying to render a template
-    print("Root route hit")
     return jsonify({"message": "ClearCall API is running"}), 200
 
 # Route to handle favicon.ico requests
-@app.route('/favicon.ico')
+@api.route('/favicon.ico')
 def favicon():
     return "", 204
 
+@jwt.token_in_blocklist_loader
+def _token_revoked(jwt_header, jwt_payload):
+    return is_token_revoked(jwt_payload)
+
+
+def _auth_busy_response():
+    response = jsonify({"error": "Authentication is busy. Please retry shortly."})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def _issue_tokens(user):
+    identity = str(user['id'])
+    claims = {"role": user['role']}
+    return {
+        "access_token": create_access_token(identity=identity, additional_claims=claims),
+        "refresh_token": create_refresh_token(identity=identity, additional_claims=claims),
+    }
+
 # /signup endpoint
-@app.route('/signup', methods=['POST'])
+@api.route('/signup', methods=['POST'])
+@cost_class('auth')
 def signup():
-    print("Signup endpoint hit")
     try:
         data = request.get_json(force=True)
-        print('Received signup request with data:', data)
         name = data.get('name')
         email = data.get('email')
         password = data.get('password')
@@ -169,216 +160,293 @@ def signup():
 
         # Validate required fields
         if not all([name, email, password, phone, role]):
-            print('Validation failed: Missing required fields')
+            logger.info("Signup rejected: missing required fields")
             return jsonify({"error": "All fields (name, email, password, phone, role) are required."}), 400
 
         # Basic role validation
         if role not in ["user", "admin"]:
-            print('Validation failed: Invalid role')
+            logger.info("Signup rejected: invalid role")
             return jsonify({"error": "Invalid role. Must be 'user' or 'admin'."}), 400
 
         # Optional: basic email format check
         if '@' not in email or '.' not in email:
-            print('Validation failed: Invalid email format')
+            logger.info("Signup rejected: invalid email format")
             return jsonify({"error": "Invalid email format."}), 400
 
-        # Hash the password
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-        print('Password hashed successfully')
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        try:
-            # Check for existing email
-            cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-            if cursor.fetchone():
-                print('Signup failed: Email already exists')
-                return jsonify({"error": "User with this email already exists."}), 409
+        if len(password.encode('utf-8')) > MAX_PASSWORD_BYTES:
+            logger.info("Signup rejected: password too long")
+            return jsonify({"error": f"Password must be at most {MAX_PASSWORD_BYTES} bytes."}), 400
 
-            # Insert new user
-            query = """
-                INSERT INTO users (name, email, phone, hashed_password, role)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (name, email, phone, hashed_password, role))
-            conn.commit()
-            print('User inserted successfully into the database')
+        # Reject duplicates before paying for a hash
+        with db_cursor() as cursor:
+            cursor.execute("SELECT 1 FROM users WHERE email = %s LIMIT 1", (email,))
+            exists = cursor.fetchone() is not None
+        if exists:
+            logger.info("Signup rejected: email already registered")
+            return jsonify({"error": "User with this email already exists."}), 409
 
-            return jsonify({"success": True, "message": "User registered successfully."}), 201
+        hashed_password = password_hasher.hash(password)
 
-        except mysql.connector.Error as db_err:
-            print(f"Database error during signup: {db_err}")
-            return jsonify({"error": "Database error occurred. Please try again later."}), 500
+        with db_cursor(commit=True) as cursor:
+            try:
+                cursor.execute(
+                    "INSERT INTO users (name, email, phone, hashed_password, role) VALUES (%s, %s, %s, %s, %s)",
+                    (name, email, phone, hashed_password, role)
+                )
+            except mysql.connector.IntegrityError:
+                # Lost a race with a concurrent signup for the same email
+                logger.info("Signup rejected: email already registered")
+                return jsonify({"error": "User with this email already exists."}), 409
+            logger.info("User registered", extra={"user_id": cursor.lastrowid, "role": role})
 
-        finally:
-            cursor.close()
-            conn.close()
+        return jsonify({"success": True, "message": "User registered successfully."}), 201
 
+    except AuthBusyError:
+        return _auth_busy_response()
+    except mysql.connector.Error as db_err:
+        logger.error(f"Database error during signup: {db_err}")
+        return jsonify({"error": "Database error occurred. Please try again later."}), 500
     except Exception as e:
-        print(f"Unexpected error during signup: {e}")
-        traceback.print_exc()
+        logger.exception(f"Unexpected error during signup: {e}")
         return jsonify({"error": "An unexpected error occurred. Please try again later."}), 500
 
 
-# Updated login function to properly verify hashed passwords
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
+@cost_class('auth')
 def login():
-    print("Login endpoint hit")
     try:
-        data = request.json
+        data = request.get_json(force=True)
         email = data.get('email')
         password = data.get('password')
 
         if not email or not password:
             return jsonify({"error": "Email and password are required"}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        
-        try:
-            # Fetch user by email
-            cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
+        with db_cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT id, role, hashed_password FROM users WHERE email = %s", (email,))
             user = cursor.fetchone()
 
-            if not user or not bcrypt.check_password_hash(user['hashed_password'], password):
-                return jsonify({"error": "Invalid email or password"}), 401
+        # Signup already reveals whether an email exists, so unknown emails skip the hash
+        if not user:
+            return jsonify({"error": "Invalid email or password"}), 401
 
-            return jsonify({"success": True, "message": "Login successful"}), 200
+        matches, needs_rehash = password_hasher.verify(password, user['hashed_password'])
+        if not matches:
+            return jsonify({"error": "Invalid email or password"}), 401
 
-        except mysql.connector.Error as db_err:
-            print(f"Database error during login: {db_err}")
-            return jsonify({"error": "Database error occurred. Please try again later."}), 500
+        if needs_rehash:
+            # Upgrade to the configured work factor while we have the plaintext
+            try:
+                new_hash = password_hasher.hash(password)
+                with db_cursor(commit=True) as cursor:
+                    cursor.execute(
+                        "UPDATE users SET hashed_password = %s WHERE id = %s AND hashed_password = %s",
+                        (new_hash, user['id'], user['hashed_password'])
+                    )
+                logger.info("Password hash upgraded", extra={"user_id": user['id']})
+            except Exception as e:
+                # The old hash still works; try again on the next login
+                logger.warning(f"Password rehash failed for user {user['id']}: {e}")
 
-        finally:
-            cursor.close()
-            conn.close()
+        return jsonify({
+            "success": True,
+            "message": "Login successful",
+            "userId": user['id'],
+            "role": user['role'],
+            **_issue_tokens(user),
+        }), 200
 
+    except AuthBusyError:
+        return _auth_busy_response()
+    except mysql.connector.Error as db_err:
+        logger.error(f"Database error during login: {db_err}")
+        return jsonify({"error": "Database error occurred. Please try again later."}), 500
     except Exception as e:
-        print(f"Unexpected error during login: {e}")
+        logger.exception(f"Unexpected error during login: {e}")
         return jsonify({"error": "An unexpected error occurred. Please try again later."}), 500
 
+
+@api.route('/refresh', methods=['POST'])
+@cost_class('auth')
+@jwt_required(refresh=True)
+def refresh():
+    """Exchange a refresh token for a new access token."""
+    claims = get_jwt()
+    access_token = create_access_token(identity=get_jwt_identity(), additional_claims={"role": claims.get('role')})
+    return jsonify({"access_token": access_token}), 200
+
 # /logout endpoint
-@app.route('/logout', methods=['POST'])
+@api.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
+    """Revoke the access token, and the refresh token if one is sent as ``refresh_token``."""
     try:
-        # JWT revocation can be implemented here if needed
+        revoke_token(get_jwt())
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            try:
+                payload = decode_token(refresh_token, allow_expired=True)
+                if payload.get('sub') == get_jwt_identity():
+                    revoke_token(payload)
+            except PyJWTError:
+                pass
         return jsonify({"success": True, "message": "Logged out successfully"}), 200
 
     except Exception as e:
-        print(f"Unexpected error: {e}")
-        traceback.print_exc()
+        logger.exception(f"Unexpected error during logout: {e}")
         return jsonify({"error": "An unexpected error occurred. Please try again later."}), 500
 
 # Protected route example
-@app.route('/protected', methods=['GET'])
+@api.route('/protected', methods=['GET'])
 @jwt_required()
 def protected():
     current_user = get_jwt_identity()
     return jsonify({"logged_in_as": current_user})
 
-# Route to serve the completed_calls.json file
-@app.route('/api/completed-calls', methods=['GET'])
+@api.route('/api/rate-limits', methods=['GET'])
+def rate_limits():
+    """Usage of each cost class for the caller; admins may pass ?key=user:<id> or ?key=ip:<address>."""
+    key = identity_key()
+    requested = request.args.get('key')
+    if requested and requested != key:
+        verify_jwt_in_request()
+        if get_jwt().get('role') != 'admin':
+            return jsonify({"error": "Only admins can inspect other keys"}), 403
+        key = requested
+    return jsonify({"key": key, "limits": rate_limit_counters(key)}), 200
+
+def _completed_calls_filters():
+    """Build the WHERE clause for the completed-calls filters in the query string."""
+    clauses = ["start_time IS NOT NULL"]
+    params = []
+
+    start = parse_datetime_arg('start')
+    if start:
+        clauses.append("start_time >= %s")
+        params.append(start)
+    end = parse_datetime_arg('end')
+    if end:
+        clauses.append("start_time < %s")
+        params.append(end)
+    status = request.args.get('status')
+    if status:
+        clauses.append("status = %s")
+        params.append(status)
+    caller = request.args.get('caller')
+    if caller:
+        clauses.append("caller_number = %s")
+        params.append(caller)
+
+    return clauses, params
+
+# Route to serve completed calls from the inquiries table
+@api.route('/api/completed-calls', methods=['GET'])
+@cached_response(ttl=30, tags=('calls',))
 def get_completed_calls():
+    """Return one page of calls, newest first, keyed on (start_time, id)."""
     try:
-        # Get the path to the completed_calls.json file
-        file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'completed_calls.json')
-        
-        # Check if the file exists
-        if not os.path.exists(file_path):
-            # Return an empty array if file doesn't exist
-            return jsonify([]), 200
-            
-        # Read the file and return its contents
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            
-        return jsonify(data), 200
-        
+        clauses, params = _completed_calls_filters()
+        cursor_arg = request.args.get('cursor')
+        if cursor_arg:
+            last_start_time, last_id = decode_cursor(cursor_arg)
+            clauses.append("(start_time < %s OR (start_time = %s AND id < %s))")
+            params.extend([last_start_time, last_start_time, last_id])
+        limit = page_size()
+
+        with db_cursor(dictionary=True) as cursor:
+            cursor.execute(f"""
+                SELECT id, call_sid, caller_number, recipient_number, duration, start_time, status
+                FROM inquiries
+                WHERE {' AND '.join(clauses)}
+                ORDER BY start_time DESC, id DESC
+                LIMIT %s
+            """, (*params, limit + 1))
+            rows = cursor.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['start_time'], rows[-1]['id'])
+
+        calls = [
+            {
+                "from": row['caller_number'],
+                "to": row['recipient_number'],
+                "status": row['status'],
+                "duration": str(row['duration']),
+                "start_time": f"{row['start_time']}+00:00",
+                "sid": row['call_sid']
+            }
+            for row in rows
+        ]
+        return paginated_response(calls, next_cursor)
+
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error serving completed_calls.json: {e}")
+        logger.error(f"Error fetching completed calls: {e}")
         return jsonify({"error": "Failed to retrieve call data"}), 500
 
-@app.route('/api/sync-twilio-inquiries', methods=['POST'])
-def sync_twilio_logs():
+@api.route('/api/completed-calls/count', methods=['GET'])
+@cached_response(ttl=30, tags=('calls',))
+def get_completed_calls_count():
+    """Return the number of calls matching the completed-calls filters."""
     try:
-        # Load Twilio credentials
-        account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-        auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-        phone_number = os.getenv('TWILIO_PHONE_NUMBER')
-        client = Client(account_sid, auth_token)
-
-        # Fetch all calls made TO your Twilio number
-        calls = client.calls.list(to=phone_number)
-
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-
-        # Filter completed calls for this month
-        completed_calls = [
-            call for call in calls
-            if call.status == "completed" and call.start_time and call.start_time.month == current_month and call.start_time.year == current_year
-        ]
+        clauses, params = _completed_calls_filters()
+        with db_cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM inquiries WHERE {' AND '.join(clauses)}", params)
+            count = cursor.fetchone()[0]
+        return jsonify({"count": count}), 200
+
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error counting completed calls: {e}")
+        return jsonify({"error": "Failed to retrieve call data"}), 500
 
-        # Insert into inquiries table
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        insert_query = """
-            INSERT INTO inquiries (
-                call_sid, caller_number, recipient_number, duration, start_time, status
-            ) VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE duration=VALUES(duration), status=VALUES(status)
-        """
-
-        for call in completed_calls:
-            cursor.execute(insert_query, (
-                call.sid,
-                call._from,  # caller
-                call.to,     # recipient
-                int(call.duration) if call.duration else 0,
-                call.start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                call.status
-            ))
-
-        conn.commit()
-        logger.info(f"Synced {len(completed_calls)} Twilio calls to 'inquiries' table")
-        return jsonify({"message": f"Synced {len(completed_calls)} calls"}), 200
+@api.route('/api/sync-twilio-inquiries', methods=['POST'])
+@cost_class('bulk')
+def sync_twilio_logs():
+    """Run a Twilio sync now; concurrent requests share the run already in progress."""
+    try:
+        result = twilio_scheduler.trigger()
+        if result["error"]:
+            return jsonify({"error": "Failed to sync Twilio logs"}), 500
+        if result["skipped"]:
+            return jsonify({"message": "A sync is already running in another worker"}), 202
+        return jsonify({"message": f"Synced {result['rows']} calls"}), 200
 
     except Exception as e:
         logger.error(f"Twilio sync error: {str(e)}")
         return jsonify({"error": "Failed to sync Twilio logs"}), 500
 
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+@api.route('/api/sync-twilio-inquiries/status', methods=['GET'])
+def sync_twilio_status():
+    """Report the last Twilio sync run and ingestion lag."""
+    status = twilio_scheduler.status()
+    try:
+        status["lag_seconds"] = twilio_sync_lag()
+    except Exception as e:
+        logger.error(f"Failed to compute Twilio sync lag: {e}")
+        status["lag_seconds"] = None
+    return jsonify(status), 200
 
-@app.route('/api/monthly-summary', methods=['GET', 'OPTIONS'])
+@api.route('/api/monthly-summary', methods=['GET', 'OPTIONS'])
+@cached_response(ttl=300)
 def get_monthly_summary():
     """Return monthly data for resolved vs escalated complaints."""
     if request.method == 'OPTIONS':
         return handle_preflight()
         
     try:
-        # For demo purposes, returning mock data
-        # In a production environment, this would query the database
-        return jsonify([
-            { "name": 'Jan', "resolved": 65, "escalated": 15 },
-            { "name": 'Feb', "resolved": 59, "escalated": 12 },
-            { "name": 'Mar', "resolved": 80, "escalated": 8 },
-            { "name": 'Apr', "resolved": 81, "escalated": 10 },
-            { "name": 'May', "resolved": 76, "escalated": 11 },
-            { "name": 'Jun', "resolved": 85, "escalated": 7 },
-        ]), 200
+        return jsonify(monthly_resolution_series()), 200
     except Exception as e:
         logger.error(f"Error fetching monthly summary: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/upload', methods=['POST'])
+@api.route('/upload', methods=['POST'])
+@cost_class('bulk')
+@jwt_required()
 def upload_file():
     """Handle file upload and store it in S3."""
     if 'file' not in request.files:
@@ -389,91 +457,137 @@ def upload_file():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    # Upload the file to S3
-    upload_message = upload_to_s3(file, AWS_BUCKET_NAME)
+    user_id = get_jwt_identity()
+
+    # Identical files share a content-addressed key, so a re-upload is a no-op
+    object_name = content_key(hash_file(file.stream), file.filename)
+    if upload_exists(object_name):
+        return jsonify({"message": f"File already uploaded to {AWS_BUCKET_NAME}/{object_name}", "key": object_name}), 200
+
+    # Upload the file to S3 (this also registers it in the uploads table)
+    upload_message = upload_to_s3(file, AWS_BUCKET_NAME, object_name=object_name, user_id=user_id)
 
     if "File uploaded" in upload_message:
-        return jsonify({"message": upload_message}), 200
+        return jsonify({"message": upload_message, "key": object_name}), 200
     else:
         return jsonify({"error": upload_message}), 500
 
-# backend/server.py (add this endpoint to your server.py)
-@app.route('/file-count', methods=['GET'])
+@api.route('/upload/presign', methods=['POST'])
+@jwt_required()
+def presign_file_upload():
+    """Return a presigned POST or multipart upload so the client can write straight to S3."""
+    try:
+        data = request.get_json() or {}
+        filename = data.get('filename')
+        content_type = data.get('content_type') or 'application/octet-stream'
+        size = int(data.get('size') or 0)
+
+        if not filename:
+            return jsonify({"error": "filename is required"}), 400
+
+        upload = presign_upload(AWS_BUCKET_NAME, filename, content_type, size, get_jwt_identity(),
+                                sha256=data.get('sha256'))
+        return jsonify(upload), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error presigning upload: {e}")
+        return jsonify({"error": "Failed to prepare upload"}), 500
+
+@api.route('/upload/complete', methods=['POST'])
+@jwt_required()
+def complete_file_upload():
+    """Callback after a direct upload: finish the multipart upload, verify and register the object."""
+    try:
+        data = request.get_json() or {}
+        if not data.get('upload_token'):
+            return jsonify({"error": "upload_token is required"}), 400
+
+        head = complete_upload(AWS_BUCKET_NAME, data['upload_token'], get_jwt_identity(), data.get('parts') or [])
+        return jsonify({
+            "message": f"File uploaded successfully to {AWS_BUCKET_NAME}/{head['Key']}",
+            "key": head["Key"],
+            "size": head["ContentLength"]
+        }), 200
+
+    except UploadRejected as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error completing upload: {e}")
+        return jsonify({"error": "Failed to complete upload"}), 500
+
+@api.route('/upload/abort', methods=['POST'])
+@jwt_required()
+def abort_file_upload():
+    """Abort an unfinished multipart upload."""
+    try:
+        data = request.get_json() or {}
+        if not data.get('upload_token'):
+            return jsonify({"error": "upload_token is required"}), 400
+
+        abort_upload(AWS_BUCKET_NAME, data['upload_token'], get_jwt_identity())
+        return jsonify({"message": "Upload aborted"}), 200
+
+    except UploadRejected as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error aborting upload: {e}")
+        return jsonify({"error": "Failed to abort upload"}), 500
+
+@api.route('/file-count', methods=['GET'])
+@cached_response(ttl=60, tags=('files',))
 def get_file_count():
-    """Fetch the count of files in the S3 bucket."""
+    """Return the number of PDF files uploaded, from the uploads registry."""
     try:
-        response = s3_client.list_objects_v2(Bucket=AWS_BUCKET_NAME)
-        contents = response.get('Contents', [])
-        
-        # Filter only PDF files
-        pdf_files = [obj for obj in contents if obj['Key'].lower().endswith('.pdf')]
-        file_count = len(pdf_files)
+        file_count = count_uploads(extension='pdf')
         return jsonify({"file_count": file_count}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Retrieve the OpenAI API key from the environment variable
-openai_api_key = os.getenv('OPENAI_API_KEY')
-
-client = OpenAI(api_key=openai_api_key)
-
-def retry_with_backoff(max_retries=3, initial_delay=1):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            delay = initial_delay
-            last_exception = None
-            
-            for retry in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
-                    if retry < max_retries - 1:
-                        logger.warning(f"Attempt {retry + 1} failed: {str(e)}. Retrying in {delay} seconds...")
-                        time.sleep(delay)
-                        delay *= 2  # Exponential backoff
-                    else:
-                        logger.error(f"All {max_retries} attempts failed. Last error: {str(e)}")
-                        raise last_exception
-            
-            raise last_exception
-        return wrapper
-    return decorator
-
-@retry_with_backoff()
-def download_from_s3(bucket, key, local_path):
-    logger.info(f"Downloading file from S3: {bucket}/{key} to {local_path}")
-    s3_client.download_file(bucket, key, local_path)
-    logger.info("S3 download successful")
-
-@retry_with_backoff()
-def transcribe_audio(audio_file):
-    logger.info("Starting audio transcription")
-    with open(audio_file, 'rb') as f:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=f,
-            response_format="text"
+@api.route('/api/uploads', methods=['GET'])
+@cached_response(ttl=60, tags=('files',))
+def get_uploads():
+    """List registered uploads, newest first, keyed on (created_at, id)."""
+    try:
+        cursor_arg = request.args.get('cursor')
+        after = decode_cursor(cursor_arg) if cursor_arg else None
+        limit = page_size()
+        rows = list_uploads(
+            extension=request.args.get('extension'),
+            user_id=request.args.get('user_id'),
+            after=after,
+            limit=limit + 1
         )
-    logger.info("Audio transcription successful")
-    return transcript
-
-@retry_with_backoff()
-def generate_ai_response(transcript):
-    logger.info("Generating AI response")
-    chat_response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful customer service AI assistant. Analyze the customer's complaint and provide a professional, empathetic response."},
-            {"role": "user", "content": transcript}
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+        uploads = [
+            {
+                "key": row['s3_key'],
+                "size": row['size'],
+                "content_type": row['content_type'],
+                "user_id": row['user_id'],
+                "created_at": row['created_at'].isoformat()
+            }
+            for row in rows
         ]
-    )
-    logger.info("AI response generated successfully")
-    return chat_response.choices[0].message.content
+        return paginated_response(uploads, next_cursor)
+
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error listing uploads: {e}")
+        return jsonify({"error": "Failed to list uploads"}), 500
 
-@app.route('/api/process-voice-complaint', methods=['POST', 'OPTIONS'])
+@api.route('/api/process-voice-complaint', methods=['POST', 'OPTIONS'])
+@cost_class('ai')
+@jwt_required()
 def process_voice_complaint():
+    """Queue a voice complaint for processing and return its job id."""
     if request.method == 'OPTIONS':
         return handle_preflight()
         
@@ -485,115 +599,189 @@ def process_voice_complaint():
             logger.error("No file path provided in request")
             return jsonify({'error': 'No file path provided'}), 400
 
-        temp_file_path = None
-        try:
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_file_path = temp_file.name
-                logger.info(f"Created temporary file: {temp_file_path}")
-                
-            # Download file from S3
-            try:
-                download_from_s3(AWS_BUCKET_NAME, s3_file_path, temp_file_path)
-            except Exception as s3_error:
-                logger.error(f"S3 download error: {str(s3_error)}")
-                return jsonify({'error': f'Failed to download file from S3: {str(s3_error)}'}), 500
-
-            # Transcribe audio
-            try:
-                transcript = transcribe_audio(temp_file_path)
-                logger.info(f"Transcript generated: {transcript[:100]}...")
-            except Exception as whisper_error:
-                logger.error(f"Transcription error: {str(whisper_error)}")
-                return jsonify({'error': f'Failed to transcribe audio: {str(whisper_error)}'}), 500
-
-            # Generate AI response
-            try:
-                ai_response = generate_ai_response(transcript)
-                logger.info("AI response generated successfully")
-            except Exception as gpt_error:
-                logger.error(f"AI response generation error: {str(gpt_error)}")
-                return jsonify({'error': f'Failed to generate AI response: {str(gpt_error)}'}), 500
-
-            # Store the complaint in the database
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                
-                insert_query = """
-                    INSERT INTO voice_complaints (
-                        user_id,
-                        s3_file_path,
-                        transcript,
-                        ai_response,
-                        status,
-                        created_at
-                    ) VALUES (%s, %s, %s, %s, %s, NOW())
-                """
-                
-                user_id = get_jwt_identity()
-                cursor.execute(insert_query, (
-                    user_id,
-                    s3_file_path,
-                    transcript,
-                    ai_response,
-                    'completed'
-                ))
-                conn.commit()
-                logger.info("Complaint stored in database successfully")
-                
-            except Exception as db_error:
-                logger.error(f"Database error: {str(db_error)}")
-                # Don't return error to client, just log it
-                # The complaint processing was successful even if DB storage failed
-            
-            finally:
-                if cursor:
-                    cursor.close()
-                if conn:
-                    conn.close()
+        user_id = get_jwt_identity()
 
+        # Duplicate submissions of an already processed recording are answered from cache
+        cached = cached_result(s3_file_path)
+        if cached:
+            transcript, ai_response = cached
+            complaint_id = record_completed_complaint(user_id, s3_file_path, transcript, ai_response)
+            logger.info(f"Voice complaint {complaint_id} served from cache")
             return jsonify({
                 'success': True,
+                'job_id': complaint_id,
+                'status': 'completed',
                 'transcript': transcript,
                 'response': ai_response
-            })
-
-        finally:
-            # Clean up temporary file
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.unlink(temp_file_path)
-                    logger.info("Temporary file cleaned up successfully")
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to clean up temporary file: {str(cleanup_error)}")
-
+            }), 200
+
+        complaint_id = create_complaint_job(user_id, s3_file_path)
+        submit_complaint(complaint_id, s3_file_path)
+        logger.info(f"Queued voice complaint {complaint_id} for {s3_file_path}")
+
+        response = jsonify({
+            'success': True,
+            'job_id': complaint_id,
+            'status': 'pending',
+            'status_url': url_for('.get_voice_complaint', complaint_id=complaint_id),
+            'stream_url': url_for('.stream_voice_complaint', complaint_id=complaint_id)
+        })
+        response.headers['Location'] = url_for('.get_voice_complaint', complaint_id=complaint_id)
+        return response, 202
+
+    except ObjectNotFound:
+        return jsonify({'error': 'Recording not found', 'file_path': s3_file_path}), 400
     except Exception as e:
         logger.error(f"Unexpected error in process_voice_complaint: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/complaint-summary', methods=['GET', 'OPTIONS'])
-def get_complaint_summary():
-    """Return percentage breakdown of AI-resolved vs human-escalated inquiries."""
-    if request.method == 'OPTIONS':
-        return handle_preflight()
+@api.route('/api/voice-complaints/batch', methods=['POST'])
+@cost_class('bulk')
+@jwt_required()
+def process_voice_complaint_batch():
+    """Queue a list of S3 keys (or every recording under a prefix) as voice complaint jobs.
+
+    Each item goes through the same worker pool as single submissions;
+    the 202 response lists a job id and status URL per key. Requests are
+    capped at BATCH_MAX_ITEMS; larger backlogs go through
+    ``python batch_processing.py``.
+    """
+    try:
+        data = request.get_json() or {}
+        keys = data.get('keys')
+        prefix = data.get('prefix')
+        user_id = get_jwt_identity()
+
+        if not keys and prefix is None:
+            return jsonify({'error': 'Provide either keys or prefix'}), 400
+        if keys and (not isinstance(keys, list) or not all(isinstance(k, str) and k for k in keys)):
+            return jsonify({'error': 'keys must be a list of S3 keys'}), 400
+        # An empty prefix would list the whole bucket
+        if not keys and (not isinstance(prefix, str) or not prefix.strip()):
+            return jsonify({'error': 'prefix must be a non-empty string'}), 400
+
+        max_items = get_config().BATCH_MAX_ITEMS
+        if not keys:
+            # One key past the cap is enough to know the batch is too large
+            keys = keys_under_prefix(prefix, limit=max_items + 1)
+            if len(keys) > max_items:
+                return jsonify({'error': f'More than {max_items} recordings under this prefix; '
+                                         f'use batch_processing.py for larger batches'}), 413
+        if len(keys) > max_items:
+            return jsonify({'error': f'Batch has {len(keys)} items; the limit is {max_items}'}), 413
+
+        complaint_ids = create_complaint_jobs(user_id, keys)
+        jobs = []
+        for key, complaint_id in zip(keys, complaint_ids):
+            submit_complaint(complaint_id, key)
+            jobs.append({
+                'key': key,
+                'job_id': complaint_id,
+                'status': 'pending',
+                'status_url': url_for('.get_voice_complaint', complaint_id=complaint_id)
+            })
+        logger.info(f"Queued {len(jobs)} voice complaints from a batch request")
+        return jsonify({'total': len(jobs), 'jobs': jobs}), 202
 
+    except Exception as e:
+        logger.error(f"Error queueing batch: {str(e)}")
+        return jsonify({'error': 'Failed to queue batch'}), 500
+
+@api.route('/api/voice-complaints/<int:complaint_id>', methods=['GET'])
+@cost_class('status')
+@jwt_required()
+def get_voice_complaint(complaint_id):
+    """Return the processing status of one of the caller's voice complaints."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        complaint = get_complaint(complaint_id)
+        # Other users' complaints look the same as missing ones, so ids can't be probed
+        if not complaint or str(complaint['user_id']) != get_jwt_identity():
+            return jsonify({'error': 'Complaint not found'}), 404
 
-        cursor.execute("SELECT COUNT(*) AS total_inquiries FROM inquiries")
-        total_inquiries = cursor.fetchone()['total_inquiries']
+        return jsonify(_complaint_status(complaint)), 200
 
-        cursor.execute("SELECT COUNT(*) AS escalations FROM human_escalation")
-        escalations = cursor.fetchone()['escalations']
+    except Exception as e:
+        logger.error(f"Error fetching voice complaint {complaint_id}: {str(e)}")
+        return jsonify({'error': 'Failed to fetch complaint status'}), 500
+
+def _complaint_status(complaint):
+    return {
+        'job_id': complaint['id'],
+        'status': complaint['status'],
+        'file_path': complaint['s3_file_path'],
+        'transcript': complaint['transcript'],
+        'response': complaint['ai_response'],
+        'error': complaint['error_message'],
+        'created_at': complaint['created_at'].isoformat() if complaint['created_at'] else None,
+        'updated_at': complaint['updated_at'].isoformat() if complaint['updated_at'] else None
+    }
+
+# A complaint stream sends a comment this often while the worker is quiet,
+# and hands over to polling after COMPLAINT_STREAM_MAX_SECONDS
+COMPLAINT_STREAM_KEEPALIVE_SECONDS = 15
+COMPLAINT_STREAM_MAX_SECONDS = 5 * 60
+
+@api.route('/api/voice-complaints/<int:complaint_id>/stream', methods=['GET'])
+@cost_class('status')
+@jwt_required()
+def stream_voice_complaint(complaint_id):
+    """Relay a queued complaint's progress as Server-Sent Events.
+
+    While the job is queued or running in this process, emits "transcript",
+    a "delta" per reply token chunk and finally "done" or "error" once the
+    result is stored. Otherwise (finished already, or queued in another
+    worker process) emits "done", "error" or a single "status" from the row,
+    and the client polls the status route. Disconnecting stops the relay,
+    never the job.
+    """
+    try:
+        complaint = get_complaint(complaint_id)
+    except Exception as e:
+        logger.error(f"Error fetching voice complaint {complaint_id}: {str(e)}")
+        return jsonify({'error': 'Failed to fetch complaint status'}), 500
+    if not complaint or str(complaint['user_id']) != get_jwt_identity():
+        return jsonify({'error': 'Complaint not found'}), 404
+
+    progress = complaint_progress(complaint_id)
+
+    def events():
+        if progress is not None:
+            deadline = time.monotonic() + COMPLAINT_STREAM_MAX_SECONDS
+            for item in progress.follow(COMPLAINT_STREAM_KEEPALIVE_SECONDS):
+                if item is None:
+                    if time.monotonic() > deadline:
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                event, payload = item
+                yield sse_event(payload, event=event)
+                if event in ('done', 'error'):
+                    return
 
-        if total_inquiries == 0:
-            ai_resolved_pct = 0
-            human_escalated_pct = 0
+        try:
+            latest = get_complaint(complaint_id) or complaint
+        except Exception as e:
+            logger.error(f"Error fetching voice complaint {complaint_id}: {str(e)}")
+            latest = complaint
+        if latest['status'] == 'completed':
+            yield sse_event({'transcript': latest['transcript'], 'response': latest['ai_response']}, event='done')
+        elif latest['status'] == 'failed':
+            yield sse_event({'error': latest['error_message']}, event='error')
         else:
-            ai_resolved_pct = round(((total_inquiries - escalations) / total_inquiries) * 100, 2)
-            human_escalated_pct = round((escalations / total_inquiries) * 100, 2)
+            yield sse_event(_complaint_status(latest), event='status')
+
+    return _sse_response(events())
+
+@api.route('/api/complaint-summary', methods=['GET', 'OPTIONS'])
+@cached_response(ttl=30)
+def get_complaint_summary():
+    """Return percentage breakdown of AI-resolved vs human-escalated inquiries."""
+    if request.method == 'OPTIONS':
+        return handle_preflight()
+
+    try:
+        ai_resolved_pct, human_escalated_pct = resolution_percentages()
 
         return jsonify({
             "ai_resolved": ai_resolved_pct,
@@ -604,35 +792,13 @@ def get_complaint_summary():
         logger.error(f"Error fetching complaint summary: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
 # Route to get the resolution rate
-@app.route('/api/resolution-rate', methods=['GET'])
+@api.route('/api/resolution-rate', methods=['GET'])
+@cached_response(ttl=30)
 def get_resolution_rate():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Get total inquiries
-        cursor.execute("SELECT COUNT(*) AS total FROM inquiries")
-        total_inquiries = cursor.fetchone()["total"] or 0
-
-        # Get total escalations
-        cursor.execute("SELECT COUNT(*) AS escalated FROM human_escalation")
-        total_escalated = cursor.fetchone()["escalated"] or 0
-
-        # Calculate AI-resolved
-        ai_resolved = max(total_inquiries - total_escalated, 0)
-
-        # Calculate resolution rate
-        if total_inquiries == 0:
-            resolution_rate = 0
-        else:
-            resolution_rate = round((ai_resolved / total_inquiries) * 100, 2)
+        # Same figures as the complaint summary, read from the monthly rollups
+        resolution_rate, _ = resolution_percentages()
 
         return jsonify({"resolution_rate": resolution_rate}), 200
 
@@ -640,35 +806,120 @@ def get_resolution_rate():
         logger.error(f"Resolution rate calculation failed: {str(e)}")
         return jsonify({"error": "Failed to calculate resolution rate."}), 500
 
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
-@app.route('/api/human-escalations', methods=['GET'])
-def get_human_escalations():
-    try:    
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT caller_number, initiated_at, reason 
+# Rows fetched per query when streaming an escalations export
+ESCALATION_EXPORT_BATCH = 1000
+
+def _escalation_filters():
+    """Build the WHERE clause for the human-escalation filters in the query string."""
+    clauses = ["1 = 1"]
+    params = []
+
+    start = parse_datetime_arg('start')
+    if start:
+        clauses.append("initiated_at >= %s")
+        params.append(start)
+    end = parse_datetime_arg('end')
+    if end:
+        clauses.append("initiated_at < %s")
+        params.append(end)
+    reason = request.args.get('reason')
+    if reason:
+        clauses.append("reason = %s")
+        params.append(reason)
+
+    return clauses, params
+
+def _escalation_page(clauses, params, after, limit):
+    """Return up to ``limit`` escalations, newest first, after the (initiated_at, id) keyset ``after``."""
+    if after:
+        clauses = clauses + ["(initiated_at < %s OR (initiated_at = %s AND id < %s))"]
+        params = params + [after[0], after[0], after[1]]
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute(f"""
+            SELECT id, caller_number, initiated_at, reason
             FROM human_escalation
-            ORDER BY initiated_at DESC
-        """)
-        results = cursor.fetchall()
-        return jsonify(results), 200
+            WHERE {' AND '.join(clauses)}
+            ORDER BY initiated_at DESC, id DESC
+            LIMIT %s
+        """, (*params, limit))
+        return cursor.fetchall()
+
+@api.route('/api/human-escalations', methods=['GET'])
+@cached_response(ttl=30)
+def get_human_escalations():
+    """Return one page of escalations, newest first, or counts per reason with ``aggregate=reason``.
+
+    Supports ``start``/``end`` (initiated_at window), ``reason``, ``limit``
+    and ``cursor``, like /api/completed-calls.
+    """
+    try:
+        clauses, params = _escalation_filters()
+
+        if request.args.get('aggregate') == 'reason':
+            with db_cursor(dictionary=True) as cursor:
+                cursor.execute(f"""
+                    SELECT reason, COUNT(*) AS count
+                    FROM human_escalation
+                    WHERE {' AND '.join(clauses)}
+                    GROUP BY reason
+                    ORDER BY count DESC
+                """, params)
+                return jsonify(cursor.fetchall()), 200
+
+        cursor_arg = request.args.get('cursor')
+        after = decode_cursor(cursor_arg) if cursor_arg else None
+        limit = page_size()
+        rows = _escalation_page(clauses, params, after, limit + 1)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['initiated_at'], rows[-1]['id'])
+        for row in rows:
+            del row['id']
+        return paginated_response(rows, next_cursor)
+
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching human escalations: {e}")
         return jsonify({"error": "Failed to fetch human escalations"}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
+@api.route('/api/human-escalations/export', methods=['GET'])
+@cost_class('bulk')
+def export_human_escalations():
+    """Stream every escalation matching the filters as one JSON array.
+
+    Rows are read in keyset batches and encoded as they go, so memory stays
+    flat and no database connection is held while the client reads.
+    """
+    try:
+        clauses, params = _escalation_filters()
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        yield '['
+        first = True
+        after = None
+        while True:
+            rows = _escalation_page(clauses, params, after, ESCALATION_EXPORT_BATCH)
+            for row in rows:
+                row_id = row.pop('id')
+                yield ('' if first else ',') + current_app.json.dumps(row)
+                first = False
+            if len(rows) < ESCALATION_EXPORT_BATCH:
+                break
+            after = (rows[-1]['initiated_at'], row_id)
+        yield ']'
+
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    response.headers['Content-Disposition'] = 'attachment; filename="human-escalations.json"'
+    return response
 
-@app.route('/api/claude', methods=['POST', 'OPTIONS'])
+
+@api.route('/api/claude', methods=['POST', 'OPTIONS'])
+@cost_class('ai')
 def claude_chat():
     """Handle chat messages with AI."""
     if request.method == 'OPTIONS':
@@ -681,22 +932,53 @@ def claude_chat():
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
 
-        # Generate AI response using the OpenAI client
-        chat_response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You represent ClearCall company. You are a helpful and knowledgeable AI assistant talking on behalf of ClearCall company staff. Keep responses concise and clear."},
-                {"role": "user", "content": user_message}
-            ]
-        )
-
-        ai_reply = chat_response.choices[0].message.content
+        # Identical concurrent messages share one upstream call (see ai_client)
+        ai_reply = chat_service.complete(user_message)
         return jsonify({"reply": ai_reply}), 200
 
+    except CircuitOpenError as e:
+        logger.warning(f"claude_chat rejected: {str(e)}")
+        response = jsonify({"error": "The assistant is temporarily unavailable, please try again shortly"})
+        response.headers['Retry-After'] = str(max(1, round(e.retry_after)))
+        return response, 503
     except Exception as e:
         logger.error(f"Error in claude_chat: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@api.route('/api/claude/stream', methods=['POST', 'OPTIONS'])
+@cost_class('ai')
+def claude_chat_stream():
+    """Stream a chat reply as Server-Sent Events: a "delta" per token chunk, then "done" with the full reply."""
+    if request.method == 'OPTIONS':
+        return handle_preflight()
+
+    data = request.get_json() or {}
+    user_message = data.get('message')
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    def events():
+        parts = []
+        try:
+            # Closing this generator on client disconnect cancels the upstream stream
+            for delta in chat_service.stream(user_message):
+                parts.append(delta)
+                yield sse_event({"text": delta}, event="delta")
+        except Exception as e:
+            logger.error(f"Error in claude_chat_stream: {str(e)}")
+            yield sse_event({"error": "Failed to generate a reply"}, event="error")
+            return
+        yield sse_event({"reply": "".join(parts)}, event="done")
+
+    return _sse_response(events())
+
+def _sse_response(events):
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 def handle_preflight():
     response = jsonify({'message': 'OK'})
     response.headers.add('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
@@ -705,40 +987,35 @@ def handle_preflight():
     response.headers.add('Access-Control-Allow-Origin', request.headers.get('Origin', '*'))
     return response
 
-@app.route('/health')
+@api.route('/health/live')
+@limiter.exempt
+def health_live():
+    """Liveness probe: the process is up and serving requests; touches no dependency."""
+    return jsonify({"status": "alive"}), 200
+
+@api.route('/health/ready')
+@limiter.exempt
+def health_ready():
+    """Readiness probe, answered from the background health checker's cached results."""
+    ready, report = health_checker.report(wait_for_first=2)
+    report["timestamp"] = datetime.now().isoformat()
+    return jsonify(report), 200 if ready else 503
+
+@api.route('/health')
+@limiter.exempt
 def health_check():
-    """Health check endpoint for monitoring."""
-    try:
-        # Test database connection
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1')
-        cursor.close()
-        conn.close()
-
-        # Test S3 connection
-        s3_client.list_buckets()
-
-        return jsonify({
-            "status": "healthy",
-            "checks": {
-                "database": "connected",
-                "s3": "connected"
-            },
-            "timestamp": datetime.now().isoformat()
-        }), 200
-    except mysql.connector.Error as db_err:
-        return jsonify({
-            "status": "unhealthy",
-            "error": f"Database error: {str(db_err)}",
-            "timestamp": datetime.now().isoformat()
-        }), 500
-    except Exception as e:
-        return jsonify({
-            "status": "unhealthy",
-            "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }), 500
+    """Readiness report plus pool, cache and dependency statistics for monitoring."""
+    ready, report = health_checker.report(wait_for_first=2)
+    report.update({
+        "database_pool": get_pool().stats(),
+        "ai_cache": cache_stats(),
+        "ai_calls": chat_service.stats(),
+        "dependencies": dependency_stats(),
+        "response_cache": response_cache_stats(),
+        "password_hashing": password_hasher.stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+    return jsonify(report), 200 if ready else 503
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5000)
\ No newline at end of file
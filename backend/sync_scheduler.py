@@ -0,0 +1,211 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import get_config
+from db_pool import advisory_lock, db_cursor
+from metrics import SYNC_RUNS
+from rollups import refresh_recent_rollups
+from twilio_sync import SYNC_NAME, sync_twilio_calls
+from upload_registry import reconcile_default_bucket
+from voice_pipeline import requeue_complaints
+
+logger = logging.getLogger(__name__)
+
+
+class SyncScheduler:
+    """Runs a sync job on an interval with single-flight semantics.
+
+    Concurrent ``trigger`` calls in one process share a single run, and a
+    MySQL named lock keeps runs in different worker processes from
+    overlapping. Failed runs back off with full jitter.
+    """
+
+    def __init__(self, name, job, interval, backoff_base=5, backoff_max=600):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._running = False
+        self._generation = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self.runs = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.last_skipped = False
+        self.last_skipped_at = None
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_started_at = None
+        self.last_finished_at = None
+        self.last_success_at = None
+        self.last_duration = None
+        self.last_rows = None
+        self.last_error = None
+
+    def trigger(self):
+        """Run the job now, or wait for the run already in progress and share its outcome."""
+        with self._lock:
+            if self._running:
+                self.coalesced += 1
+                generation = self._generation
+                while self._generation == generation:
+                    self._finished.wait()
+                return self._result()
+            self._running = True
+
+        try:
+            self._run()
+        finally:
+            with self._lock:
+                self._running = False
+                self._generation += 1
+                self._finished.notify_all()
+        return self._result()
+
+    def _result(self):
+        return {"rows": self.last_rows, "error": self.last_error, "skipped": self.last_skipped}
+
+    def _run(self):
+        """Run the job once.
+
+        A run skipped because another process holds the lock is counted
+        under ``skipped`` and leaves the last run's results untouched.
+        """
+        started = time.monotonic()
+        started_at = datetime.now(timezone.utc)
+        outcome = 'failed'
+        try:
+            with advisory_lock(f"sync:{self.name}") as acquired:
+                if not acquired:
+                    logger.info(f"Sync '{self.name}' already running elsewhere, skipping")
+                    outcome = 'skipped'
+                    return
+                self.last_started_at = started_at
+                self.last_rows = self.job()
+            outcome = 'ok'
+            self.last_error = None
+            self.consecutive_failures = 0
+            self.last_success_at = datetime.now(timezone.utc)
+        except Exception as e:
+            self.last_started_at = started_at
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(e)
+            logger.error(f"Sync '{self.name}' failed: {e}")
+        finally:
+            SYNC_RUNS.labels(self.name, outcome).inc()
+            self.last_skipped = outcome == 'skipped'
+            if self.last_skipped:
+                self.skipped += 1
+                self.last_skipped_at = started_at
+            else:
+                self.runs += 1
+                self.last_duration = round(time.monotonic() - started, 3)
+                self.last_finished_at = datetime.now(timezone.utc)
+
+    def next_delay(self):
+        """Seconds until the next scheduled run; jittered exponential backoff after failures."""
+        if not self.consecutive_failures:
+            return self.interval
+        cap = min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_failures - 1))
+        return random.uniform(self.backoff_base, max(cap, self.backoff_base))
+
+    def start(self):
+        """Start the background loop in a daemon thread (idempotent)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run_forever, name=f"sync-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"Sync scheduler '{self.name}' started (interval {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run_forever(self):
+        # Stagger the first run so workers booting together do not all hit Twilio at once
+        self._stop.wait(random.uniform(0, min(self.interval, 30)))
+        while not self._stop.is_set():
+            self.trigger()
+            self._wake.wait(self.next_delay())
+            self._wake.clear()
+
+    def status(self):
+        def iso(value):
+            return value.isoformat() if value else None
+
+        return {
+            "name": self.name,
+            "running": self._running,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped,
+            "last_skipped_at": iso(self.last_skipped_at),
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_started_at": iso(self.last_started_at),
+            "last_finished_at": iso(self.last_finished_at),
+            "last_success_at": iso(self.last_success_at),
+            "last_duration_seconds": self.last_duration,
+            "last_rows_ingested": self.last_rows,
+            "last_error": self.last_error,
+        }
+
+
+def twilio_sync_lag():
+    """Seconds between now and the start_time of the newest ingested call, or None."""
+    with db_cursor() as cursor:
+        cursor.execute("SELECT last_start_time FROM sync_state WHERE name = %s", (SYNC_NAME,))
+        row = cursor.fetchone()
+    if not row or not row[0]:
+        return None
+    return round((datetime.now(timezone.utc).replace(tzinfo=None) - row[0]).total_seconds(), 1)
+
+
+twilio_scheduler = SyncScheduler(
+    'twilio',
+    sync_twilio_calls,
+    interval=get_config().TWILIO_SYNC_INTERVAL,
+    backoff_base=get_config().TWILIO_SYNC_BACKOFF_BASE,
+    backoff_max=get_config().TWILIO_SYNC_BACKOFF_MAX,
+)
+
+# Picks up rows written outside this app (e.g. human_escalation) into the rollups
+rollup_scheduler = SyncScheduler(
+    'rollups',
+    refresh_recent_rollups,
+    interval=get_config().ROLLUP_REFRESH_INTERVAL,
+)
+
+# Backfills the uploads registry from the bucket and detects drift
+upload_reconcile_scheduler = SyncScheduler(
+    'uploads',
+    reconcile_default_bucket,
+    interval=get_config().UPLOAD_RECONCILE_INTERVAL,
+)
+
+# Requeues complaints left pending or with expired leases; must run in the web process that owns the pool
+complaint_requeue_scheduler = SyncScheduler(
+    'complaints',
+    requeue_complaints,
+    interval=get_config().VOICE_JOB_REQUEUE_INTERVAL,
+)
+
+
+if __name__ == "__main__":
+    # Sidecar mode: run the scheduler loops in the foreground
+    logging.basicConfig(level=logging.INFO)
+    rollup_scheduler.start()
+    upload_reconcile_scheduler.start()
+    twilio_scheduler.run_forever()
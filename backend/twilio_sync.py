@@ -0,0 +1,146 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from clients import get_twilio_client
+from config import get_config
+from db_pool import db_connection
+from response_cache import invalidate
+from rollups import adjust_rollup
+
+logger = logging.getLogger(__name__)
+
+SYNC_NAME = 'twilio_calls'
+
+UPSERT_QUERY = """
+    INSERT INTO inquiries (
+        call_sid, caller_number, recipient_number, duration, start_time, status
+    ) VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE duration=VALUES(duration), status=VALUES(status)
+"""
+
+def get_high_water_mark(cursor):
+    """Return (last_start_time, last_call_sid) of the newest call already synced."""
+    cursor.execute(
+        "SELECT last_start_time, last_call_sid FROM sync_state WHERE name = %s",
+        (SYNC_NAME,)
+    )
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _save_high_water_mark(cursor, start_time, call_sid):
+    cursor.execute("""
+        INSERT INTO sync_state (name, last_start_time, last_call_sid)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_start_time=VALUES(last_start_time), last_call_sid=VALUES(last_call_sid)
+    """, (SYNC_NAME, start_time, call_sid))
+
+
+def iter_completed_calls(client, phone_number, since, page_size):
+    """Lazily page through completed calls to ``phone_number`` that started after ``since``."""
+    for call in client.calls.stream(
+        to=phone_number,
+        status='completed',
+        start_time_after=since,
+        page_size=page_size
+    ):
+        if call.start_time and call.start_time.replace(tzinfo=None) > since:
+            yield call
+
+
+def _upsert_batch(cursor, batch):
+    """Upsert a batch of call rows and move the inquiries rollup by exactly what changed.
+
+    New calls add one to their day's status bucket; a re-synced call whose
+    status changed moves between buckets. Runs in the caller's transaction,
+    so the rollup commits with the rows.
+    """
+    placeholders = ", ".join(["%s"] * len(batch))
+    cursor.execute(
+        f"SELECT call_sid, DATE(start_time), COALESCE(status, '') FROM inquiries WHERE call_sid IN ({placeholders})",
+        [row[0] for row in batch]
+    )
+    existing = {sid: (day, status) for sid, day, status in cursor.fetchall()}
+
+    cursor.executemany(UPSERT_QUERY, batch)
+
+    changes = {}
+    for sid, _, _, _, start_time, status in batch:
+        status = status or ''
+        if sid in existing:
+            day, old_status = existing[sid]
+            if old_status == status:
+                continue
+            changes.setdefault(day, {}).setdefault(old_status, 0)
+            changes[day][old_status] -= 1
+        else:
+            day = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S').date()
+        changes.setdefault(day, {}).setdefault(status, 0)
+        changes[day][status] += 1
+    for day in sorted(changes):
+        adjust_rollup(cursor, 'inquiries', changes[day], bucket_date=day)
+
+
+def _row(call):
+    return (
+        call.sid,
+        call._from,  # caller
+        call.to,     # recipient
+        int(call.duration) if call.duration else 0,
+        call.start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        call.status
+    )
+
+
+def sync_twilio_calls():
+    """Upsert calls newer than the stored high-water mark into inquiries.
+
+    The window is widened by TWILIO_SYNC_OVERLAP_SECONDS so calls that were
+    still in progress at the previous sync are picked up once they complete;
+    the unique index on call_sid makes the overlap idempotent. Returns the
+    number of rows written.
+    """
+    conf = get_config()
+    client = get_twilio_client()
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            last_start_time, last_call_sid = get_high_water_mark(cursor)
+            if last_start_time is None:
+                # First run: start from the beginning of the current month (UTC, like Twilio's start_time)
+                since = datetime.now(timezone.utc).replace(tzinfo=None, day=1, hour=0, minute=0, second=0, microsecond=0)
+            else:
+                since = last_start_time - timedelta(seconds=conf.TWILIO_SYNC_OVERLAP_SECONDS)
+
+            synced = 0
+            batch = []
+            newest = (last_start_time, last_call_sid)
+            for call in iter_completed_calls(client, conf.TWILIO_PHONE_NUMBER, since, conf.TWILIO_SYNC_PAGE_SIZE):
+                row = _row(call)
+                batch.append(row)
+                start_time = call.start_time.replace(tzinfo=None)
+                if newest[0] is None or start_time > newest[0]:
+                    newest = (start_time, call.sid)
+                if len(batch) >= conf.TWILIO_SYNC_BATCH_SIZE:
+                    _upsert_batch(cursor, batch)
+                    conn.commit()
+                    synced += len(batch)
+                    batch = []
+
+            if batch:
+                _upsert_batch(cursor, batch)
+                synced += len(batch)
+
+            if newest[0] is not None and newest != (last_start_time, last_call_sid):
+                _save_high_water_mark(cursor, newest[0], newest[1])
+            conn.commit()
+
+        finally:
+            cursor.close()
+
+    logger.info(f"Synced {synced} Twilio calls to 'inquiries' table since {since}")
+    if synced:
+        invalidate('calls')
+        invalidate('analytics')
+    return synced
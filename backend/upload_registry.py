@@ -0,0 +1,153 @@
+import logging
+import mimetypes
+import os
+import sys
+
+from db_pool import db_connection, db_cursor
+from response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+UPSERT_QUERY = """
+    INSERT INTO uploads (s3_key, size, content_type, extension, user_id, created_at)
+    VALUES (%s, %s, %s, %s, %s, COALESCE(%s, NOW()))
+    ON DUPLICATE KEY UPDATE size=VALUES(size), content_type=VALUES(content_type)
+"""
+
+RECONCILE_BATCH_SIZE = 500
+
+# Direct multipart uploads land here until their sha256 is verified; never registered
+STAGING_PREFIX = 'uploads/staging/'
+
+
+def _extension(key):
+    return os.path.splitext(key)[1].lstrip('.').lower()[:16]
+
+
+def record_upload(s3_key, size, content_type=None, user_id=None):
+    """Register an object written to S3 so counts and listings never need to list the bucket."""
+    content_type = content_type or mimetypes.guess_type(s3_key)[0]
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(UPSERT_QUERY, (s3_key, size, content_type, _extension(s3_key), user_id, None))
+    invalidate('files')
+
+
+def upload_exists(s3_key):
+    """True if the key is already registered."""
+    with db_cursor() as cursor:
+        cursor.execute("SELECT 1 FROM uploads WHERE s3_key = %s", (s3_key,))
+        return cursor.fetchone() is not None
+
+
+def count_uploads(extension=None):
+    """Count registered uploads, optionally only those with the given file extension."""
+    with db_cursor() as cursor:
+        if extension:
+            cursor.execute("SELECT COUNT(*) FROM uploads WHERE extension = %s", (extension.lower(),))
+        else:
+            cursor.execute("SELECT COUNT(*) FROM uploads")
+        return cursor.fetchone()[0]
+
+
+def list_uploads(extension=None, user_id=None, after=None, limit=100):
+    """Return up to ``limit`` uploads, newest first, after the (created_at, id) keyset ``after``."""
+    clauses = ["1 = 1"]
+    params = []
+    if extension:
+        clauses.append("extension = %s")
+        params.append(extension.lower())
+    if user_id:
+        clauses.append("user_id = %s")
+        params.append(user_id)
+    if after:
+        clauses.append("(created_at < %s OR (created_at = %s AND id < %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute(f"""
+            SELECT id, s3_key, size, content_type, user_id, created_at
+            FROM uploads
+            WHERE {' AND '.join(clauses)}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        """, (*params, limit))
+        return cursor.fetchall()
+
+
+def reconcile(bucket, prune=False):
+    """Page through the bucket, backfill objects missing from the registry and report drift.
+
+    Objects are upserted in batches, so sizes that changed in S3 are
+    corrected as well. Registry rows whose object no longer exists are
+    reported and, with ``prune``, deleted.
+    """
+    from clients import get_s3_client
+
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    seen = set()
+    scanned = 0
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT s3_key FROM uploads")
+            registered = {row[0] for row in cursor.fetchall()}
+
+            batch = []
+            for page in paginator.paginate(Bucket=bucket, PaginationConfig={'PageSize': 1000}):
+                for obj in page.get('Contents', []):
+                    key = obj['Key']
+                    if key.startswith(STAGING_PREFIX):
+                        continue
+                    seen.add(key)
+                    scanned += 1
+                    batch.append((
+                        key, obj['Size'], mimetypes.guess_type(key)[0], _extension(key), None,
+                        obj['LastModified'].strftime('%Y-%m-%d %H:%M:%S')
+                    ))
+                    if len(batch) >= RECONCILE_BATCH_SIZE:
+                        cursor.executemany(UPSERT_QUERY, batch)
+                        conn.commit()
+                        batch = []
+            if batch:
+                cursor.executemany(UPSERT_QUERY, batch)
+
+            missing_in_bucket = registered - seen
+            if prune and missing_in_bucket:
+                stale = list(missing_in_bucket)
+                for start in range(0, len(stale), RECONCILE_BATCH_SIZE):
+                    chunk = stale[start:start + RECONCILE_BATCH_SIZE]
+                    cursor.execute(
+                        f"DELETE FROM uploads WHERE s3_key IN ({', '.join(['%s'] * len(chunk))})",
+                        chunk
+                    )
+            conn.commit()
+        finally:
+            cursor.close()
+
+    backfilled = len(seen - registered)
+    invalidate('files')
+    logger.info(
+        f"Upload reconciliation: {scanned} objects scanned, {backfilled} backfilled, "
+        f"{len(missing_in_bucket)} registered but missing from the bucket"
+    )
+    return {
+        "scanned": scanned,
+        "backfilled": backfilled,
+        "missing_in_bucket": len(missing_in_bucket),
+        "pruned": len(missing_in_bucket) if prune else 0,
+    }
+
+
+def reconcile_default_bucket():
+    """Scheduler entry point: reconcile AWS_BUCKET_NAME and return the number of backfilled objects."""
+    from awsConfig import AWS_BUCKET_NAME
+
+    return reconcile(AWS_BUCKET_NAME)["backfilled"]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from awsConfig import AWS_BUCKET_NAME
+
+    print(reconcile(AWS_BUCKET_NAME, prune='--prune' in sys.argv[1:]))
@@ -0,0 +1,588 @@
+import os
+import hashlib
+import logging
+import mimetypes
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from botocore.exceptions import ClientError
+
+import audio_preprocessing
+import audio_segmentation
+from ai_client import chat_service
+from awsConfig import AWS_BUCKET_NAME
+from clients import get_openai_client, get_s3_client
+from config import get_config
+from db_pool import db_cursor
+from metrics import AUDIO_BYTES, stage_timer
+from resilience import attempt_timeout, openai_api, s3
+from response_cache import invalidate
+from rollups import adjust_rollup
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Read size used when copying S3 bodies into the spool buffer
+AUDIO_CHUNK_SIZE = 64 * 1024
+
+COMPLAINT_MODEL = "gpt-3.5-turbo"
+COMPLAINT_SYSTEM_PROMPT = "You are a helpful customer service AI assistant. Analyze the customer's complaint and provide a professional, empathetic response."
+
+# Transcripts keyed by S3 ETag, responses keyed by normalized transcript + prompt + model
+transcript_cache = TTLCache(maxsize=get_config().AI_CACHE_MAX_ENTRIES, ttl=get_config().AI_CACHE_TTL)
+response_cache = TTLCache(maxsize=get_config().AI_CACHE_MAX_ENTRIES, ttl=get_config().AI_CACHE_TTL)
+
+class AudioBuffer:
+    """Audio object held in a spooled buffer, with the metadata of its source."""
+
+    def __init__(self, file, filename, content_type, size, etag=None):
+        self.file = file
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.etag = etag
+
+    @property
+    def spilled(self):
+        """True if the buffer exceeded the spool threshold and moved to disk."""
+        return getattr(self.file, '_rolled', False)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@s3.retrying
+def fetch_audio(bucket, key):
+    """Stream an S3 object into a spooled buffer, spilling to disk only above AUDIO_SPOOL_MAX_BYTES."""
+    logger.info(f"Streaming file from S3: {bucket}/{key}")
+    obj = get_s3_client().get_object(Bucket=bucket, Key=key)
+    buffer = tempfile.SpooledTemporaryFile(max_size=get_config().AUDIO_SPOOL_MAX_BYTES)
+    copied = 0
+    try:
+        for chunk in obj['Body'].iter_chunks(chunk_size=AUDIO_CHUNK_SIZE):
+            buffer.write(chunk)
+            copied += len(chunk)
+    except Exception:
+        buffer.close()
+        raise
+    finally:
+        obj['Body'].close()
+    buffer.seek(0)
+
+    filename = os.path.basename(key)
+    content_type = obj.get('ContentType')
+    if not content_type or content_type == 'binary/octet-stream':
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    audio = AudioBuffer(buffer, filename, content_type, copied, etag=obj.get('ETag'))
+    logger.info(f"S3 stream complete: {copied} bytes copied ({'disk' if audio.spilled else 'memory'})")
+    return audio
+
+def preprocess_audio(audio):
+    """Return a compact 16 kHz mono Opus copy of ``audio``, or ``audio`` itself if that isn't smaller.
+
+    Preprocessing is an optimisation: if ffmpeg is missing or fails, the
+    original recording is transcribed instead.
+    """
+    if not audio_preprocessing.available():
+        return audio
+    audio.file.seek(0)
+    try:
+        file, size = audio_preprocessing.preprocess(audio.file, audio.content_type)
+    except Exception as e:
+        logger.warning(f"Audio preprocessing failed for {audio.filename}, sending original: {e}")
+        return audio
+    if size >= audio.size:
+        file.close()
+        return audio
+    filename = os.path.splitext(audio.filename)[0] + audio_preprocessing.OUTPUT_FILENAME_SUFFIX
+    logger.info(f"Preprocessed {audio.filename}: {audio.size} -> {size} bytes")
+    return AudioBuffer(file, filename, audio_preprocessing.OUTPUT_CONTENT_TYPE, size, etag=audio.etag)
+
+@openai_api.retrying(deadline=get_config().TRANSCRIPTION_TIMEOUT, attempt_timeout=get_config().TRANSCRIPTION_TIMEOUT)
+def transcribe_audio(audio):
+    logger.info("Starting audio transcription")
+    audio.file.seek(0)
+    transcript = get_openai_client().audio.transcriptions.create(
+        model="whisper-1",
+        file=(audio.filename, audio.file, audio.content_type),
+        response_format="text",
+        timeout=attempt_timeout()
+    )
+    logger.info("Audio transcription successful")
+    return transcript
+
+def transcribe_segmented(audio, label=None):
+    """Transcribe ``audio``, splitting recordings longer than TRANSCRIPTION_SEGMENT_MAX_SECONDS.
+
+    Long recordings are cut at pauses into overlapping chunks that are
+    transcribed concurrently, so latency tracks the longest chunk rather
+    than the whole call. Each chunk goes through transcribe_audio and is
+    retried on its own; the texts are stitched in order with the repeated
+    overlap removed.
+    """
+    label = label or audio.filename
+    if not audio_segmentation.available():
+        return transcribe_audio(audio)
+
+    conf = get_config()
+    # Most recordings are short: decide from the header before staging and decoding anything
+    duration = audio_segmentation.estimate_duration(audio.file, audio.content_type)
+    if duration is not None and duration <= conf.TRANSCRIPTION_SEGMENT_MAX_SECONDS:
+        return transcribe_audio(audio)
+
+    audio.file.seek(0)
+    with audio_segmentation.stage_to_file(audio.file) as staged:
+        try:
+            with stage_timer('segment'):
+                duration, silences = audio_segmentation.analyze(staged.name)
+        except Exception as e:
+            logger.warning(f"{label}: silence detection failed, transcribing in one request: {e}")
+            return transcribe_audio(audio)
+        if duration <= conf.TRANSCRIPTION_SEGMENT_MAX_SECONDS:
+            return transcribe_audio(audio)
+
+        chunks = audio_segmentation.plan_chunks(
+            duration, silences,
+            target=conf.TRANSCRIPTION_SEGMENT_SECONDS,
+            maximum=conf.TRANSCRIPTION_SEGMENT_MAX_SECONDS,
+            overlap=conf.TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS,
+        )
+        logger.info(f"{label}: {duration:.0f}s split into {len(chunks)} chunks")
+        base = os.path.splitext(audio.filename)[0]
+        # Preprocessed Opus is cut without re-encoding
+        copy = audio.content_type == audio_segmentation.CHUNK_CONTENT_TYPE
+
+        def transcribe_chunk(index, start, end):
+            file, size = audio_segmentation.extract_chunk(staged.name, start, end, copy=copy)
+            filename = f"{base}-{index:03d}{audio_segmentation.CHUNK_FILENAME_SUFFIX}"
+            with AudioBuffer(file, filename, audio_segmentation.CHUNK_CONTENT_TYPE, size) as chunk:
+                return transcribe_audio(chunk)
+
+        executor = audio_segmentation.get_executor()
+        futures = [executor.submit(transcribe_chunk, i, start, end) for i, (start, end) in enumerate(chunks)]
+        try:
+            texts = [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+    return audio_segmentation.stitch(texts)
+
+@s3.retrying
+def object_etag(bucket, key):
+    """Return the S3 ETag of an object, used as its content key."""
+    return get_s3_client().head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+
+def _complete_complaint_response(transcript):
+    # Shares the async client's in-flight dedupe and global concurrency cap with chat
+    return chat_service.complete(transcript, system_prompt=COMPLAINT_SYSTEM_PROMPT, model=COMPLAINT_MODEL)
+
+def _response_cache_key(transcript, prompt=COMPLAINT_SYSTEM_PROMPT, model=COMPLAINT_MODEL):
+    normalized = " ".join(transcript.split()).casefold()
+    return hashlib.sha256("\0".join((model, prompt, normalized)).encode('utf-8')).hexdigest()
+
+def generate_ai_response(transcript):
+    key = _response_cache_key(transcript)
+    cached = response_cache.get(key)
+    if cached is not None:
+        logger.info("AI response served from cache")
+        return cached
+
+    logger.info("Generating AI response")
+    ai_response = _complete_complaint_response(transcript)
+    response_cache.set(key, ai_response)
+    logger.info("AI response generated successfully")
+    return ai_response
+
+def stream_ai_response(transcript, on_delta):
+    """Like generate_ai_response, but passes each reply token chunk to ``on_delta`` as it arrives."""
+    key = _response_cache_key(transcript)
+    cached = response_cache.get(key)
+    if cached is not None:
+        logger.info("AI response served from cache")
+        on_delta(cached)
+        return cached
+
+    logger.info("Streaming AI response")
+    parts = []
+    for delta in chat_service.stream(transcript, system_prompt=COMPLAINT_SYSTEM_PROMPT, model=COMPLAINT_MODEL):
+        parts.append(delta)
+        on_delta(delta)
+    ai_response = "".join(parts)
+    response_cache.set(key, ai_response)
+    logger.info("AI response generated successfully")
+    return ai_response
+
+class ObjectNotFound(LookupError):
+    """The recording a complaint points at does not exist in S3."""
+
+
+def cached_result(s3_file_path):
+    """Return (transcript, response) if both are cached for this object's content, else None.
+
+    Raises ObjectNotFound for a missing object. Other S3 errors count as a
+    miss: the complaint is queued and the worker retries the download.
+    """
+    if not len(transcript_cache):
+        return None
+    try:
+        etag = object_etag(AWS_BUCKET_NAME, s3_file_path)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            raise ObjectNotFound(s3_file_path) from e
+        logger.warning(f"Cache lookup for {s3_file_path} failed: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"Cache lookup for {s3_file_path} failed: {e}")
+        return None
+    transcript = transcript_cache.get(etag)
+    if transcript is None:
+        return None
+    ai_response = response_cache.get(_response_cache_key(transcript))
+    if ai_response is None:
+        return None
+    return transcript, ai_response
+
+def cache_stats():
+    return {
+        "transcripts": transcript_cache.stats(),
+        "responses": response_cache.stats()
+    }
+
+
+# Complaint job queue
+#
+# A complaint is a row in voice_complaints. The web request inserts it as
+# 'pending' and hands the id to a worker pool; a worker claims it by moving it
+# to 'processing' (stamping started_at), runs the stages and records
+# 'completed' or 'failed'. A claim is a lease: rows still 'processing'
+# VOICE_JOB_LEASE_SECONDS after started_at belong to a worker that died and
+# are put back to 'pending' by requeue_complaints.
+#
+# While a job is queued or running here, its ComplaintProgress carries the
+# transcript and reply deltas to any stream relaying them; the final result
+# is still read from the row.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Complaints waiting in or running on this process's pool, by id, with their progress
+_queued = {}
+_queued_lock = threading.Lock()
+
+
+class ComplaintProgress:
+    """Events published by the worker processing one complaint, replayable by any number of followers."""
+
+    def __init__(self):
+        self._events = []
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def publish(self, event, payload):
+        with self._condition:
+            self._events.append((event, payload))
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def follow(self, idle_timeout):
+        """Yield (event, payload) from the first event until the job is done.
+
+        Yields None whenever nothing arrives for ``idle_timeout`` seconds,
+        so callers can send keepalives or give up.
+        """
+        index = 0
+        while True:
+            with self._condition:
+                if not self._condition.wait_for(lambda: index < len(self._events) or self._closed, idle_timeout):
+                    events, closed = [None], False
+                else:
+                    events, closed = self._events[index:], self._closed
+                    index += len(events)
+            yield from events
+            if closed:
+                return
+
+
+def complaint_progress(complaint_id):
+    """Return the progress of a complaint queued on this process, or None."""
+    with _queued_lock:
+        return _queued.get(complaint_id)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = get_config().VOICE_PIPELINE_WORKERS
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="voice-pipeline")
+                logger.info(f"Voice complaint worker pool started with {workers} workers")
+    return _executor
+
+
+def create_complaint_job(user_id, s3_file_path):
+    """Insert a pending complaint and return its id."""
+    return create_complaint_jobs(user_id, [s3_file_path])[0]
+
+
+def create_complaint_jobs(user_id, s3_file_paths):
+    """Insert one pending complaint per path with a single multi-row INSERT; return their ids in order."""
+    if not s3_file_paths:
+        return []
+    values = ", ".join(["(%s, %s, 'pending', NOW())"] * len(s3_file_paths))
+    params = [value for s3_file_path in s3_file_paths for value in (user_id, s3_file_path)]
+    with stage_timer('db_write'), db_cursor(commit=True) as cursor:
+        cursor.execute(f"INSERT INTO voice_complaints (user_id, s3_file_path, status, created_at) VALUES {values}",
+                       params)
+        # One INSERT with a known row count gets consecutive ids; lastrowid is the first
+        first_id = cursor.lastrowid
+        cursor.execute("SELECT @@auto_increment_increment")
+        step = cursor.fetchone()[0]
+        adjust_rollup(cursor, 'voice_complaints', {'pending': len(s3_file_paths)})
+    invalidate('analytics')
+    return [first_id + i * step for i in range(len(s3_file_paths))]
+
+
+def record_completed_complaint(user_id, s3_file_path, transcript, ai_response):
+    """Insert a complaint whose result is already known and return its id."""
+    with stage_timer('db_write'), db_cursor(commit=True) as cursor:
+        cursor.execute("""
+            INSERT INTO voice_complaints (user_id, s3_file_path, transcript, ai_response, status, created_at)
+            VALUES (%s, %s, %s, %s, 'completed', NOW())
+        """, (user_id, s3_file_path, transcript, ai_response))
+        complaint_id = cursor.lastrowid
+        adjust_rollup(cursor, 'voice_complaints', {'completed': 1})
+    invalidate('analytics')
+    return complaint_id
+
+
+def _move_complaint_count(cursor, complaint_id, old_status, new_status):
+    """Move one complaint between status buckets of its creation day, in the caller's transaction."""
+    cursor.execute("SELECT DATE(created_at) FROM voice_complaints WHERE id = %s", (complaint_id,))
+    row = cursor.fetchone()
+    if row and row[0]:
+        adjust_rollup(cursor, 'voice_complaints', {old_status: -1, new_status: 1}, bucket_date=row[0])
+
+
+def submit_complaint(complaint_id, s3_file_path):
+    """Queue a complaint for background processing (no-op if this process already has it queued)."""
+    with _queued_lock:
+        if complaint_id in _queued:
+            return
+        progress = _queued[complaint_id] = ComplaintProgress()
+    _get_executor().submit(_run_queued, complaint_id, s3_file_path, progress)
+
+
+def _run_queued(complaint_id, s3_file_path, progress):
+    try:
+        process_complaint(complaint_id, s3_file_path, progress)
+    finally:
+        progress.close()
+        with _queued_lock:
+            _queued.pop(complaint_id, None)
+
+
+def reclaim_stale_complaints():
+    """Put complaints whose processing lease has expired back to 'pending'; return how many."""
+    lease = get_config().VOICE_JOB_LEASE_SECONDS
+    with db_cursor(commit=True) as cursor:
+        # Rows claimed before started_at existed fall back to updated_at
+        cursor.execute("""
+            SELECT id FROM voice_complaints
+            WHERE status = 'processing' AND COALESCE(started_at, updated_at) < NOW() - INTERVAL %s SECOND
+            FOR UPDATE
+        """, (lease,))
+        stale = [row[0] for row in cursor.fetchall()]
+        for complaint_id in stale:
+            cursor.execute("UPDATE voice_complaints SET status = 'pending' WHERE id = %s", (complaint_id,))
+            _move_complaint_count(cursor, complaint_id, 'processing', 'pending')
+    if stale:
+        invalidate('analytics')
+        logger.warning(f"Reclaimed {len(stale)} voice complaints whose worker lease expired: {stale}")
+    return len(stale)
+
+
+def requeue_complaints():
+    """Reclaim expired leases and queue every 'pending' complaint; return the number queued.
+
+    Runs from the complaint requeue scheduler, at startup and then
+    periodically. A complaint queued in two processes is processed once:
+    only one of them wins the claim.
+    """
+    reclaim_stale_complaints()
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT id, s3_file_path FROM voice_complaints WHERE status = 'pending' ORDER BY id")
+        rows = cursor.fetchall()
+    with _queued_lock:
+        rows = [row for row in rows if row['id'] not in _queued]
+    for row in rows:
+        submit_complaint(row['id'], row['s3_file_path'])
+    if rows:
+        logger.info(f"Requeued {len(rows)} pending voice complaints")
+    return len(rows)
+
+
+def _claim_complaint(complaint_id):
+    """Atomically move a complaint from 'pending' to 'processing'."""
+    with db_cursor(commit=True) as cursor:
+        cursor.execute("""
+            UPDATE voice_complaints SET status = 'processing', started_at = NOW()
+            WHERE id = %s AND status = 'pending'
+        """, (complaint_id,))
+        claimed = cursor.rowcount == 1
+        if claimed:
+            _move_complaint_count(cursor, complaint_id, 'pending', 'processing')
+        return claimed
+
+
+def _finish_complaint(complaint_id, status, transcript=None, ai_response=None, error_message=None):
+    with stage_timer('db_write'), db_cursor(commit=True) as cursor:
+        cursor.execute("""
+            UPDATE voice_complaints
+            SET status = %s, transcript = %s, ai_response = %s, error_message = %s
+            WHERE id = %s AND status = 'processing'
+        """, (status, transcript, ai_response, error_message, complaint_id))
+        finished = cursor.rowcount == 1
+        if finished:
+            _move_complaint_count(cursor, complaint_id, 'processing', status)
+    if finished:
+        invalidate('analytics')
+    else:
+        logger.warning(f"Complaint {complaint_id} was no longer processing; {status} result not recorded")
+    return finished
+
+
+class StageError(Exception):
+    """A pipeline stage failed; ``stage`` names it and ``transcript`` keeps any partial result."""
+
+    def __init__(self, stage, error, transcript=None):
+        super().__init__(f"{stage} failed: {error}")
+        self.stage = stage
+        self.transcript = transcript
+
+
+class ProviderLimits:
+    """Per-provider concurrency caps for the pipeline stages (None means unlimited)."""
+
+    def __init__(self, s3=None, transcription=None, chat=None):
+        self._semaphores = {
+            name: threading.BoundedSemaphore(limit) if limit else None
+            for name, limit in (('s3', s3), ('transcription', transcription), ('chat', chat))
+        }
+
+    def slot(self, provider):
+        return self._semaphores[provider] or nullcontext()
+
+
+NO_LIMITS = ProviderLimits()
+
+
+def transcribe_object(s3_file_path, limits=NO_LIMITS, label=None):
+    """Run download -> transcription for one object, reusing cached transcripts by ETag."""
+    label = label or s3_file_path
+    stage = "download"
+    try:
+        with limits.slot('s3'), stage_timer('s3_head'):
+            etag = object_etag(AWS_BUCKET_NAME, s3_file_path)
+        transcript = transcript_cache.get(etag)
+        if transcript is None:
+            with limits.slot('s3'), stage_timer('s3_download'):
+                audio = fetch_audio(AWS_BUCKET_NAME, s3_file_path)
+            with audio:
+                logger.info(f"{label}: copied {audio.size} bytes from S3")
+                AUDIO_BYTES.labels('downloaded').inc(audio.size)
+
+                stage = "preprocess"
+                with stage_timer('preprocess'):
+                    upload = preprocess_audio(audio)
+                with upload:
+                    AUDIO_BYTES.labels('uploaded').inc(upload.size)
+                    stage = "transcription"
+                    with limits.slot('transcription'), stage_timer('transcription'):
+                        transcript = transcribe_segmented(upload, label)
+            transcript_cache.set(etag, transcript)
+        else:
+            logger.info(f"{label}: transcript served from cache")
+    except Exception as e:
+        raise StageError(stage, e) from e
+    logger.info(f"{label} transcript generated: {transcript[:100]}...")
+    return transcript
+
+
+def run_stages(s3_file_path, limits=NO_LIMITS, label=None, progress=None):
+    """Run download -> transcription -> response for one object and return (transcript, ai_response).
+
+    With ``progress``, the transcript and each reply token chunk are
+    published to it as soon as they are known.
+    """
+    transcript = transcribe_object(s3_file_path, limits, label)
+    try:
+        with limits.slot('chat'), stage_timer('chat'):
+            if progress is None:
+                ai_response = generate_ai_response(transcript)
+            else:
+                progress.publish('transcript', {'transcript': transcript})
+                ai_response = stream_ai_response(
+                    transcript, lambda delta: progress.publish('delta', {'text': delta})
+                )
+    except Exception as e:
+        raise StageError("response", e, transcript) from e
+    return transcript, ai_response
+
+
+def process_complaint(complaint_id, s3_file_path, progress=None):
+    """Run the pipeline for one queued complaint and record the outcome.
+
+    ``progress`` receives the transcript, the reply deltas and, once the
+    outcome is recorded, "done" or "error".
+    """
+    try:
+        if not _claim_complaint(complaint_id):
+            logger.info(f"Complaint {complaint_id} already claimed, skipping")
+            return
+    except Exception as e:
+        logger.error(f"Failed to claim complaint {complaint_id}: {e}")
+        return
+
+    try:
+        transcript, ai_response = run_stages(s3_file_path, label=f"Complaint {complaint_id}", progress=progress)
+        if _finish_complaint(complaint_id, 'completed', transcript, ai_response) and progress:
+            progress.publish('done', {'transcript': transcript, 'response': ai_response})
+        logger.info(f"Complaint {complaint_id} processed successfully")
+
+    except StageError as e:
+        logger.error(f"Complaint {complaint_id} failed during {e.stage}: {str(e.__cause__)}")
+        logger.debug(traceback.format_exc())
+        try:
+            if _finish_complaint(complaint_id, 'failed', e.transcript, error_message=str(e)[:1000]) and progress:
+                progress.publish('error', {'error': str(e)[:1000]})
+        except Exception as db_error:
+            logger.error(f"Failed to record failure for complaint {complaint_id}: {db_error}")
+    except Exception as e:
+        logger.error(f"Failed to record result for complaint {complaint_id}: {e}")
+
+
+def get_complaint(complaint_id):
+    """Return the status row for a complaint, or None if it does not exist."""
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT id, user_id, s3_file_path, status, transcript, ai_response,
+                   error_message, created_at, updated_at
+            FROM voice_complaints WHERE id = %s
+        """, (complaint_id,))
+        return cursor.fetchone()
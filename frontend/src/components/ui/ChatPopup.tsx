@@ -1,6 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Button } from '@/components/ui/button';
 import { ArrowUpDown, X } from 'lucide-react';
+import { streamChat } from '@/lib/sse';
 
 const ChatPopup = ({ onClose }: { onClose: () => void }) => {
   const [isMinimized, setIsMinimized] = useState(false);
@@ -24,31 +25,21 @@ const ChatPopup = ({ onClose }: { onClose: () => void }) => {
     setInput(''); // Clear the input field
   
     try {
-      // Send the message to the backend (Flask)
-      const response = await fetch('http://127.0.0.1:5000/api/claude', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ message: input }),
+      // Stream the reply from the backend so text appears as it is generated
+      let started = false;
+      const reply = await streamChat(input, (text) => {
+        if (!started) {
+          started = true;
+          setMessages((prev) => [...prev, { sender: 'Clara', text }]);
+        } else {
+          setMessages((prev) => [...prev.slice(0, -1), { sender: 'Clara', text }]);
+        }
       });
-  
-      if (!response.ok) {
-        throw new Error('Failed to fetch response');
-      }
-  
-      // Get the response from the backend (GPT model)
-      const data = await response.json();
-      
-      // If GPT response is successful, add it to the chat
-      if (data.reply) {
-        const aiMessage = { sender: 'Clara', text: data.reply };
-        setMessages((prev) => [...prev, aiMessage]);
-      } else {
-        // Handle cases where the response is not in the expected format
+
+      if (!started) {
         setMessages((prev) => [
           ...prev,
-          { sender: 'Clara', text: 'Sorry, something went wrong. Please try again.' },
+          { sender: 'Clara', text: reply || 'Sorry, something went wrong. Please try again.' },
         ]);
       }
   
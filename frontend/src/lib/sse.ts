@@ -0,0 +1,79 @@
+export type SseEvent = {
+  event: string;
+  data: any;
+};
+
+/**
+ * Read a text/event-stream response body and call onEvent for each event as it arrives.
+ */
+export const readSse = async (response: Response, onEvent: (event: SseEvent) => void) => {
+  if (!response.body) {
+    throw new Error('Streaming is not supported by this browser');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (block: string) => {
+    let event = 'message';
+    const data: string[] = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        data.push(line.slice(5).trim());
+      }
+    }
+    if (data.length) {
+      onEvent({ event, data: JSON.parse(data.join('\n')) });
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+};
+
+/**
+ * Send a chat message and stream the reply; onDelta receives the reply text so far.
+ */
+export const streamChat = async (message: string, onDelta: (text: string) => void) => {
+  const response = await fetch('http://127.0.0.1:5000/api/claude/stream', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify({ message }),
+  });
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch response');
+  }
+
+  let reply = '';
+  await readSse(response, ({ event, data }) => {
+    if (event === 'delta') {
+      reply += data.text;
+      onDelta(reply);
+    } else if (event === 'done') {
+      reply = data.reply;
+    } else if (event === 'error') {
+      throw new Error(data.error);
+    }
+  });
+  return reply;
+};
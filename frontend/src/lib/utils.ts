@@ -9,3 +9,9 @@ export const isAuthenticated = () => {
   const isLoggedIn = localStorage.getItem('isLoggedIn') === 'true';
   return isLoggedIn;
 };
+
+// Bearer header for routes that take the caller's identity from the access token
+export const authHeaders = (): Record<string, string> => {
+  const token = localStorage.getItem('accessToken');
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
@@ -55,11 +55,7 @@ const Analytics = () => {
   const [resolutionRate, setResolutionRate] = useState(0);
 
 useEffect(() => {
-  // Trigger sync
-  axios.post('http://localhost:5000/api/sync-twilio-inquiries')
-    .then(res => console.log('Twilio sync complete:', res.data))
-    .catch(err => console.error('Twilio sync failed:', err));
-
+  // Twilio calls are ingested by the backend sync scheduler, not on page load
   // Fetch pie chart
   axios.get('http://localhost:5000/api/complaint-summary')
     .then(res => {
@@ -82,7 +78,7 @@ useEffect(() => {
     .catch(err => console.error('Error fetching resolution rate:', err));
 
   // Fetch human escalations
-    axios.get('http://localhost:5000/api/human-escalations')
+    axios.get('http://localhost:5000/api/human-escalations', { params: { limit: 50 } })
   .then((res) => {
     setHumanEscalations(res.data);
   })
@@ -96,8 +92,13 @@ useEffect(() => {
     .catch(err => console.error('File count error:', err));
 
   // Fetch completed calls
-  axios.get('http://localhost:5000/api/completed-calls')
-    .then(res => setCompletedCalls(res.data.length))
+  const monthStart = new Date();
+  monthStart.setUTCDate(1);
+  monthStart.setUTCHours(0, 0, 0, 0);
+  axios.get('http://localhost:5000/api/completed-calls/count', {
+    params: { start: monthStart.toISOString().slice(0, 19) }
+  })
+    .then(res => setCompletedCalls(res.data.count))
     .catch(err => console.error('Completed calls error:', err));
 }, []);
 
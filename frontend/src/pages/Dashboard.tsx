@@ -17,7 +17,7 @@ import {
   Phone
 } from 'lucide-react';
 import { Button } from '@/components/ui/button';
-import { isAuthenticated } from '@/lib/utils';
+import { authHeaders, isAuthenticated } from '@/lib/utils';
 import { useToast } from '@/hooks/use-toast';
 
 const Dashboard = () => {
@@ -41,10 +41,14 @@ const Dashboard = () => {
       setIsLoading(false);
     }, 1000);
 
-    fetch('http://localhost:5000/api/completed-calls') 
+    // Count this month's completed calls
+    const monthStart = new Date();
+    monthStart.setUTCDate(1);
+    monthStart.setUTCHours(0, 0, 0, 0);
+    fetch(`http://localhost:5000/api/completed-calls/count?start=${monthStart.toISOString().slice(0, 19)}`)
       .then(response => response.json())
       .then(data => {
-        setCompletedCalls(data.length); // Count the number of completed calls
+        setCompletedCalls(data.count);
       })
       .catch(error => {
         console.error('Error fetching completed calls:', error);
@@ -75,6 +79,7 @@ const Dashboard = () => {
     try {
       const response = await fetch('http://localhost:5000/upload', {
         method: 'POST',
+        headers: authHeaders(),
         body: formData,
       });      const data = await response.json();
       if (response.ok) {
@@ -125,6 +130,8 @@ const Dashboard = () => {
   const handleLogout = () => {
     localStorage.removeItem('isLoggedIn');
     localStorage.removeItem('userId');
+    localStorage.removeItem('accessToken');
+    localStorage.removeItem('refreshToken');
     
     navigate('/');
   };
@@ -5,6 +5,7 @@ import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import Navbar from '@/components/Navbar';
 import Footer from '@/components/Footer';
+import { streamChat } from '@/lib/sse';
 
 const LiveSupport = () => {
   const [messages, setMessages] = useState<{text: string, sender: 'user' | 'ai', timestamp: Date}[]>([
@@ -21,6 +22,8 @@ const LiveSupport = () => {
   const handleLogout = () => {
     localStorage.removeItem('isLoggedIn');
     localStorage.removeItem('userId');
+    localStorage.removeItem('accessToken');
+    localStorage.removeItem('refreshToken');
     navigate('/');
   };
     const handleSendMessage = async (e: React.FormEvent) => {
@@ -43,31 +46,28 @@ const LiveSupport = () => {
     setIsTyping(true);
 
     try {
-      // Send the message to the backend (Flask)
-      const response = await fetch('http://127.0.0.1:5000/api/claude', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ message: newMessage }),
+      // Stream the reply from the backend so text appears as it is generated
+      let started = false;
+      const reply = await streamChat(newMessage, (text) => {
+        if (!started) {
+          started = true;
+          setIsTyping(false);
+          setMessages((prevMessages) => [
+            ...prevMessages,
+            { text, sender: 'ai', timestamp: new Date() },
+          ]);
+        } else {
+          setMessages((prevMessages) => [
+            ...prevMessages.slice(0, -1),
+            { ...prevMessages[prevMessages.length - 1], text },
+          ]);
+        }
       });
 
-      if (!response.ok) {
-        throw new Error('Failed to fetch response');
-      }
-
-      // Get the response from the GPT model
-      const data = await response.json();
-      
-      if (data.reply) {
-        setMessages((prevMessages) => [
-          ...prevMessages,
-          { text: data.reply, sender: 'ai', timestamp: new Date() },
-        ]);
-      } else {
+      if (!started) {
         setMessages((prevMessages) => [
           ...prevMessages,
-          { text: 'Sorry, something went wrong. Please try again.', sender: 'ai', timestamp: new Date() },
+          { text: reply || 'Sorry, something went wrong. Please try again.', sender: 'ai', timestamp: new Date() },
         ]);
       }
     } catch (error) {
@@ -38,6 +38,8 @@ const Login = () => {
       if (response.ok) {
         localStorage.setItem('isLoggedIn', 'true');
         localStorage.setItem('userId', data.userId);
+        localStorage.setItem('accessToken', data.access_token);
+        localStorage.setItem('refreshToken', data.refresh_token);
         toast.success('Login successful! Redirecting to dashboard...');
         navigate('/dashboard');
       } else {
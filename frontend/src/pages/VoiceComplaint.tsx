@@ -17,6 +17,8 @@ import { useToast } from '@/hooks/use-toast';
 import Navbar from '@/components/Navbar';
 import Footer from '@/components/Footer';
 import API_BASE_URL from '@/config/api';
+import { authHeaders } from '@/lib/utils';
+import { readSse } from '@/lib/sse';
 
 interface AudioRecorderState {
   mediaRecorder: MediaRecorder | null;
@@ -25,6 +27,13 @@ interface AudioRecorderState {
   stream: MediaStream | null;
 }
 
+interface ComplaintJob {
+  status?: string;
+  transcript?: string;
+  response?: string;
+  error?: string;
+}
+
 const VoiceComplaint = () => {
   const [isRecording, setIsRecording] = useState(false);
   const [recordingTime, setRecordingTime] = useState(0);
@@ -36,6 +45,9 @@ const VoiceComplaint = () => {
   const [processingStage, setProcessingStage] = useState<'idle' | 'uploading' | 'transcribing' | 'analyzing'>('idle');
   const [retryCount, setRetryCount] = useState(0);
   const MAX_RETRIES = 3;
+  const POLL_INITIAL_MS = 1000;
+  const POLL_MAX_MS = 10000;
+  const JOB_TIMEOUT_MS = 5 * 60 * 1000;
 
   const [recorderState, setRecorderState] = useState<AudioRecorderState>({
     mediaRecorder: null,
@@ -103,6 +115,40 @@ const VoiceComplaint = () => {
     }
   };
 
+  // Follow a queued job's stream, showing the reply as it is generated. Resolves with the
+  // result, or with the job's latest status when this server can't stream it
+  const followComplaintStream = async (jobId: number): Promise<ComplaintJob> => {
+    const response = await fetch(`${API_BASE_URL}/api/voice-complaints/${jobId}/stream`, {
+      headers: {
+        'Accept': 'text/event-stream',
+        ...authHeaders()
+      },
+      credentials: 'include',
+      mode: 'cors',
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to stream complaint: ${response.status}`);
+    }
+
+    let result: ComplaintJob = { status: 'pending' };
+    let reply = '';
+    await readSse(response, ({ event, data }) => {
+      if (event === 'transcript') {
+        setProcessingStage('analyzing');
+      } else if (event === 'delta') {
+        reply += data.text;
+        setAiResponse(reply);
+      } else if (event === 'done') {
+        result = { status: 'completed', transcript: data.transcript, response: data.response };
+      } else if (event === 'error') {
+        result = { status: 'failed', error: data.error };
+      } else if (event === 'status') {
+        result = data;
+      }
+    });
+    return result;
+  };
+
   const startRecording = async () => {
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
@@ -266,8 +312,8 @@ const VoiceComplaint = () => {
       const formData = new FormData();
       formData.append('file', recorderState.audioBlob, fileName);
 
-      // Upload with retry mechanism
-      await retryWithBackoff(async () => {
+      // Upload with retry mechanism; the backend returns the stored object key
+      const uploadResult = await retryWithBackoff(async () => {
         const uploadPromise = new Promise((resolve, reject) => {
           const xhr = new XMLHttpRequest();
           
@@ -288,6 +334,7 @@ const VoiceComplaint = () => {
           xhr.onerror = () => reject(new Error('Upload failed'));
           
           xhr.open('POST', `${API_BASE_URL}/upload`);
+          Object.entries(authHeaders()).forEach(([name, value]) => xhr.setRequestHeader(name, value));
           xhr.send(formData);
         });
 
@@ -299,50 +346,79 @@ const VoiceComplaint = () => {
         description: "Processing your complaint...",
       });
 
-      // Process with AI
+      // Submit once; retries below only re-read the status of this job
       setProcessingStage('transcribing');
-      await retryWithBackoff(async () => {
-        const aiProcessingResponse = await fetch(`${API_BASE_URL}/api/process-voice-complaint`, {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Access-Control-Allow-Credentials': 'true'
-          },
+      const submitResponse = await fetch(`${API_BASE_URL}/api/process-voice-complaint`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Access-Control-Allow-Credentials': 'true',
+          ...authHeaders()
+        },
+        credentials: 'include',
+        mode: 'cors',
+        body: JSON.stringify({
+          file_path: uploadResult.key || fileName
+        }),
+      });
+
+      const job = await submitResponse.json().catch(() => ({}));
+      if (!submitResponse.ok) {
+        throw new Error(job.error || `Failed to process complaint: ${submitResponse.status}`);
+      }
+
+      // Cached recordings come back completed; otherwise stream the job, and poll it
+      // if the stream is unavailable or ends before the job does
+      let aiData: ComplaintJob = job;
+      if (aiData.status !== 'completed' && aiData.status !== 'failed') {
+        try {
+          aiData = await followComplaintStream(job.job_id);
+        } catch (error) {
+          console.warn('Complaint stream unavailable, polling instead:', error);
+        }
+      }
+      const deadline = Date.now() + JOB_TIMEOUT_MS;
+      let pollDelay = POLL_INITIAL_MS;
+      while (aiData.status !== 'completed' && aiData.status !== 'failed') {
+        if (Date.now() > deadline) {
+          throw new Error('Timed out waiting to process complaint');
+        }
+        await sleep(pollDelay);
+        const statusResponse: Response = await retryWithBackoff(() => fetch(`${API_BASE_URL}/api/voice-complaints/${job.job_id}`, {
+          headers: authHeaders(),
           credentials: 'include',
           mode: 'cors',
-          body: JSON.stringify({
-            file_path: fileName
-          }),
-        });
-
-        if (!aiProcessingResponse.ok) {
-          const errorData = await aiProcessingResponse.json().catch(() => ({}));
-          throw new Error(errorData.error || `Failed to process complaint: ${aiProcessingResponse.status}`);
+        }), 'status check');
+        if (statusResponse.status === 429) {
+          // Wait as long as the server asks before polling again
+          const retryAfter = Number(statusResponse.headers.get('Retry-After'));
+          pollDelay = retryAfter > 0 ? retryAfter * 1000 : Math.min(pollDelay * 2, POLL_MAX_MS);
+          continue;
         }
-
-        const aiData = await aiProcessingResponse.json();
-        setProcessingStage('analyzing');
-
-        if (!aiData.success) {
-          throw new Error(aiData.error || 'Failed to process complaint');
+        if (!statusResponse.ok) {
+          throw new Error(`Failed to fetch complaint status: ${statusResponse.status}`);
         }
+        aiData = await statusResponse.json();
+        pollDelay = Math.min(pollDelay * 1.5, POLL_MAX_MS);
+      }
 
-        setAiResponse(aiData.response);
+      if (aiData.status === 'failed' || aiData.response == null) {
+        throw new Error(`Failed to process complaint: ${aiData.error || 'unknown error'}`);
+      }
 
-        // Show the transcript in a toast for verification
-        toast({
-          title: "Transcript Ready",
-          description: aiData.transcript,
-          duration: 5000,
-        });
-          
-        toast({
-          title: "Success",
-          description: "Your complaint has been processed successfully",
-        });
+      setAiResponse(aiData.response);
+
+      // Show the transcript in a toast for verification
+      toast({
+        title: "Transcript Ready",
+        description: aiData.transcript,
+        duration: 5000,
+      });
 
-      }, 'AI processing');
+      toast({
+        title: "Success",
+        description: "Your complaint has been processed successfully",
+      });
 
     } catch (error) {
       console.error('Error submitting complaint:', error);
@@ -394,6 +470,8 @@ const VoiceComplaint = () => {
   const handleLogout = () => {
     localStorage.removeItem('isLoggedIn');
     localStorage.removeItem('userId');
+    localStorage.removeItem('accessToken');
+    localStorage.removeItem('refreshToken');
     
     toast({
       title: "Logged out",